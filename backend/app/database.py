@@ -1,7 +1,18 @@
+import hashlib
+import hmac
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional
+from fastapi import Depends, Response
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.utils.cache import TTLCache
 
 engine = create_engine(
     settings.database_url,
@@ -14,6 +25,151 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def to_async_url(url: str) -> str:
+    """Sync database URL'ini async driver URL'ine çevir (asyncpg / aiosqlite)"""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+# Async engine (async_database=True ise)
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.async_database:
+    async_url = to_async_url(settings.database_url)
+    pool_args = {} if async_url.startswith("sqlite") else {
+        "pool_size": settings.async_pool_size,
+        "max_overflow": settings.async_max_overflow
+    }
+    async_engine = create_async_engine(async_url, pool_pre_ping=True, **pool_args)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+# Read replica'lar (replica_database_urls boşsa tüm okumalar primary'den)
+replica_urls: List[str] = [
+    url.strip() for url in settings.replica_database_urls.split(",") if url.strip()
+]
+
+replica_engines = [
+    create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.replica_pool_size,
+        max_overflow=settings.replica_max_overflow
+    )
+    for url in replica_urls
+]
+# Replica session'ları info["replica"] ile işaretlenir (is_replica_session)
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, info={"replica": True})
+    for replica_engine in replica_engines
+]
+
+AsyncReplicaSessionLocals = []
+if settings.async_database:
+    for url in replica_urls:
+        async_url = to_async_url(url)
+        pool_args = {} if async_url.startswith("sqlite") else {
+            "pool_size": settings.replica_pool_size,
+            "max_overflow": settings.replica_max_overflow
+        }
+        AsyncReplicaSessionLocals.append(async_sessionmaker(
+            create_async_engine(async_url, pool_pre_ping=True, **pool_args),
+            autoflush=False,
+            expire_on_commit=False,
+            info={"replica": True}
+        ))
+
+_replica_cursor = itertools.count()
+
+# Yazan kullanıcının okumaları primary_pin_seconds boyunca primary'den (read-your-writes)
+primary_pins = TTLCache(maxsize=settings.primary_pin_max_users, ttl=settings.primary_pin_seconds)
+
+# Pin istemciyle de taşınır; böylece sonraki istek hangi worker'a düşerse düşsün görülür
+PRIMARY_PIN_COOKIE = "primary_pin"
+PRIMARY_PIN_HEADER = "X-Primary-Pin"
+
+
+def _pin_signature(payload: str) -> str:
+    return hmac.new(settings.secret_key.encode(), payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def primary_pin_token(user_id: int, until: float) -> str:
+    """İmzalı pin: <user_id>.<bitiş epoch ms>.<imza>"""
+    payload = f"{user_id}.{int(until * 1000)}"
+    return f"{payload}.{_pin_signature(payload)}"
+
+
+def _pin_token_valid(user_id: int, token: str) -> bool:
+    """Pin token'ı bu kullanıcıya ait, imzası doğru ve süresi dolmamış mı"""
+    try:
+        token_user, until_ms, signature = token.split(".")
+        if int(token_user) != user_id or int(until_ms) <= time.time() * 1000:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(signature, _pin_signature(f"{token_user}.{until_ms}"))
+
+
+def pin_to_primary(user_id: int, response: Optional[Response] = None):
+    """
+    Kullanıcının sonraki okumalarını kısa süre primary'ye yönlendir
+
+    Bu worker'da süreç içi kayıt tutulur; response verilirse imzalı pin cookie
+    ve header olarak da döner, diğer worker'lar onu görür.
+    """
+    if not replica_urls:
+        return
+
+    primary_pins.set(user_id, True)
+    if response is not None:
+        token = primary_pin_token(user_id, time.time() + settings.primary_pin_seconds)
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            token,
+            max_age=math.ceil(settings.primary_pin_seconds),
+            httponly=True,
+            samesite="lax"
+        )
+        response.headers[PRIMARY_PIN_HEADER] = token
+
+
+def is_pinned(user_id: Optional[int], token: Optional[str] = None) -> bool:
+    """Kullanıcı primary'ye pinli mi (süreç içi kayıt ya da istemcinin getirdiği pin)"""
+    if user_id is None:
+        return False
+    if primary_pins.get(user_id) is not None:
+        return True
+    return token is not None and _pin_token_valid(user_id, token)
+
+
+def open_replica_session():
+    """Sıradaki replica için session (round-robin; async modda AsyncSession)"""
+    factories = AsyncReplicaSessionLocals if settings.async_database else ReplicaSessionLocals
+    return factories[next(_replica_cursor) % len(factories)]()
+
+
+def is_replica_session(db: Session) -> bool:
+    """Session bir read replica'ya mı bağlı (replikasyon gecikmesiyle eski veri görebilir)"""
+    return bool(db.info.get("replica"))
+
+
+def read_session() -> Session:
+    """Arka plan okumaları için sync session (replica varsa replica)"""
+    if ReplicaSessionLocals:
+        return ReplicaSessionLocals[next(_replica_cursor) % len(ReplicaSessionLocals)]()
+    return SessionLocal()
+
+
 def get_db():
     """Dependency için database session"""
     db = SessionLocal()
@@ -21,3 +177,69 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency için async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class DBRunner:
+    """
+    Servis fonksiyonlarını request session'ı ile çalıştırır
+
+    Sync session'da fonksiyon threadpool'da çalışır. Async session'da
+    AsyncSession.run_sync ile event loop üzerinde çalışır; veritabanı
+    beklemeleri thread tutmaz, aynı servis kodu iki modda da kullanılır.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def is_async(self) -> bool:
+        return isinstance(self.session, AsyncSession)
+
+    async def run(self, fn: Callable[[Session], Any]) -> Any:
+        if self.is_async:
+            return await self.session.run_sync(fn)
+        return await run_in_threadpool(fn, self.session)
+
+    async def release(self):
+        """
+        Session'ı kapatıp bağlantıyı havuza geri ver
+
+        Uzun süren response'lar (stream) dependency teardown'ını beklemeden
+        bağlantıyı bırakmak için çağırır; session sonra yeniden kullanılabilir.
+        """
+        if self.is_async:
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+
+async def get_sync_runner(db: Session = Depends(get_db)) -> DBRunner:
+    return DBRunner(db)
+
+
+async def get_async_runner(db: AsyncSession = Depends(get_async_db)) -> DBRunner:
+    return DBRunner(db)
+
+
+# Route'lar bu dependency'yi kullanır; mod ayarla seçilir
+get_db_runner = get_async_runner if settings.async_database else get_sync_runner
+
+
+
+@asynccontextmanager
+async def replica_runner():
+    """Sıradaki replica session'ı ile runner; çıkışta session kapanır"""
+    session = open_replica_session()
+    try:
+        yield DBRunner(session)
+    finally:
+        if isinstance(session, AsyncSession):
+            await session.close()
+        else:
+            await run_in_threadpool(session.close)
@@ -1,18 +1,55 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.database import PRIMARY_PIN_HEADER, engine, Base
 from app.routes import auth, drops, admin
 from app.config import settings
+from app.middleware.idempotency_middleware import IdempotencyMiddleware
+from app.utils.idempotency import DatabaseIdempotencyStore, idempotency_store, purge_expired_keys
+from app.utils.password_hasher import password_hasher
+from app.utils.scheduler import scheduler
+from app.services.waitlist_service import allocate_due_drops
+from app.services.expiry_service import sweep_expired_claims
+from app.services.stats_service import reconcile_all_drop_stats
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# Arka plan işleri
+scheduler.add_job("allocation", settings.allocation_interval_seconds, allocate_due_drops)
+scheduler.add_job("expiry_sweep", settings.expiry_sweep_interval_seconds, sweep_expired_claims)
+scheduler.add_job("drop_stats_reconcile", settings.drop_stats_reconcile_interval_seconds, reconcile_all_drop_stats)
+if isinstance(idempotency_store, DatabaseIdempotencyStore):
+    scheduler.add_job("idempotency_purge", settings.idempotency_purge_interval_seconds, purge_expired_keys)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.background_jobs_enabled:
+        scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        # Worker process'leri uygulamayla birlikte kapansın
+        password_hasher.shutdown(wait=True)
+
+
 app = FastAPI(
     title="DropSpot API",
     description="Limited stock and waitlist platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Idempotency-Key (join/leave/claim tekrarları servis katmanına girmez)
+if idempotency_store is not None:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=idempotency_store,
+        wait_timeout_ms=settings.idempotency_wait_timeout_ms
+    )
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +57,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Tarayıcı istemcilerin okuyup geri göndermesi gereken header'lar
+    expose_headers=[PRIMARY_PIN_HEADER, "X-Next-Cursor"],
 )
 
 # Routes
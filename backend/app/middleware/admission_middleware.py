@@ -0,0 +1,33 @@
+from fastapi import HTTPException, status
+from app.config import settings
+from app.utils.admission import AdmissionRejected, admission_controller
+
+
+def admission_guard(action: str):
+    """
+    Drop bazlı admission control dependency'si (/drops/{id}/join, /claim)
+
+    Limit aşılırsa havuz tükenmesini beklemeden 503 + Retry-After döner.
+    """
+
+    async def guard(drop_id: int):
+        if not settings.admission_enabled:
+            yield
+            return
+
+        key = (action, drop_id)
+        try:
+            await admission_controller.acquire(key)
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Too many concurrent requests ({e.reason}), retry later",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+        try:
+            yield
+        finally:
+            admission_controller.release(key)
+
+    return guard
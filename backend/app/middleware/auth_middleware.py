@@ -1,18 +1,59 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import (
+    PRIMARY_PIN_COOKIE, PRIMARY_PIN_HEADER, DBRunner, get_db_runner, is_pinned, primary_pins,
+    replica_runner, replica_urls
+)
 from app.utils.jwt_handler import decode_token
-from app.models.user import User, UserRole
+from app.models.user import UserRole
+from app.utils.principal import UserPrincipal, load_principal, user_principal_cache
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
+def _token_user_id(request: Request) -> Optional[int]:
+    """Authorization header'daki token'ın kullanıcı id'si (doğrulanamazsa None)"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    payload = decode_token(token)
+    try:
+        return int(payload["sub"]) if payload else None
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+async def get_read_runner(request: Request, primary: DBRunner = Depends(get_db_runner)):
+    """
+    Salt okunur endpoint'ler için runner
+
+    Replica tanımlıysa sıradaki replica kullanılır. Kullanıcı kısa süre önce
+    yazdıysa (pin_to_primary; bu worker'da ya da istemcinin getirdiği pin
+    cookie/header'ı ile) kendi yazdığını görebilmesi için primary kullanılır.
+    """
+    if not replica_urls:
+        yield primary
+        return
+
+    pin_token = request.cookies.get(PRIMARY_PIN_COOKIE) or request.headers.get(PRIMARY_PIN_HEADER)
+    # Pin yoksa token'ı çözmeye gerek yok
+    if (len(primary_pins) or pin_token) and is_pinned(_token_user_id(request), pin_token):
+        yield primary
+        return
+
+    async with replica_runner() as runner:
+        yield runner
+
+
+async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: Session = Depends(get_db)
-) -> User:
-    """JWT token'dan mevcut kullanıcıyı al"""
+        runner: DBRunner = Depends(get_read_runner)
+) -> UserPrincipal:
+    """JWT token'dan mevcut kullanıcıyı al (önbellekli principal)"""
     token = credentials.credentials
     payload = decode_token(token)
 
@@ -38,18 +79,33 @@ def get_current_user(
             detail="Invalid user ID in token"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    principal = user_principal_cache.get(user_id)
+    if principal is not None:
+        return principal
 
-    if user is None:
+    principal = await runner.run(lambda db: load_principal(db, user_id))
+
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
-    return user
+    user_principal_cache.set(user_id, principal)
+    return principal
+
+
+async def get_optional_user(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+        runner: DBRunner = Depends(get_read_runner)
+) -> Optional[UserPrincipal]:
+    """Token varsa kullanıcıyı al, yoksa None (geçersiz token yine 401)"""
+    if credentials is None:
+        return None
+    return await get_current_user(credentials, runner)
 
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Admin yetkisi kontrolü"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import Dict
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.idempotency import IdempotencyStore, StoredResponse
+
+# Idempotency-Key ile korunan endpoint'ler
+IDEMPOTENT_PATHS = re.compile(r"^/drops/\d+/(join|leave|claim)$")
+
+# Aynı anahtarla işlenmekte olan isteği beklerken yoklama aralığı (her denemede iki katı)
+_POLL_INTERVAL_SECONDS = 0.005
+_MAX_POLL_INTERVAL_SECONDS = 0.25
+
+# Saklanan cevapla kaydedilmeyen header'lar (tekrar oynatılırken yeniden yazılır)
+_UNSTORED_HEADERS = frozenset({b"content-type", b"content-length"})
+
+# Saklanmayan, aynı anahtarla tekrar denenebilecek cevaplar (5xx'e ek olarak)
+RETRYABLE_STATUSES = frozenset({408, 425, 429})
+
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key header'lı POST /drops/{id}/join|leave|claim isteklerini
+    tekrar oynatır
+
+    Tamamlanan cevap (5xx ve RETRYABLE_STATUSES hariç) depoya yazılır; aynı
+    kullanıcı + aynı anahtar ile gelen tekrar istek servis katmanına hiç
+    girmeden saklanan cevabı alır. İlk istek henüz bitmemişse tekrarlar onun
+    sonucunu bekler: aynı process'teki istek bitince hemen uyanır, diğer
+    worker'lardakini artan aralıklarla yoklar.
+    """
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, wait_timeout_ms: int = 10000):
+        self.app = app
+        self.store = store
+        self.wait_timeout_seconds = wait_timeout_ms / 1000
+        # Bu process'te işlenen anahtarlar; bitince bekleyen tekrarlar uyandırılır
+        self._in_progress: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not IDEMPOTENT_PATHS.match(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        # Anahtar kullanıcıya (Authorization) ve endpoint'e özel
+        key = hashlib.sha256(b"\0".join([
+            scope["path"].encode(),
+            headers.get(b"authorization", b""),
+            idempotency_key
+        ])).hexdigest()
+
+        stored = await self._acquire(key)
+        if stored is not None:
+            await self._replay(stored, send)
+            return
+
+        done = self._in_progress[key] = asyncio.Event()
+        try:
+            await self._process(key, scope, receive, send)
+        finally:
+            if self._in_progress.get(key) is done:
+                del self._in_progress[key]
+            done.set()
+
+    async def _process(self, key: str, scope: Scope, receive: Receive, send: Send):
+        """İsteği işle, cevabı sakla ya da rezervasyonu bırak"""
+        captured = {"status": 500, "content_type": "application/json", "headers": [], "body": []}
+
+        async def capture_send(message: Message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    name = name.lower()
+                    if name == b"content-type":
+                        captured["content_type"] = value.decode("latin-1")
+                    elif name not in _UNSTORED_HEADERS:
+                        captured["headers"].append((name.decode("latin-1"), value.decode("latin-1")))
+            elif message["type"] == "http.response.body":
+                captured["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture_send)
+        except Exception:
+            await self._call(self.store.release, key)
+            raise
+
+        if captured["status"] < 500 and captured["status"] not in RETRYABLE_STATUSES:
+            await self._call(self.store.save, key, StoredResponse(
+                status_code=captured["status"],
+                content_type=captured["content_type"],
+                body=b"".join(captured["body"]),
+                headers=tuple(captured["headers"])
+            ))
+        else:
+            await self._call(self.store.release, key)
+
+    async def _call(self, fn, *args):
+        """Depo metodunu çağır (bloklayan depolar threadpool'da)"""
+        if self.store.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def _acquire(self, key: str):
+        """Saklanan cevabı döndür; yoksa anahtarı rezerve et ve None döndür"""
+        deadline = time.monotonic() + self.wait_timeout_seconds
+        interval = _POLL_INTERVAL_SECONDS
+
+        while True:
+            stored = await self._call(self.store.get, key)
+            if stored is not None:
+                return stored
+            if await self._call(self.store.reserve, key):
+                return None
+            if time.monotonic() >= deadline:
+                return StoredResponse(
+                    status_code=409,
+                    content_type="application/json",
+                    body=b'{"detail":"Request with this Idempotency-Key is still in progress"}'
+                )
+
+            delay = min(interval, deadline - time.monotonic())
+            interval = min(interval * 2, _MAX_POLL_INTERVAL_SECONDS)
+            local = self._in_progress.get(key)
+            if local is None:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await asyncio.wait_for(local.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _replay(self, stored: StoredResponse, send: Send):
+        await send({
+            "type": "http.response.start",
+            "status": stored.status_code,
+            "headers": [
+                (b"content-type", stored.content_type.encode("latin-1")),
+                (b"content-length", str(len(stored.body)).encode()),
+                *((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers),
+                (b"idempotent-replayed", b"true")
+            ]
+        })
+        await send({"type": "http.response.body", "body": stored.body})
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -14,3 +14,8 @@ class ClaimCode(Base):
     used_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     expires_at = Column(DateTime, nullable=False)
+
+    # Süresi dolan, kullanılmamış kodların taranması (expiry sweeper)
+    __table_args__ = (
+        Index('idx_claim_code_expiry', 'is_used', 'expires_at'),
+    )
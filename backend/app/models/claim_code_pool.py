@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.database import Base
+
+
+class ClaimCodePool(Base):
+    """Drop oluşturulurken önceden üretilen, henüz dağıtılmamış claim code'lar"""
+    __tablename__ = "claim_code_pool"
+
+    id = Column(Integer, primary_key=True, index=True)
+    drop_id = Column(Integer, ForeignKey("drops.id", ondelete="CASCADE"), nullable=False)
+    code = Column(String(50), unique=True, nullable=False)
+
+    # Havuzdan sırayla çekmek için
+    __table_args__ = (
+        Index('idx_code_pool_drop', 'drop_id', 'id'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -11,6 +11,11 @@ class DropStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+class AllocationMode(str, enum.Enum):
+    FIRST_COME = "first_come"   # Stok claim'e ilk gelene
+    PRIORITY = "priority"       # Claim window açılınca priority_score sırasıyla toplu dağıtım
+
+
 class Drop(Base):
     __tablename__ = "drops"
 
@@ -20,6 +25,13 @@ class Drop(Base):
     total_stock = Column(Integer, nullable=False)
     claimed_count = Column(Integer, default=0, nullable=False)
 
+    # Stok shard sayısı (1 = shard yok, claimed_count doğrudan drop satırında tutulur)
+    stock_shards = Column(Integer, default=1, nullable=False)
+
+    # Stok dağıtım modu (priority: claim window açılınca tek seferde dağıtılır)
+    allocation_mode = Column(Enum(AllocationMode), default=AllocationMode.FIRST_COME, nullable=False)
+    allocated_at = Column(DateTime, nullable=True)
+
     # Zaman bilgisi
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     claim_window_start = Column(DateTime, nullable=False)
@@ -32,3 +44,10 @@ class Drop(Base):
     # Relationships
     creator = relationship("User", back_populates="created_drops")
     waitlist_entries = relationship("Waitlist", back_populates="drop", cascade="all, delete-orphan")
+
+    # Status + claim window sıralı listeleme (keyset sayfalama, window filtreleri)
+    # Window bitişi: open/closed filtresi başlamış tüm drop'ları taramasın
+    __table_args__ = (
+        Index('idx_drop_status_window', 'status', 'claim_window_start', 'id'),
+        Index('idx_drop_status_window_end', 'status', 'claim_window_end'),
+    )
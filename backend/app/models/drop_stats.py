@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from app.database import Base
+
+
+class DropStatsShard(Base):
+    __tablename__ = "drop_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    drop_id = Column(Integer, ForeignKey("drops.id", ondelete="CASCADE"), nullable=False)
+    shard_index = Column(Integer, nullable=False)
+
+    # Waitlist durum dağılımı (drop toplamı = shard'ların toplamı)
+    waiting_count = Column(Integer, default=0, nullable=False)
+    claimed_count = Column(Integer, default=0, nullable=False)
+    expired_count = Column(Integer, default=0, nullable=False)
+
+    # Kümülatif join/leave sayıları
+    joins_total = Column(Integer, default=0, nullable=False)
+    leaves_total = Column(Integer, default=0, nullable=False)
+
+    # Join hızı: dakika kovası (epoch dakikası), bu ve önceki kovadaki join sayısı
+    join_window_start = Column(Integer, default=0, nullable=False)
+    join_window_count = Column(Integer, default=0, nullable=False)
+    join_window_prev_count = Column(Integer, default=0, nullable=False)
+
+    reconciled_at = Column(DateTime)
+
+    # Her drop için shard_index tekil
+    __table_args__ = (
+        UniqueConstraint('drop_id', 'shard_index', name='_drop_stats_shard_uc'),
+    )
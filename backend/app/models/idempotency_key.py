@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary
+from datetime import datetime
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Idempotency-Key ile tamamlanan isteklerin saklanan cevapları (çoklu worker için)"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)
+
+    # status_code NULL = istek hâlâ işleniyor
+    status_code = Column(Integer)
+    content_type = Column(String(100))
+    body = Column(LargeBinary)
+    # Tekrar oynatılacak header'lar: [[ad, değer], ...]
+    headers = Column(JSON)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from app.database import Base
+
+
+class DropStockShard(Base):
+    __tablename__ = "drop_stock_shards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    drop_id = Column(Integer, ForeignKey("drops.id", ondelete="CASCADE"), nullable=False)
+    shard_index = Column(Integer, nullable=False)
+
+    # Shard'a düşen stok ve claim sayısı
+    capacity = Column(Integer, nullable=False)
+    claimed_count = Column(Integer, default=0, nullable=False)
+
+    # Her drop için shard_index tekil
+    __table_args__ = (
+        UniqueConstraint('drop_id', 'shard_index', name='_drop_shard_uc'),
+    )
@@ -40,4 +40,6 @@ class Waitlist(Base):
     __table_args__ = (
         UniqueConstraint('drop_id', 'user_id', name='_drop_user_uc'),
         Index('idx_drop_priority', 'drop_id', 'priority_score'),
+        # Status filtreli keyset sayfalama (admin waitlist, promotion)
+        Index('idx_drop_status_priority', 'drop_id', 'status', 'priority_score', 'id'),
     )
@@ -1,38 +1,118 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, Query, Response, status
+from typing import Optional
+from app.database import DBRunner, get_db_runner, pin_to_primary, primary_pins, replica_urls
 from app.middleware.auth_middleware import require_admin
-from app.models.user import User
-from app.schemas.drop_schema import DropCreate, DropUpdate, DropResponse
+from app.utils.principal import UserPrincipal, user_principal_cache
+from app.schemas.drop_schema import DropCreate, DropUpdate, DropResponse, DropStatsReconcileResponse
 from app.services.drop_service import create_drop, update_drop, delete_drop
+from app.utils.admission import admission_controller
+from app.schemas.waitlist_schema import AllocationResponse, RescoreResponse, WaitlistPage
+from app.services.event_service import drop_events
+from app.services.expiry_service import expiry_stats
+from app.services.rescoring_service import run_rescore
+from app.services.stats_service import run_reconcile
+from app.services.waitlist_service import get_waitlist_page, joined_drop_cache, position_cache, run_allocation
+from app.utils.idempotency import idempotency_store
+from app.utils.jwt_handler import token_cache
+from app.utils.password_hasher import password_hasher
+from app.utils.response_cache import drop_response_cache
+from app.utils.serialization import JSONBytesResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.post("/drops", response_model=DropResponse, status_code=status.HTTP_201_CREATED)
-def admin_create_drop(
+async def admin_create_drop(
     drop_data: DropCreate,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    response: Response,
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
 ):
     """Yeni drop oluştur (Admin only)"""
-    return create_drop(drop_data, admin_user, db)
+    drop = await runner.run(lambda db: create_drop(drop_data, admin_user, db))
+    pin_to_primary(admin_user.id, response)
+    return drop
 
 @router.put("/drops/{drop_id}", response_model=DropResponse)
-def admin_update_drop(
+async def admin_update_drop(
     drop_id: int,
     drop_data: DropUpdate,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    response: Response,
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
 ):
     """Drop güncelle (Admin only)"""
-    return update_drop(drop_id, drop_data, db)
+    drop = await runner.run(lambda db: update_drop(drop_id, drop_data, db))
+    pin_to_primary(admin_user.id, response)
+    return drop
 
 @router.delete("/drops/{drop_id}", status_code=status.HTTP_204_NO_CONTENT)
-def admin_delete_drop(
+async def admin_delete_drop(
     drop_id: int,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    response: Response,
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
 ):
     """Drop sil (Admin only)"""
-    delete_drop(drop_id, db)
+    await runner.run(lambda db: delete_drop(drop_id, db))
+    pin_to_primary(admin_user.id, response)
     return None
+
+@router.get("/drops/{drop_id}/waitlist", response_model=WaitlistPage)
+async def admin_drop_waitlist(
+    drop_id: int,
+    status_filter: Optional[str] = Query(None, description="Filter by status"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
+):
+    """Drop waitlist'i, keyset sayfalama (Admin only)"""
+    body = await runner.run(lambda db: get_waitlist_page(db, drop_id, status_filter, limit, cursor))
+    return JSONBytesResponse(body)
+
+@router.post("/drops/{drop_id}/allocate", response_model=AllocationResponse)
+async def admin_allocate_drop(
+    drop_id: int,
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
+):
+    """Priority drop dağıtımını başlat (Admin only)"""
+    return await runner.run(lambda db: run_allocation(drop_id, db))
+
+@router.post("/drops/{drop_id}/rescore", response_model=RescoreResponse)
+async def admin_rescore_drop(
+    drop_id: int,
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
+):
+    """Waitlist priority score'larını yeniden hesapla (Admin only)"""
+    return await runner.run(lambda db: run_rescore(drop_id, db))
+
+@router.post("/drops/{drop_id}/stats/reconcile", response_model=DropStatsReconcileResponse)
+async def admin_reconcile_drop_stats(
+    drop_id: int,
+    runner: DBRunner = Depends(get_db_runner),
+    admin_user: UserPrincipal = Depends(require_admin)
+):
+    """Drop sayaçlarını waitlist'e göre düzelt (Admin only)"""
+    return await runner.run(lambda db: run_reconcile(drop_id, db))
+
+@router.get("/metrics")
+async def admin_metrics(admin_user: UserPrincipal = Depends(require_admin)):
+    """Runtime metrikleri (Admin only)"""
+    return {
+        "admission": admission_controller.stats,
+        "idempotency": getattr(idempotency_store, "stats", None),
+        "position_cache": position_cache.stats,
+        "joined_cache": joined_drop_cache.stats,
+        "user_cache": user_principal_cache.stats,
+        "token_cache": token_cache.stats,
+        "password_hasher": password_hasher.stats,
+        "drop_cache": drop_response_cache.stats,
+        "expiry_sweeper": expiry_stats.stats,
+        "events": drop_events.stats,
+        "replicas": {
+            "count": len(replica_urls),
+            "pinned_users": len(primary_pins)
+        }
+    }
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, Response, status
+from app.database import DBRunner, get_db_runner, pin_to_primary
 from app.schemas.user_schema import UserSignup, UserLogin, TokenResponse
-from app.services.auth_service import signup_user, login_user
+from app.services.auth_service import signup_user, login_user, signup_user_async, login_user_async
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def signup(signup_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(signup_data: UserSignup, response: Response, runner: DBRunner = Depends(get_db_runner)):
     """Yeni kullanıcı kaydı"""
-    return signup_user(signup_data, db)
+    if runner.is_async:
+        result = await signup_user_async(signup_data, runner.session)
+    else:
+        result = await runner.run(lambda db: signup_user(signup_data, db))
+    # Yeni kullanıcı satırı replica'ya ulaşmadan token'la gelen istekler primary'den
+    pin_to_primary(result.user.id, response)
+    return result
 
 @router.post("/login", response_model=TokenResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(login_data: UserLogin, runner: DBRunner = Depends(get_db_runner)):
     """Kullanıcı girişi"""
-    return login_user(login_data, db)
+    if runner.is_async:
+        return await login_user_async(login_data, runner.session)
+    return await runner.run(lambda db: login_user(login_data, db))
@@ -1,60 +1,170 @@
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from app.database import get_db
-from app.middleware.auth_middleware import get_current_user
-from app.models.user import User
-from app.schemas.drop_schema import DropResponse
-from app.schemas.waitlist_schema import WaitlistJoinResponse, WaitlistLeaveResponse, ClaimResponse
-from app.services.drop_service import get_drops, get_drop_by_id
-from app.services.waitlist_service import join_waitlist, leave_waitlist, claim_drop
+from app.database import DBRunner, get_db_runner, pin_to_primary
+from app.middleware.auth_middleware import get_current_user, get_optional_user, get_read_runner
+from app.middleware.admission_middleware import admission_guard
+from app.utils.principal import UserPrincipal
+from app.schemas.drop_schema import DropResponse, DropStatsResponse
+from app.schemas.waitlist_schema import (
+    WaitlistJoinResponse, WaitlistLeaveResponse, WaitlistPositionResponse, ClaimResponse
+)
+from app.services.drop_service import list_drops_page, drop_detail
+from app.services.event_service import drop_events, load_drop_snapshot
+from app.services.stats_service import get_drop_stats
+from app.services.waitlist_service import join_waitlist, leave_waitlist, get_waitlist_position, claim_drop
+from app.config import settings
+from app.utils.etag import compute_etag, etag_matches
+from app.utils.event_stream import SubscriberLimitReached
+from app.utils.serialization import JSONBytesResponse
 
 router = APIRouter(prefix="/drops", tags=["Drops"])
 
 @router.get("", response_model=List[DropResponse])
-def list_drops(
+async def list_drops(
+    request: Request,
     status_filter: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    window: Optional[str] = Query(None, description="upcoming | open | closed"),
+    runner: DBRunner = Depends(get_read_runner),
+    current_user: Optional[UserPrincipal] = Depends(get_current_user)
 ):
-    """Aktif drop'ları listele"""
-    return get_drops(db, current_user, status_filter, limit, offset)
+    """Aktif drop'ları listele (offset ya da cursor sayfalama)"""
+    body, etag, next_cursor = await runner.run(
+        lambda db: list_drops_page(db, current_user, status_filter, limit, offset, cursor, window)
+    )
+
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Hazır JSON bytes; response_model sadece dokümantasyon için
+    return JSONBytesResponse(body, headers=headers)
 
 @router.get("/{drop_id}", response_model=DropResponse)
-def get_drop(
+async def get_drop(
     drop_id: int,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    request: Request,
+    runner: DBRunner = Depends(get_read_runner),
+    current_user: Optional[UserPrincipal] = Depends(get_current_user)
 ):
     """Drop detayı"""
-    return get_drop_by_id(db, drop_id, current_user)
+    body, etag = await runner.run(lambda db: drop_detail(db, drop_id, current_user))
+
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return JSONBytesResponse(body, headers={"ETag": etag})
 
-@router.post("/{drop_id}/join", response_model=WaitlistJoinResponse)
-def join_drop_waitlist(
+@router.post(
+    "/{drop_id}/join",
+    response_model=WaitlistJoinResponse,
+    dependencies=[Depends(admission_guard("join"))]
+)
+async def join_drop_waitlist(
     drop_id: int,
+    response: Response,
     request_time_ms: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    runner: DBRunner = Depends(get_db_runner),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Waitlist'e katıl"""
-    return join_waitlist(drop_id, current_user, db, request_time_ms)
+    result = await runner.run(lambda db: join_waitlist(drop_id, current_user, db, request_time_ms))
+    pin_to_primary(current_user.id, response)
+    return result
 
 @router.post("/{drop_id}/leave", response_model=WaitlistLeaveResponse)
-def leave_drop_waitlist(
+async def leave_drop_waitlist(
     drop_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    runner: DBRunner = Depends(get_db_runner),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Waitlist'ten ayrıl"""
-    return leave_waitlist(drop_id, current_user, db)
+    result = await runner.run(lambda db: leave_waitlist(drop_id, current_user, db))
+    pin_to_primary(current_user.id, response)
+    return result
+
+@router.get("/{drop_id}/position", response_model=WaitlistPositionResponse)
+async def get_drop_position(
+    drop_id: int,
+    request: Request,
+    response: Response,
+    runner: DBRunner = Depends(get_read_runner),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Waitlist pozisyonu (If-None-Match eşleşirse 304)"""
+    position = await runner.run(lambda db: get_waitlist_position(drop_id, current_user, db))
+
+    etag = compute_etag(position.model_dump_json().encode())
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return position
+
+@router.get("/{drop_id}/stats", response_model=DropStatsResponse)
+async def get_drop_statistics(
+    drop_id: int,
+    runner: DBRunner = Depends(get_read_runner),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Drop sayaçları: waitlist dağılımı, join/leave sayıları, join hızı"""
+    return await runner.run(lambda db: get_drop_stats(drop_id, db))
+
+@router.get("/{drop_id}/events")
+async def drop_event_stream(
+    drop_id: int,
+    runner: DBRunner = Depends(get_read_runner),
+    current_user: Optional[UserPrincipal] = Depends(get_optional_user)
+):
+    """Canlı stok, claim window ve (token varsa) sıra olayları (Server-Sent Events)"""
+    user_ids = {current_user.id} if current_user else set()
+    snapshot = await runner.run(lambda db: load_drop_snapshot(db, drop_id, user_ids))
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    # Request session'ı stream boyunca bağlantı tutmasın; sonraki okumaları yayıncı yapar
+    await runner.release()
+
+    try:
+        subscriber = drop_events.subscribe(
+            drop_id, current_user.id if current_user else None, initial=snapshot
+        )
+    except SubscriberLimitReached:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many subscribers for this drop",
+            headers={"Retry-After": "5"}
+        )
+
+    return StreamingResponse(
+        drop_events.stream(subscriber, settings.sse_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@router.post("/{drop_id}/claim", response_model=ClaimResponse)
-def claim_drop_item(
+@router.post(
+    "/{drop_id}/claim",
+    response_model=ClaimResponse,
+    dependencies=[Depends(admission_guard("claim"))]
+)
+async def claim_drop_item(
     drop_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    runner: DBRunner = Depends(get_db_runner),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Drop'u claim et"""
-    return claim_drop(drop_id, current_user, db)
+    result = await runner.run(lambda db: claim_drop(drop_id, current_user, db))
+    pin_to_primary(current_user.id, response)
+    return result
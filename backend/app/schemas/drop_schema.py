@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Literal, Optional
 
 
 class DropCreate(BaseModel):
@@ -9,6 +9,8 @@ class DropCreate(BaseModel):
     total_stock: int = Field(..., gt=0)
     claim_window_start: datetime
     claim_window_end: datetime
+    stock_shards: int = Field(1, ge=1, le=64)
+    allocation_mode: Literal["first_come", "priority"] = "first_come"
 
 
 class DropUpdate(BaseModel):
@@ -18,6 +20,8 @@ class DropUpdate(BaseModel):
     claim_window_start: Optional[datetime] = None
     claim_window_end: Optional[datetime] = None
     status: Optional[str] = None
+    stock_shards: Optional[int] = Field(None, ge=1, le=64)
+    allocation_mode: Optional[Literal["first_come", "priority"]] = None
 
 
 class DropResponse(BaseModel):
@@ -30,7 +34,28 @@ class DropResponse(BaseModel):
     claim_window_end: datetime
     status: str
     created_at: datetime
+    stock_shards: int = 1
+    allocation_mode: str = "first_come"
+    allocated_at: Optional[datetime] = None
     user_joined: bool = False
 
     class Config:
         from_attributes = True
+
+class DropStatsResponse(BaseModel):
+    drop_id: int
+    total_stock: int
+    remaining_stock: int
+    waitlist_size: int
+    waiting: int
+    claimed: int
+    expired: int
+    joins_total: int
+    leaves_total: int
+    joins_last_minute: float
+    reconciled_at: Optional[datetime] = None
+
+class DropStatsReconcileResponse(BaseModel):
+    drop_id: int
+    drift: Dict[str, int]
+    reconciled_at: datetime
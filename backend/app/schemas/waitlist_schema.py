@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class WaitlistJoinResponse(BaseModel):
     message: str
@@ -14,3 +14,38 @@ class ClaimResponse(BaseModel):
     message: str
     claim_code: str
     expires_at: datetime
+
+class WaitlistPositionResponse(BaseModel):
+    drop_id: int
+    status: str
+    position: Optional[int] = None
+    waitlist_size: int
+    remaining_stock: int
+    within_stock: bool
+    priority_score: float
+
+class AllocationResponse(BaseModel):
+    drop_id: int
+    allocated: int
+    allocated_at: datetime
+
+class RescoreResponse(BaseModel):
+    drop_id: int
+    rescored: int
+    reference_time: datetime
+
+class WaitlistEntryResponse(BaseModel):
+    id: int
+    user_id: int
+    user_email: str
+    priority_score: float
+    status: str
+    signup_latency_ms: Optional[int] = None
+    account_age_days: Optional[int] = None
+    rapid_actions_count: Optional[int] = None
+    created_at: datetime
+    claimed_at: Optional[datetime] = None
+
+class WaitlistPage(BaseModel):
+    items: List[WaitlistEntryResponse]
+    next_cursor: Optional[str] = None
@@ -1,9 +1,20 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
 from fastapi import HTTPException, status
 from app.models.user import User
 from app.schemas.user_schema import UserSignup, UserLogin, TokenResponse, UserResponse
-from app.utils.jwt_handler import hash_password, verify_password, create_access_token
+from app.utils.jwt_handler import create_access_token
+from app.utils.password_hasher import HashingOverloaded, password_hasher
+
+
+def _overloaded(exc: HashingOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry",
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 
 def signup_user(signup_data: UserSignup, db: Session) -> TokenResponse:
@@ -16,8 +27,11 @@ def signup_user(signup_data: UserSignup, db: Session) -> TokenResponse:
             detail="Email already registered"
         )
 
-    # Kullanıcı oluştur
-    hashed_password = hash_password(signup_data.password)
+    # Kullanıcı oluştur (pbkdf2 process pool'da)
+    try:
+        hashed_password = password_hasher.hash(signup_data.password)
+    except HashingOverloaded as exc:
+        raise _overloaded(exc)
     new_user = User(
         email=signup_data.email,
         password=hashed_password
@@ -47,12 +61,26 @@ def login_user(login_data: UserLogin, db: Session) -> TokenResponse:
     """Kullanıcı girişi"""
     user = db.query(User).filter(User.email == login_data.email).first()
 
-    if not user or not verify_password(login_data.password, user.password):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = password_hasher.verify_and_update(login_data.password, user.password)
+        except HashingOverloaded as exc:
+            raise _overloaded(exc)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
 
+    # Hash maliyeti (password_hash_rounds) değiştiyse yeni maliyetle kaydet
+    if new_hash:
+        user.password = new_hash
+        db.commit()
+        db.refresh(user)
+        password_hasher.record_rehash()
+
     # Token oluştur
     access_token = create_access_token(data={"sub": user.id})
 
@@ -60,3 +88,72 @@ def login_user(login_data: UserLogin, db: Session) -> TokenResponse:
         access_token=access_token,
         user=UserResponse.model_validate(user)
     )
+
+
+async def signup_user_async(signup_data: UserSignup, db: AsyncSession) -> TokenResponse:
+    """Yeni kullanıcı kaydı (async session, hash process pool'da)"""
+    result = await db.execute(select(User.id).where(User.email == signup_data.email))
+    if result.first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already registered"
+        )
+
+    # pbkdf2 CPU yoğun: event loop'u bloklamasın
+    try:
+        hashed_password = await password_hasher.hash_async(signup_data.password)
+    except HashingOverloaded as exc:
+        raise _overloaded(exc)
+    new_user = User(
+        email=signup_data.email,
+        password=hashed_password
+    )
+
+    try:
+        db.add(new_user)
+        await db.commit()
+        await db.refresh(new_user)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already registered"
+        )
+
+    access_token = create_access_token(data={"sub": new_user.id})
+
+    return TokenResponse(
+        access_token=access_token,
+        user=UserResponse.model_validate(new_user)
+    )
+
+
+async def login_user_async(login_data: UserLogin, db: AsyncSession) -> TokenResponse:
+    """Kullanıcı girişi (async session, doğrulama process pool'da)"""
+    result = await db.execute(select(User).where(User.email == login_data.email))
+    user = result.scalar_one_or_none()
+
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await password_hasher.verify_and_update_async(login_data.password, user.password)
+        except HashingOverloaded as exc:
+            raise _overloaded(exc)
+
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password"
+        )
+
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+        password_hasher.record_rehash()
+
+    access_token = create_access_token(data={"sub": user.id})
+
+    return TokenResponse(
+        access_token=access_token,
+        user=UserResponse.model_validate(user)
+    )
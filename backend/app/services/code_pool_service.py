@@ -0,0 +1,97 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert
+from typing import List, Set
+from app.models.claim_code import ClaimCode
+from app.models.claim_code_pool import ClaimCodePool
+from app.utils.seed import generate_claim_codes
+
+# Havuz üretiminde tek seferde işlenen kod sayısı
+MINT_CHUNK_SIZE = 5000
+
+
+def _existing_codes(db: Session, codes: List[str]) -> Set[str]:
+    """Verilen kodlardan veritabanında zaten bulunanlar"""
+    used = db.query(ClaimCode.code).filter(ClaimCode.code.in_(codes)).all()
+    pooled = db.query(ClaimCodePool.code).filter(ClaimCodePool.code.in_(codes)).all()
+    return {row[0] for row in used} | {row[0] for row in pooled}
+
+
+def _unique_codes(db: Session, count: int) -> List[str]:
+    """Kendi içinde ve veritabanıyla çakışmayan count adet kod üret"""
+    codes: Set[str] = set()
+    while len(codes) < count:
+        candidates = set(generate_claim_codes(count - len(codes))) - codes
+        candidates -= _existing_codes(db, list(candidates))
+        codes |= candidates
+    return list(codes)
+
+
+def mint_claim_codes(db: Session, drop_id: int, count: int) -> int:
+    """
+    Drop için count adet çakışmasız claim code üretip havuza ekle
+
+    Kodlar parça parça üretilir, hem parça içi hem de claim_codes /
+    claim_code_pool tablolarıyla çakışmalar elenir. Commit çağırana aittir.
+    """
+    minted = 0
+    while minted < count:
+        chunk = _unique_codes(db, min(MINT_CHUNK_SIZE, count - minted))
+        db.execute(insert(ClaimCodePool), [
+            {"drop_id": drop_id, "code": code} for code in chunk
+        ])
+        minted += len(chunk)
+    return minted
+
+
+def pop_claim_codes(db: Session, drop_id: int, count: int) -> List[str]:
+    """
+    Havuzdan count adet kod çek ve havuzdan sil
+
+    Postgres'te SKIP LOCKED ile eşzamanlı claim'ler farklı satırları alır.
+    Havuz yetmezse (ör. havuzsuz eski drop) eksik kodlar anında üretilir.
+    """
+    if count <= 0:
+        return []
+
+    rows = db.query(ClaimCodePool.id, ClaimCodePool.code).filter(
+        ClaimCodePool.drop_id == drop_id
+    ).order_by(ClaimCodePool.id).limit(count).with_for_update(skip_locked=True).all()
+
+    if rows:
+        db.query(ClaimCodePool).filter(
+            ClaimCodePool.id.in_([row.id for row in rows])
+        ).delete(synchronize_session=False)
+
+    codes = [row.code for row in rows]
+    if len(codes) < count:
+        codes.extend(_unique_codes(db, count - len(codes)))
+    return codes
+
+
+def pop_claim_code(db: Session, drop_id: int) -> str:
+    """Havuzdan tek kod çek"""
+    return pop_claim_codes(db, drop_id, 1)[0]
+
+
+def resize_claim_code_pool(db: Session, drop_id: int, target: int):
+    """Havuzu kalan stok kadar koda tamamla ya da fazlasını sil"""
+    current = db.query(func.count(ClaimCodePool.id)).filter(
+        ClaimCodePool.drop_id == drop_id
+    ).scalar()
+
+    if target > current:
+        mint_claim_codes(db, drop_id, target - current)
+    elif target < current:
+        surplus = db.query(ClaimCodePool.id).filter(
+            ClaimCodePool.drop_id == drop_id
+        ).order_by(ClaimCodePool.id.desc()).limit(current - max(target, 0)).subquery()
+        db.query(ClaimCodePool).filter(
+            ClaimCodePool.id.in_(surplus.select())
+        ).delete(synchronize_session=False)
+
+
+def delete_claim_code_pool(db: Session, drop_id: int):
+    """Drop silinirken havuzu toplu sil"""
+    db.query(ClaimCodePool).filter(
+        ClaimCodePool.drop_id == drop_id
+    ).delete(synchronize_session=False)
@@ -1,23 +1,134 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, tuple_
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set, Tuple
 from datetime import datetime
-from app.models.drop import Drop, DropStatus
+import hashlib
+from app.models.drop import AllocationMode, Drop, DropStatus
 from app.models.waitlist import Waitlist, WaitlistStatus
-from app.models.user import User
+from app.utils.principal import UserPrincipal
 from app.schemas.drop_schema import DropCreate, DropUpdate, DropResponse
+from app.services.stock_service import (
+    configure_stock_shards, delete_stock_shards, fill_claimed_count, sharded_claimed_counts
+)
+from app.services.waitlist_service import joined_drop_cache, promote_waiting
+from app.services.stats_service import init_drop_stats
+from app.config import settings
+from app.utils.etag import compute_etag
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.rank_index import rank_indexes
+from app.utils.response_cache import drop_response_cache
+from app.utils.serialization import FlaggedObject
+from app.services.code_pool_service import (
+    mint_claim_codes, resize_claim_code_pool, delete_claim_code_pool
+)
 
 
-def get_drops(
+def _joined_drop_ids(db: Session, user_id: int, drop_ids: Iterable[int]) -> Set[int]:
+    """
+    drop_ids içinden kullanıcının katıldıkları
+
+    Önbellek açıksa kullanıcının tüm katılımları tek sorguyla yüklenip
+    saklanır (join/leave günceller); kapalıysa sayfa için tek IN sorgusu.
+    """
+    drop_ids = set(drop_ids)
+    if not drop_ids:
+        return set()
+
+    if settings.joined_cache_ttl_seconds > 0:
+        joined = joined_drop_cache.get(user_id)
+        if joined is None:
+            joined = frozenset(
+                drop_id for (drop_id,) in
+                db.query(Waitlist.drop_id).filter(Waitlist.user_id == user_id).all()
+            )
+            joined_drop_cache.set(user_id, joined)
+        return drop_ids & joined
+
+    return {
+        drop_id for (drop_id,) in db.query(Waitlist.drop_id).filter(
+            and_(
+                Waitlist.user_id == user_id,
+                Waitlist.drop_id.in_(drop_ids)
+            )
+        ).all()
+    }
+
+
+# DropResponse alanları (user_joined hariç) için kolonlar; satırlar ORM nesnesi
+# ve pydantic doğrulaması olmadan doğrudan JSON'a çevrilir
+DROP_FIELDS = tuple(name for name in DropResponse.model_fields if name != "user_joined")
+DROP_COLUMNS = tuple(getattr(Drop, name) for name in DROP_FIELDS)
+
+# Claim window filtreleri (hepsi claim_window_start aralığı ile indeksten okunur)
+DROP_WINDOWS = ("upcoming", "open", "closed")
+
+
+def _etag_for(base_hash: str, joined: Set[int]) -> str:
+    """Paylaşılan kısmın hash'i + kullanıcının katıldığı drop'lar"""
+    if not joined:
+        return compute_etag(base_hash.encode())
+    return compute_etag(f"{base_hash}|{','.join(map(str, sorted(joined)))}".encode())
+
+
+def _serialize_rows(db: Session, rows) -> Tuple[Tuple[FlaggedObject, ...], str]:
+    """Kolon satırlarını tek geçişte JSON parçalarına çevir, içerik hash'i ile döndür"""
+    rows = [dict(zip(DROP_FIELDS, row)) for row in rows]
+
+    # Shard'lı drop'ların claimed_count'u tek sorguda
+    shard_counts = sharded_claimed_counts(db, [r["id"] for r in rows if r["stock_shards"] > 1])
+    for row in rows:
+        if row["id"] in shard_counts:
+            row["claimed_count"] = shard_counts[row["id"]]
+
+    items = tuple(FlaggedObject(row, "user_joined") for row in rows)
+    base_hash = hashlib.blake2b(b"\n".join(item.head for item in items), digest_size=16).hexdigest()
+    return items, base_hash
+
+
+def _window_filter(query, window: str, now: datetime):
+    """upcoming / open / closed filtresini uygula"""
+    if window == "upcoming":
+        return query.filter(Drop.claim_window_start > now)
+    if window == "open":
+        # Henüz bitmemiş drop'lar idx_drop_status_window_end aralığıyla bulunur
+        return query.filter(and_(Drop.claim_window_end >= now, Drop.claim_window_start <= now))
+    return query.filter(Drop.claim_window_end < now)
+
+
+def _cached_drops_page(
         db: Session,
-        current_user: Optional[User] = None,
-        status_filter: Optional[str] = None,
-        limit: int = 20,
-        offset: int = 0
-) -> List[DropResponse]:
-    """Aktif drop'ları listele"""
-    query = db.query(Drop)
+        status_filter: Optional[str],
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        window: Optional[str]
+) -> Tuple[Tuple[FlaggedObject, ...], str, Optional[str]]:
+    """
+    Kullanıcıdan bağımsız sayfa: (JSON parçaları, içerik hash'i, sonraki cursor)
+
+    Sıralama (claim_window_start DESC, id DESC); cursor verilirse offset yerine
+    idx_drop_status_window üzerinde keyset kullanılır. Sonuç sürümlü önbellekte
+    tutulur.
+    """
+    if window is not None and window not in DROP_WINDOWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid window filter"
+        )
+
+    if cursor and offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either cursor or offset"
+        )
+
+    cache_key = drop_response_cache.list_key(status_filter, limit, offset, cursor, window)
+    cached = drop_response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    query = db.query(*DROP_COLUMNS)
 
     # Status filter
     if status_filter:
@@ -25,54 +136,114 @@ def get_drops(
     else:
         query = query.filter(Drop.status == DropStatus.ACTIVE)
 
-    drops = query.order_by(Drop.claim_window_start.desc()).limit(limit).offset(offset).all()
+    if window:
+        query = _window_filter(query, window, datetime.utcnow())
 
-    # User joined kontrolü
-    drop_responses = []
-    for drop in drops:
-        drop_dict = DropResponse.model_validate(drop).model_dump()
+    if cursor:
+        try:
+            last_start, last_id = decode_cursor(cursor, 2, (str, int))
+            last_start = datetime.fromisoformat(last_start)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.filter(
+            tuple_(Drop.claim_window_start, Drop.id) < tuple_(last_start, last_id)
+        )
 
-        # Kullanıcı bu drop'a katıldı mı?
-        if current_user:
-            waitlist_entry = db.query(Waitlist).filter(
-                and_(
-                    Waitlist.drop_id == drop.id,
-                    Waitlist.user_id == current_user.id
-                )
-            ).first()
-            drop_dict['user_joined'] = waitlist_entry is not None
+    # Bir fazla satır: sonraki sayfa var mı?
+    rows = query.order_by(
+        Drop.claim_window_start.desc(), Drop.id.desc()
+    ).limit(limit + 1).offset(offset).all()
 
-        drop_responses.append(DropResponse(**drop_dict))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].claim_window_start.isoformat(), rows[-1].id)
 
-    return drop_responses
+    items, base_hash = _serialize_rows(db, rows)
+    cached = (items, base_hash, next_cursor)
+    drop_response_cache.set(cache_key, cached)
+    return cached
 
 
-def get_drop_by_id(db: Session, drop_id: int, current_user: Optional[User] = None) -> DropResponse:
-    """Drop detayı getir"""
-    drop = db.query(Drop).filter(Drop.id == drop_id).first()
+def list_drops_page(
+        db: Session,
+        current_user: Optional[UserPrincipal] = None,
+        status_filter: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        window: Optional[str] = None
+) -> Tuple[bytes, str, Optional[str]]:
+    """Drop listesi JSON bytes olarak, ETag ve sonraki sayfa cursor'ı ile"""
+    items, base_hash, next_cursor = _cached_drops_page(db, status_filter, limit, offset, cursor, window)
 
-    if not drop:
+    # User joined kontrolü (sayfa için tek sorgu / önbellek)
+    joined = _joined_drop_ids(db, current_user.id, [i.fields["id"] for i in items]) if current_user else set()
+
+    body = b"[" + b",".join(item.render(item.fields["id"] in joined) for item in items) + b"]"
+    return body, _etag_for(base_hash, joined), next_cursor
+
+
+def get_drops(
+        db: Session,
+        current_user: Optional[UserPrincipal] = None,
+        status_filter: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+) -> List[DropResponse]:
+    """Aktif drop'ları listele"""
+    items, _, _ = _cached_drops_page(db, status_filter, limit, offset, None, None)
+    joined = _joined_drop_ids(db, current_user.id, [i.fields["id"] for i in items]) if current_user else set()
+
+    return [
+        DropResponse(**item.fields, user_joined=item.fields["id"] in joined)
+        for item in items
+    ]
+
+
+def _cached_drop(db: Session, drop_id: int) -> Tuple[FlaggedObject, str]:
+    """Kullanıcıdan bağımsız drop detayı (JSON parçası, içerik hash'i)"""
+    cache_key = drop_response_cache.drop_key(drop_id)
+    cached = drop_response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    row = db.query(*DROP_COLUMNS).filter(Drop.id == drop_id).first()
+
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Drop not found"
         )
 
-    drop_dict = DropResponse.model_validate(drop).model_dump()
+    items, base_hash = _serialize_rows(db, [row])
+    cached = (items[0], base_hash)
+    drop_response_cache.set(cache_key, cached)
+    return cached
+
+
+def drop_detail(db: Session, drop_id: int, current_user: Optional[UserPrincipal] = None) -> Tuple[bytes, str]:
+    """Drop detayı JSON bytes olarak, ETag ile"""
+    item, base_hash = _cached_drop(db, drop_id)
 
     # User joined kontrolü
-    if current_user:
-        waitlist_entry = db.query(Waitlist).filter(
-            and_(
-                Waitlist.drop_id == drop.id,
-                Waitlist.user_id == current_user.id
-            )
-        ).first()
-        drop_dict['user_joined'] = waitlist_entry is not None
+    joined = _joined_drop_ids(db, current_user.id, [drop_id]) if current_user else set()
+
+    return item.render(drop_id in joined), _etag_for(base_hash, joined)
+
 
-    return DropResponse(**drop_dict)
+def get_drop_by_id(db: Session, drop_id: int, current_user: Optional[UserPrincipal] = None) -> DropResponse:
+    """Drop detayı getir"""
+    item, _ = _cached_drop(db, drop_id)
+    joined = _joined_drop_ids(db, current_user.id, [drop_id]) if current_user else set()
+
+    return DropResponse(**item.fields, user_joined=drop_id in joined)
 
 
-def create_drop(drop_data: DropCreate, creator: User, db: Session) -> Drop:
+def create_drop(drop_data: DropCreate, creator: UserPrincipal, db: Session) -> Drop:
     """Yeni drop oluştur (Admin)"""
     # Zaman kontrolü
     if drop_data.claim_window_start >= drop_data.claim_window_end:
@@ -87,14 +258,30 @@ def create_drop(drop_data: DropCreate, creator: User, db: Session) -> Drop:
         total_stock=drop_data.total_stock,
         claim_window_start=drop_data.claim_window_start,
         claim_window_end=drop_data.claim_window_end,
+        stock_shards=drop_data.stock_shards,
+        allocation_mode=AllocationMode(drop_data.allocation_mode),
         created_by_user_id=creator.id
     )
 
     db.add(new_drop)
+    db.flush()
+
+    # Shard'lı stok satırlarını oluştur
+    if new_drop.stock_shards > 1:
+        configure_stock_shards(db, new_drop)
+
+    # Claim code havuzunu önceden doldur
+    mint_claim_codes(db, new_drop.id, new_drop.total_stock)
+
+    # Sayaçlar baştan kurulu; ilk okuma yazmaz
+    init_drop_stats(db, new_drop.id)
+
     db.commit()
+    drop_response_cache.invalidate(new_drop.id)
     db.refresh(new_drop)
 
-    return new_drop
+    # Shard'lı drop'ta satırdaki claimed_count anlık görüntüdür
+    return fill_claimed_count(db, new_drop)
 
 
 def update_drop(drop_id: int, drop_data: DropUpdate, db: Session) -> Drop:
@@ -118,13 +305,40 @@ def update_drop(drop_id: int, drop_data: DropUpdate, db: Session) -> Drop:
                 detail="Claim window start must be before end time"
             )
 
+    # Dağıtım yapıldıktan sonra mod değiştirilemez
+    if 'allocation_mode' in update_data and drop.allocated_at is not None:
+        if update_data['allocation_mode'] != drop.allocation_mode.value:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot change allocation mode after allocation"
+            )
+
     for key, value in update_data.items():
         setattr(drop, key, value)
 
+    # Stok veya shard sayısı değiştiyse shard'ları yeniden dağıt
+    if 'total_stock' in update_data or 'stock_shards' in update_data:
+        configure_stock_shards(db, drop)
+
+    # Kod havuzunu kalan stoka göre ayarla (claimed_count shard toplamıyla güncel)
+    if 'total_stock' in update_data:
+        resize_claim_code_pool(db, drop.id, drop.total_stock - drop.claimed_count)
+
     db.commit()
+    drop_response_cache.invalidate(drop_id)
+
+    # Kapanan drop'un sıra indeksi artık sorgulanmaz
+    if drop.status != DropStatus.ACTIVE:
+        rank_indexes.invalidate(drop_id)
+
+    # Artan stok sıradaki kullanıcılara (priority drop)
+    if 'total_stock' in update_data:
+        promote_waiting(db, drop_id)
+
     db.refresh(drop)
 
-    return drop
+    # Shard'lı drop'ta satırdaki claimed_count anlık görüntüdür
+    return fill_claimed_count(db, drop)
 
 
 def delete_drop(drop_id: int, db: Session):
@@ -137,5 +351,9 @@ def delete_drop(drop_id: int, db: Session):
             detail="Drop not found"
         )
 
+    delete_stock_shards(db, drop_id)
+    delete_claim_code_pool(db, drop_id)
     db.delete(drop)
     db.commit()
+    drop_response_cache.invalidate(drop_id)
+    rank_indexes.invalidate(drop_id)
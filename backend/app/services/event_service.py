@@ -0,0 +1,64 @@
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+from app.database import read_session
+from app.models.drop import Drop
+from app.services.stock_service import get_claimed_count
+from app.services.waitlist_service import get_waitlist_positions
+from app.utils.event_stream import DropEventBroker
+from app.config import settings
+
+
+def _window_state(drop: Drop, now: datetime) -> str:
+    if now < drop.claim_window_start:
+        return "upcoming"
+    if now > drop.claim_window_end:
+        return "closed"
+    return "open"
+
+
+def load_drop_snapshot(db: Session, drop_id: int, user_ids: Set[int],
+                       now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Yayın için drop'un stok, claim window ve abonelerin sıra durumu"""
+    drop = db.query(Drop).filter(Drop.id == drop_id).first()
+    if not drop:
+        return None
+
+    now = now or datetime.utcnow()
+    claimed_count = get_claimed_count(db, drop)
+    positions = get_waitlist_positions(db, drop, user_ids, claimed_count)
+
+    return {
+        "stock": {
+            "drop_id": drop.id,
+            "total_stock": drop.total_stock,
+            "claimed_count": claimed_count,
+            "remaining_stock": max(drop.total_stock - claimed_count, 0)
+        },
+        "window": {
+            "drop_id": drop.id,
+            "state": _window_state(drop, now),
+            "status": drop.status.value,
+            "claim_window_start": drop.claim_window_start.isoformat(),
+            "claim_window_end": drop.claim_window_end.isoformat()
+        },
+        "positions": {
+            user_id: position.model_dump(mode="json")
+            for user_id, position in positions.items()
+        }
+    }
+
+
+def _load_with_session(drop_id: int, user_ids: Set[int]) -> Optional[Dict[str, Any]]:
+    db = read_session()
+    try:
+        return load_drop_snapshot(db, drop_id, user_ids)
+    finally:
+        db.close()
+
+
+drop_events = DropEventBroker(
+    loader=_load_with_session,
+    interval_ms=settings.sse_interval_ms,
+    max_subscribers_per_drop=settings.sse_max_subscribers_per_drop
+)
@@ -0,0 +1,170 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, update
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+from app.models.drop import Drop
+from app.models.waitlist import Waitlist, WaitlistStatus
+from app.models.claim_code import ClaimCode
+from app.services.code_pool_service import mint_claim_codes
+from app.services.stats_service import batch_stats_key, record_drop_stats
+from app.services.stock_service import release_stock
+from app.services.waitlist_service import position_cache, promote_waiting
+from app.utils.response_cache import drop_response_cache
+from app.config import settings
+
+
+class SweepStats:
+    """Expiry sweeper throughput metrikleri"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.batches = 0
+        self.expired = 0
+        self.released = 0
+        self.busy_seconds = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self.last_expired = 0
+        self.last_duration_ms = 0
+
+    def record(self, batches: int, expired: int, released: int, duration: float):
+        with self._lock:
+            self.runs += 1
+            self.batches += batches
+            self.expired += expired
+            self.released += released
+            self.busy_seconds += duration
+            self.last_run_at = datetime.utcnow()
+            self.last_expired = expired
+            self.last_duration_ms = int(duration * 1000)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "batches": self.batches,
+                "expired": self.expired,
+                "released": self.released,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_expired": self.last_expired,
+                "last_duration_ms": self.last_duration_ms,
+                "expired_per_second": round(self.expired / self.busy_seconds, 1) if self.busy_seconds else 0.0
+            }
+
+
+expiry_stats = SweepStats()
+
+
+def _sweep_batch(db: Session, now: datetime, batch_size: int) -> Optional[Tuple[int, Dict[int, int]]]:
+    """
+    Tek batch: süresi dolan kodları bul, kayıtları EXPIRED yap, stoku geri ver
+
+    Kısa bir transaction'dır; drops/shard satırları en sonda güncellenir.
+    İşlenecek kod kalmadıysa None, yoksa (EXPIRED yapılan kayıt sayısı,
+    drop_id -> geri verilen stok) döner.
+    """
+    codes = db.query(ClaimCode.id, ClaimCode.waitlist_id).filter(
+        and_(
+            ClaimCode.is_used.is_(False),
+            ClaimCode.expires_at <= now
+        )
+    ).order_by(ClaimCode.expires_at).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    if not codes:
+        db.rollback()
+        return None
+
+    waitlist_ids = [c.waitlist_id for c in codes]
+    entries = db.query(Waitlist.id, Waitlist.drop_id, Waitlist.user_id).filter(
+        and_(
+            Waitlist.id.in_(waitlist_ids),
+            Waitlist.status == WaitlistStatus.CLAIMED
+        )
+    ).all()
+
+    if entries:
+        db.execute(
+            update(Waitlist)
+            .where(
+                and_(
+                    Waitlist.id.in_([e.id for e in entries]),
+                    Waitlist.status == WaitlistStatus.CLAIMED
+                )
+            )
+            .values(status=WaitlistStatus.EXPIRED)
+            .execution_options(synchronize_session=False)
+        )
+
+    # Kodlar silinir; aynı kod bir daha taranmaz
+    db.query(ClaimCode).filter(
+        ClaimCode.id.in_([c.id for c in codes])
+    ).delete(synchronize_session=False)
+
+    per_drop = Counter(e.drop_id for e in entries)
+    drops = db.query(Drop).filter(Drop.id.in_(per_drop)).order_by(Drop.id).all()
+
+    # Geri dönecek stok için havuza yeni kodlar; drops satırı kilitlenmeden önce
+    for drop in drops:
+        mint_claim_codes(db, drop.id, per_drop[drop.id])
+        record_drop_stats(db, drop.id, batch_stats_key(), claimed=-per_drop[drop.id], expired=per_drop[drop.id])
+
+    # Stok iadesi en son, drop bazında sabit sırada (deadlock önlemi); kilit sadece commit'e kadar
+    released: Dict[int, int] = {}
+    for drop in drops:
+        released[drop.id] = release_stock(db, drop, per_drop[drop.id])
+
+    db.commit()
+
+    for entry in entries:
+        position_cache.pop((entry.drop_id, entry.user_id))
+    for drop_id in released:
+        drop_response_cache.invalidate(drop_id)
+
+    return len(entries), released
+
+
+def sweep_expired_claims(
+        db: Session,
+        now: Optional[datetime] = None,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None
+) -> Dict[int, int]:
+    """
+    Süresi dolmuş, kullanılmamış claim code'ları temizle
+
+    Kodlar idx_claim_code_expiry üzerinden batch_size'lık gruplarla okunur;
+    her batch ayrı transaction'dır. Ardından stoku geri dönen priority drop'larda
+    sıradaki kullanıcılar terfi edilir. Drop başına geri verilen stok döner.
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.expiry_sweep_batch_size
+    max_batches = max_batches or settings.expiry_sweep_max_batches
+
+    started = time.perf_counter()
+    totals: Counter = Counter()
+    expired = 0
+    batches = 0
+
+    while batches < max_batches:
+        result = _sweep_batch(db, now, batch_size)
+        if result is None:
+            break
+        batches += 1
+        expired += result[0]
+        totals.update(result[1])
+
+    expiry_stats.record(batches, expired, sum(totals.values()), time.perf_counter() - started)
+
+    # Geri dönen stok sıradaki kullanıcılara (priority drop'lar)
+    for drop_id, released in totals.items():
+        if released:
+            promote_waiting(db, drop_id, now)
+
+    return dict(totals)
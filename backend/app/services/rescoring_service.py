@@ -0,0 +1,136 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Float, Integer, and_, bindparam, cast, func, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from fastapi import HTTPException, status
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from app.models.drop import Drop
+from app.models.user import User
+from app.models.waitlist import Waitlist, WaitlistStatus
+from app.schemas.waitlist_schema import RescoreResponse
+from app.utils.rank_index import rank_indexes
+from app.utils.seed import calculate_priority_scores
+
+# Tek seferde belleğe alınan / tek UPDATE'e giren kayıt sayısı
+RESCORE_CHUNK_SIZE = 10000
+
+_waitlist_table = Waitlist.__table__
+
+# PostgreSQL: chunk tek UPDATE ile yazılır; değerler unnest ile dizi parametrelerinden gelir
+_rescore_values = func.unnest(
+    cast(bindparam("b_ids"), ARRAY(Integer)),
+    cast(bindparam("b_scores"), ARRAY(Float)),
+    cast(bindparam("b_ages"), ARRAY(Integer))
+).table_valued("id", "score", "age").render_derived(name="v")
+_RESCORE_UPDATE_UNNEST = (
+    update(_waitlist_table)
+    .where(_waitlist_table.c.id == _rescore_values.c.id)
+    .values(
+        priority_score=_rescore_values.c.score,
+        account_age_days=_rescore_values.c.age
+    )
+)
+
+# Diğer dialect'ler: primary key bazlı Core executemany (ORM bulk'un kayıt başı yükü yok)
+_RESCORE_UPDATE = (
+    update(_waitlist_table)
+    .where(_waitlist_table.c.id == bindparam("b_id"))
+    .values(
+        priority_score=bindparam("b_score"),
+        account_age_days=bindparam("b_age")
+    )
+)
+
+
+def _write_scores(db: Session, waitlist_ids, scores, account_age_days):
+    """Chunk skorlarını yaz; PostgreSQL'de tek statement, diğerlerinde executemany"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(_RESCORE_UPDATE_UNNEST, {
+            "b_ids": list(waitlist_ids),
+            "b_scores": scores,
+            "b_ages": account_age_days
+        })
+        return
+
+    db.execute(_RESCORE_UPDATE, [
+        {"b_id": waitlist_id, "b_score": score, "b_age": age}
+        for waitlist_id, score, age in zip(waitlist_ids, scores, account_age_days)
+    ])
+
+
+def rescore_drop(
+        db: Session,
+        drop_id: int,
+        now: Optional[datetime] = None,
+        chunk_size: int = RESCORE_CHUNK_SIZE
+) -> int:
+    """
+    Drop'un WAITING kayıtlarının priority_score'unu yeniden hesapla
+
+    Kayıtlar (drop_id, user_id) unique index'i üzerinden keyset ile chunk
+    chunk okunur, skorlar NumPy ile tek referans zamanına göre hesaplanır ve
+    yazılır; PostgreSQL'de her chunk unnest ile tek UPDATE statement'ıdır.
+    Her chunk ayrı commit edilir; bellek kullanımı chunk_size ile sınırlıdır.
+    Güncellenen kayıt sayısı döner.
+    """
+    now = now or datetime.utcnow()
+    last_user_id = 0
+    rescored = 0
+
+    while True:
+        rows = db.query(
+            Waitlist.id,
+            Waitlist.user_id,
+            Waitlist.signup_latency_ms,
+            Waitlist.rapid_actions_count,
+            User.created_at
+        ).join(
+            User, User.id == Waitlist.user_id
+        ).filter(
+            and_(
+                Waitlist.drop_id == drop_id,
+                Waitlist.status == WaitlistStatus.WAITING,
+                Waitlist.user_id > last_user_id
+            )
+        ).order_by(Waitlist.user_id).limit(chunk_size).all()
+
+        if not rows:
+            break
+
+        waitlist_ids, user_ids, latencies, rapid_actions, created_at = zip(*rows)
+
+        # NULL değerler 0 sayılır
+        scores, account_age_days = calculate_priority_scores(
+            user_created_at=np.array(created_at, dtype="datetime64[us]"),
+            signup_latency_ms=np.nan_to_num(np.array(latencies, dtype=np.float64)),
+            rapid_actions_count=np.nan_to_num(np.array(rapid_actions, dtype=np.float64)),
+            now=now
+        )
+
+        _write_scores(db, waitlist_ids, scores.tolist(), account_age_days.tolist())
+        db.commit()
+
+        rescored += len(rows)
+        last_user_id = user_ids[-1]
+
+    # Sıralama değişti, indeks bir sonraki sorguda yeniden kurulur
+    rank_indexes.invalidate(drop_id)
+
+    return rescored
+
+
+def run_rescore(drop_id: int, db: Session) -> RescoreResponse:
+    """Drop waitlist'ini yeniden skorla (Admin)"""
+    drop = db.query(Drop.id).filter(Drop.id == drop_id).first()
+
+    if not drop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    now = datetime.utcnow()
+    rescored = rescore_drop(db, drop_id, now)
+
+    return RescoreResponse(drop_id=drop_id, rescored=rescored, reference_time=now)
@@ -0,0 +1,287 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, case, func, select, update
+from fastapi import HTTPException, status
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import random
+from app.models.drop import Drop, DropStatus
+from app.models.drop_stats import DropStatsShard
+from app.models.waitlist import Waitlist, WaitlistStatus
+from app.schemas.drop_schema import DropStatsReconcileResponse, DropStatsResponse
+from app.services.stock_service import get_claimed_count
+from app.config import settings
+
+# Sayaç kolonu -> waitlist durumu
+STATUS_COLUMNS = {
+    "waiting_count": WaitlistStatus.WAITING,
+    "claimed_count": WaitlistStatus.CLAIMED,
+    "expired_count": WaitlistStatus.EXPIRED,
+}
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def batch_stats_key() -> int:
+    """
+    Kullanıcıya bağlı olmayan toplu güncellemeler (batch claim, dağıtım, sweep) için shard anahtarı
+
+    Rastgele seçilir; aynı drop'un eşzamanlı batch'leri (farklı worker'larda da)
+    tek shard satırında sıraya girmez.
+    """
+    return random.randrange(settings.drop_stats_shards)
+
+
+def _epoch_minute(now: datetime) -> int:
+    """UTC (naive) zamanın epoch dakikası"""
+    return int((now - _EPOCH).total_seconds() // 60)
+
+
+def record_drop_stats(db: Session, drop_id: int, key: int, *, waiting: int = 0, claimed: int = 0,
+                      expired: int = 0, joins: int = 0, leaves: int = 0,
+                      now: Optional[datetime] = None):
+    """
+    Drop sayaçlarını aynı transaction içinde güncelle
+
+    key % drop_stats_shards shard'ına tek UPDATE yazılır; commit'ten hemen
+    önce çağrılmalı (satır kilidi sadece UPDATE -> COMMIT arasında tutulur).
+    Shard satırları henüz yoksa bir şey yapılmaz, ilk okuma/reconcile kurar.
+    Commit çağırana aittir.
+    """
+    values = {}
+    for column, delta in (
+        ("waiting_count", waiting),
+        ("claimed_count", claimed),
+        ("expired_count", expired),
+        ("joins_total", joins),
+        ("leaves_total", leaves),
+    ):
+        if delta:
+            values[column] = getattr(DropStatsShard, column) + delta
+
+    if joins:
+        # Dakika kovası değiştiyse bu kova önceki olur; SET ifadeleri eski değerleri okur
+        minute = _epoch_minute(now or datetime.utcnow())
+        window_start = DropStatsShard.join_window_start
+        values["join_window_prev_count"] = case(
+            (window_start == minute, DropStatsShard.join_window_prev_count),
+            (window_start == minute - 1, DropStatsShard.join_window_count),
+            else_=0
+        )
+        values["join_window_count"] = case(
+            (window_start == minute, DropStatsShard.join_window_count + joins),
+            else_=joins
+        )
+        values["join_window_start"] = minute
+
+    if not values:
+        return
+
+    db.execute(
+        update(DropStatsShard)
+        .where(
+            and_(
+                DropStatsShard.drop_id == drop_id,
+                DropStatsShard.shard_index == key % settings.drop_stats_shards
+            )
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _shards(db: Session, drop_id: int, lock: bool = False) -> List[DropStatsShard]:
+    query = db.query(DropStatsShard).filter(
+        DropStatsShard.drop_id == drop_id
+    ).order_by(DropStatsShard.shard_index)
+    if lock:
+        query = query.with_for_update()
+    return query.all()
+
+
+def _new_shard(drop_id: int, index: int) -> DropStatsShard:
+    return DropStatsShard(
+        drop_id=drop_id,
+        shard_index=index,
+        waiting_count=0,
+        claimed_count=0,
+        expired_count=0,
+        joins_total=0,
+        leaves_total=0,
+        join_window_start=0,
+        join_window_count=0,
+        join_window_prev_count=0
+    )
+
+
+def init_drop_stats(db: Session, drop_id: int):
+    """Yeni drop için sıfır sayaçlı shard satırlarını ekle (commit çağırana ait)"""
+    for index in range(settings.drop_stats_shards):
+        db.add(_new_shard(drop_id, index))
+
+
+def _waitlist_counts(db: Session, drop_id: int) -> Dict[str, int]:
+    """Durum bazında gerçek waitlist COUNT'ları (kilitsiz)"""
+    counts = dict(
+        db.query(Waitlist.status, func.count(Waitlist.id)).filter(
+            Waitlist.drop_id == drop_id
+        ).group_by(Waitlist.status).all()
+    )
+    return {column: counts.get(waitlist_status, 0) for column, waitlist_status in STATUS_COLUMNS.items()}
+
+
+def _counts_and_sums(db: Session, drop_id: int) -> Dict[str, Tuple[int, int]]:
+    """
+    Kolon başına (gerçek COUNT, shard toplamı)
+
+    İkisi tek sorguda okunur, yani aynı snapshot'tan gelir: sayaç güncellemesi
+    waitlist yazımıyla aynı transaction'da olduğu için aradaki fark, sorgu
+    sırasında commit edilen join/claim'lerden etkilenmez.
+    """
+    columns = []
+    for column, waitlist_status in STATUS_COLUMNS.items():
+        columns.append(
+            select(func.count(Waitlist.id)).where(
+                and_(Waitlist.drop_id == drop_id, Waitlist.status == waitlist_status)
+            ).scalar_subquery()
+        )
+        columns.append(
+            select(func.coalesce(func.sum(getattr(DropStatsShard, column)), 0)).where(
+                DropStatsShard.drop_id == drop_id
+            ).scalar_subquery()
+        )
+    row = db.execute(select(*columns)).one()
+    return {
+        column: (int(row[2 * i]), int(row[2 * i + 1]))
+        for i, column in enumerate(STATUS_COLUMNS)
+    }
+
+
+def reconcile_drop_stats(db: Session, drop_id: int, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Durum sayaçlarını waitlist'teki gerçek COUNT'larla düzelt, farkları döndür
+
+    Sayım kilitsiz yapılır; shard satırları sadece farklar yazılırken kısa
+    süre kilitlenir. Fark mutlak değer olarak değil artım olarak ilk shard'a
+    eklenir, böylece sayım ile kilit arasında commit edilen join/claim'lerin
+    yazdığı artımlar korunur. Eksik shard satırları oluşturulur. Kümülatif
+    join/leave sayıları korunur.
+    """
+    now = now or datetime.utcnow()
+    drift = {
+        column: actual - stored
+        for column, (actual, stored) in _counts_and_sums(db, drop_id).items()
+        if actual != stored
+    }
+
+    shards = _shards(db, drop_id, lock=True)
+    existing = {shard.shard_index for shard in shards}
+    for index in range(settings.drop_stats_shards):
+        if index not in existing:
+            shard = _new_shard(drop_id, index)
+            db.add(shard)
+            shards.append(shard)
+    shards.sort(key=lambda s: s.shard_index)
+
+    for column, delta in drift.items():
+        setattr(shards[0], column, getattr(shards[0], column) + delta)
+
+    if not existing:
+        # İlk kurulum: mevcut kayıtlar join sayılır
+        shards[0].joins_total = sum(drift.values())
+
+    for shard in shards:
+        shard.reconciled_at = now
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Eşzamanlı ilk kurulum; diğer transaction satırları oluşturdu
+        db.rollback()
+        return reconcile_drop_stats(db, drop_id, now)
+    return drift
+
+
+def reconcile_all_drop_stats(db: Session, now: Optional[datetime] = None) -> Dict[int, Dict[str, int]]:
+    """Aktif drop'ların sayaçlarını düzelt (arka plan işi), drift olanları döndür"""
+    drop_ids = [row.id for row in db.query(Drop.id).filter(Drop.status == DropStatus.ACTIVE).all()]
+    drifted: Dict[int, Dict[str, int]] = {}
+    for drop_id in drop_ids:
+        drift = reconcile_drop_stats(db, drop_id, now)
+        if drift:
+            drifted[drop_id] = drift
+    return drifted
+
+
+def _joins_last_minute(shards: List[DropStatsShard], now: datetime) -> float:
+    """Kayan bir dakikalık join sayısı tahmini (önceki kova süre oranında ağırlıklı)"""
+    minute = _epoch_minute(now)
+    elapsed = (now.second + now.microsecond / 1e6) / 60
+    total = 0.0
+    for shard in shards:
+        if shard.join_window_start == minute:
+            total += shard.join_window_count + shard.join_window_prev_count * (1 - elapsed)
+        elif shard.join_window_start == minute - 1:
+            total += shard.join_window_count * (1 - elapsed)
+    return round(total, 1)
+
+
+def get_drop_stats(drop_id: int, db: Session, now: Optional[datetime] = None) -> DropStatsResponse:
+    """
+    Drop sayaçları (COUNT yerine shard satırlarının toplamı)
+
+    Salt okunur: sayaçları henüz kurulmamış (eski) drop'larda değerler
+    waitlist COUNT'larından hesaplanır; kurulum reconcile işine aittir.
+    """
+    drop = db.query(Drop).filter(Drop.id == drop_id).first()
+    if not drop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    now = now or datetime.utcnow()
+    shards = _shards(db, drop_id)
+    if shards:
+        waiting = sum(s.waiting_count for s in shards)
+        claimed = sum(s.claimed_count for s in shards)
+        expired = sum(s.expired_count for s in shards)
+        joins_total = sum(s.joins_total for s in shards)
+        leaves_total = sum(s.leaves_total for s in shards)
+        joins_last_minute = _joins_last_minute(shards, now)
+        reconciled_at = min((s.reconciled_at for s in shards if s.reconciled_at), default=None)
+    else:
+        counts = _waitlist_counts(db, drop_id)
+        waiting, claimed, expired = counts["waiting_count"], counts["claimed_count"], counts["expired_count"]
+        joins_total = waiting + claimed + expired
+        leaves_total = 0
+        joins_last_minute = 0.0
+        reconciled_at = None
+
+    return DropStatsResponse(
+        drop_id=drop_id,
+        total_stock=drop.total_stock,
+        remaining_stock=max(drop.total_stock - get_claimed_count(db, drop), 0),
+        waitlist_size=waiting + claimed + expired,
+        waiting=waiting,
+        claimed=claimed,
+        expired=expired,
+        joins_total=joins_total,
+        leaves_total=leaves_total,
+        joins_last_minute=joins_last_minute,
+        reconciled_at=reconciled_at
+    )
+
+
+def run_reconcile(drop_id: int, db: Session) -> DropStatsReconcileResponse:
+    """Admin: tek drop'un sayaçlarını hemen düzelt"""
+    if not db.query(Drop.id).filter(Drop.id == drop_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    now = datetime.utcnow()
+    drift = reconcile_drop_stats(db, drop_id, now)
+    return DropStatsReconcileResponse(drop_id=drop_id, drift=drift, reconciled_at=now)
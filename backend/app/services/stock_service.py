@@ -0,0 +1,268 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, case, func, update
+from typing import Dict, Iterable, List
+from app.models.drop import Drop
+from app.models.stock_shard import DropStockShard
+
+def _split(amount: int, parts: int) -> List[int]:
+    """amount'u parts parçaya olabildiğince eşit böl"""
+    base, extra = divmod(max(amount, 0), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _conditional_increment(db: Session, stmt) -> bool:
+    """Koşullu UPDATE çalıştır, satır güncellendiyse True"""
+    stmt = stmt.execution_options(synchronize_session=False)
+
+    # RETURNING desteklenmiyorsa (eski SQLite) rowcount'a bak
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(stmt.table.c.id)).first() is not None
+    return db.execute(stmt).rowcount == 1
+
+
+def _reserve_drop_row(db: Session, drop_id: int) -> bool:
+    """Shard'sız drop: drops satırında tek birim düş"""
+    return _conditional_increment(
+        db,
+        update(Drop)
+        .where(
+            and_(
+                Drop.id == drop_id,
+                Drop.claimed_count < Drop.total_stock
+            )
+        )
+        .values(claimed_count=Drop.claimed_count + 1)
+    )
+
+
+def _reserve_shard(db: Session, drop_id: int, shard_index: int) -> bool:
+    """Tek bir shard satırında tek birim düş"""
+    return _conditional_increment(
+        db,
+        update(DropStockShard)
+        .where(
+            and_(
+                DropStockShard.drop_id == drop_id,
+                DropStockShard.shard_index == shard_index,
+                DropStockShard.claimed_count < DropStockShard.capacity
+            )
+        )
+        .values(claimed_count=DropStockShard.claimed_count + 1)
+    )
+
+
+def reserve_stock(db: Session, drop: Drop, user_id: int) -> bool:
+    """
+    Stoktan tek birim düş (koşullu atomik UPDATE)
+
+    Shard'lı drop'larda kullanıcıya göre bir shard seçilir, shard tükenmişse
+    sıradaki shard'a geçilir. Commit'ten hemen önce çağrılmalı; satır kilidi
+    sadece UPDATE -> COMMIT arasında tutulur.
+    """
+    if drop.stock_shards <= 1:
+        return _reserve_drop_row(db, drop.id)
+
+    start = user_id % drop.stock_shards
+    for offset in range(drop.stock_shards):
+        if _reserve_shard(db, drop.id, (start + offset) % drop.stock_shards):
+            return True
+    return False
+
+
+def _take_units(db: Session, model, limit_column, where_clause, count: int) -> int:
+    """
+    Bir sayaç satırından en fazla count birim al
+
+    Yer yeterliyse tek koşullu UPDATE ile count birim alınır. Değilse kalan
+    miktar compare-and-swap ile alınır: claimed_count okunur, verilebilecek
+    miktar sadece değer değişmemişse yazılır. Eşzamanlı yazım yarışı
+    kaybedilirse yeniden okunur; 0 sadece satırda yer kalmadıysa döner.
+    """
+    full = db.execute(
+        update(model)
+        .where(and_(where_clause, model.claimed_count + count <= limit_column))
+        .values(claimed_count=model.claimed_count + count)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if full == 1:
+        return count
+
+    while True:
+        row = db.query(model.claimed_count, limit_column).filter(where_clause).first()
+        if row is None:
+            return 0
+
+        claimed, limit = row
+        granted = min(count, limit - claimed)
+        if granted <= 0:
+            return 0
+
+        swapped = db.execute(
+            update(model)
+            .where(and_(where_clause, model.claimed_count == claimed))
+            .values(claimed_count=claimed + granted)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if swapped == 1:
+            return granted
+
+
+def reserve_stock_bulk(db: Session, drop: Drop, count: int) -> int:
+    """
+    Stoktan tek seferde en fazla count birim düş, verilen miktarı döndür
+
+    Batch claim için kullanılır. Shard'lı drop'larda shard'lar sırayla tüketilir.
+    """
+    if count <= 0:
+        return 0
+
+    if drop.stock_shards <= 1:
+        return _take_units(db, Drop, Drop.total_stock, Drop.id == drop.id, count)
+
+    granted = 0
+    for index in range(drop.stock_shards):
+        granted += _take_units(
+            db,
+            DropStockShard,
+            DropStockShard.capacity,
+            and_(
+                DropStockShard.drop_id == drop.id,
+                DropStockShard.shard_index == index
+            ),
+            count - granted
+        )
+        if granted == count:
+            break
+    return granted
+
+
+def release_stock(db: Session, drop: Drop, count: int) -> int:
+    """
+    Stoğa count birim geri ver (süresi dolan claim'ler), geri verilen miktarı döndür
+
+    claimed_count sıfırın altına inmez. Shard'lı drop'larda en dolu shard'lardan
+    başlanır. Commit çağırana aittir.
+    """
+    if count <= 0:
+        return 0
+
+    if drop.stock_shards <= 1:
+        db.execute(
+            update(Drop)
+            .where(Drop.id == drop.id)
+            .values(claimed_count=case(
+                (Drop.claimed_count >= count, Drop.claimed_count - count),
+                else_=0
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        return count
+
+    shards = db.query(DropStockShard.shard_index, DropStockShard.claimed_count).filter(
+        and_(
+            DropStockShard.drop_id == drop.id,
+            DropStockShard.claimed_count > 0
+        )
+    ).order_by(DropStockShard.claimed_count.desc()).all()
+
+    released = 0
+    for shard_index, claimed in shards:
+        amount = min(count - released, claimed)
+        released += db.execute(
+            update(DropStockShard)
+            .where(
+                and_(
+                    DropStockShard.drop_id == drop.id,
+                    DropStockShard.shard_index == shard_index,
+                    DropStockShard.claimed_count >= amount
+                )
+            )
+            .values(claimed_count=DropStockShard.claimed_count - amount)
+            .execution_options(synchronize_session=False)
+        ).rowcount * amount
+        if released == count:
+            break
+    return released
+
+
+def sharded_claimed_counts(db: Session, drop_ids: Iterable[int]) -> Dict[int, int]:
+    """Shard'lı drop'lar için claimed_count = shard toplamı"""
+    drop_ids = list(drop_ids)
+    if not drop_ids:
+        return {}
+
+    rows = db.query(
+        DropStockShard.drop_id,
+        func.sum(DropStockShard.claimed_count)
+    ).filter(
+        DropStockShard.drop_id.in_(drop_ids)
+    ).group_by(DropStockShard.drop_id).all()
+
+    return {drop_id: int(total or 0) for drop_id, total in rows}
+
+
+def get_claimed_count(db: Session, drop: Drop) -> int:
+    """Drop'un gerçek claimed_count değeri (shard'lı ise toplam)"""
+    if drop.stock_shards <= 1:
+        return drop.claimed_count
+    return sharded_claimed_counts(db, [drop.id]).get(drop.id, 0)
+
+
+def fill_claimed_count(db: Session, drop: Drop) -> Drop:
+    """Drop nesnesinin claimed_count'unu gerçek değerle doldur (değişiklik sayılmaz, yazılmaz)"""
+    if drop.stock_shards > 1:
+        set_committed_value(drop, "claimed_count", get_claimed_count(db, drop))
+    return drop
+
+
+def configure_stock_shards(db: Session, drop: Drop):
+    """
+    Drop stokunu shard satırlarına dağıt
+
+    total_stock veya stock_shards değiştiğinde çağrılır. Mevcut claim'ler
+    korunur, kalan stok shard'lara eşit paylaştırılır. Commit çağırana aittir.
+    """
+    shards = db.query(DropStockShard).filter(
+        DropStockShard.drop_id == drop.id
+    ).order_by(DropStockShard.shard_index).with_for_update().all()
+
+    claimed = sum(s.claimed_count for s in shards) if shards else drop.claimed_count
+    shard_count = drop.stock_shards
+
+    # Shard kapatıldı: toplamı drop satırına geri yaz
+    if shard_count <= 1:
+        for shard in shards:
+            db.delete(shard)
+        drop.claimed_count = claimed
+        return
+
+    free_parts = _split(drop.total_stock - claimed, shard_count)
+
+    if len(shards) == shard_count:
+        # Shard sayısı aynı: kapasiteleri yerinde güncelle
+        for shard, free in zip(shards, free_parts):
+            shard.capacity = shard.claimed_count + free
+    else:
+        for shard in shards:
+            db.delete(shard)
+        db.flush()
+
+        claimed_parts = _split(claimed, shard_count)
+        for index in range(shard_count):
+            db.add(DropStockShard(
+                drop_id=drop.id,
+                shard_index=index,
+                capacity=claimed_parts[index] + free_parts[index],
+                claimed_count=claimed_parts[index]
+            ))
+
+    # Drop satırındaki değer sadece anlık görüntüdür
+    drop.claimed_count = claimed
+
+
+def delete_stock_shards(db: Session, drop_id: int):
+    """Drop silinirken shard satırlarını toplu sil"""
+    db.query(DropStockShard).filter(
+        DropStockShard.drop_id == drop_id
+    ).delete(synchronize_session=False)
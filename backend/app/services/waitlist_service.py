@@ -1,18 +1,112 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, func
+from sqlalchemy import and_, insert, tuple_, update
+from sqlalchemy.util.concurrency import await_only, in_greenlet
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
-from app.models.drop import Drop, DropStatus
+from typing import Any, Dict, List, Optional, Set
+from app.database import SessionLocal, is_replica_session
+from app.models.drop import AllocationMode, Drop, DropStatus
 from app.models.waitlist import Waitlist, WaitlistStatus
 from app.models.claim_code import ClaimCode
 from app.models.user import User
-from app.schemas.waitlist_schema import WaitlistJoinResponse, WaitlistLeaveResponse, ClaimResponse
-from app.utils.seed import calculate_priority_score, generate_claim_code
+from app.schemas.waitlist_schema import (
+    WaitlistJoinResponse, WaitlistLeaveResponse, WaitlistPositionResponse, ClaimResponse,
+    AllocationResponse
+)
+from app.services.stats_service import batch_stats_key, record_drop_stats
+from app.services.stock_service import get_claimed_count, reserve_stock, reserve_stock_bulk
+from app.utils.batching import MicroBatcher
+from app.utils.cache import TTLCache
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.principal import UserPrincipal
+from app.utils.rate_tracker import rate_tracker
+from app.utils.response_cache import drop_response_cache
+from app.utils.serialization import dumps
+from app.utils.rank_index import rank_indexes
+from app.services.code_pool_service import pop_claim_code, pop_claim_codes
+from app.utils.seed import calculate_priority_score
+from app.config import settings
+import asyncio
+import math
 import time
 
+# Aynı drop'a gelen claim isteklerini toplayan batcher (claim_batch_window_ms > 0 ise)
+claim_batcher = MicroBatcher(settings.claim_batch_window_ms, settings.claim_batch_max_size)
 
-def join_waitlist(drop_id: int, current_user: User, db: Session, request_time_ms: int = None) -> WaitlistJoinResponse:
+# Kullanıcının katıldığı drop id'leri (user_id -> frozenset), join/leave ile güncellenir
+joined_drop_cache = TTLCache(
+    maxsize=settings.joined_cache_max_users,
+    ttl=settings.joined_cache_ttl_seconds
+)
+
+# Priority dağıtımında tek UPDATE/INSERT'e giren kayıt sayısı
+ALLOCATION_CHUNK_SIZE = 1000
+
+# GET /drops/{id}/position cevapları ((drop_id, user_id) -> WaitlistPositionResponse)
+position_cache = TTLCache(
+    maxsize=settings.position_cache_max_entries,
+    ttl=settings.position_cache_ttl_seconds
+)
+
+
+def _update_joined_cache(user_id: int, drop_id: int, joined: bool):
+    """Önbellekteki katılım kümesini güncelle (kayıt yoksa dokunma)"""
+    drop_ids = joined_drop_cache.get(user_id)
+    if drop_ids is not None:
+        joined_drop_cache.set(user_id, drop_ids | {drop_id} if joined else drop_ids - {drop_id})
+
+
+def _waiting_entries(db: Session, drop_id: int):
+    """Rank index için WAITING kayıtları (idx_drop_priority sırasıyla)"""
+    return db.query(Waitlist.user_id, Waitlist.priority_score).filter(
+        and_(
+            Waitlist.drop_id == drop_id,
+            Waitlist.status == WaitlistStatus.WAITING
+        )
+    ).order_by(Waitlist.priority_score, Waitlist.id).all()
+
+
+def _refresh_entries(drop_id: int):
+    """
+    İndeks kurulumu için kayıtları primary'den kendi session'ıyla oku
+
+    Replica'dan okunsaydı henüz replike olmamış join/leave'ler indekse hiç
+    girmezdi; kurulum günlüğü sadece kurulum başladıktan sonrakileri taşır.
+    """
+    def load():
+        db = SessionLocal()
+        try:
+            return _waiting_entries(db, drop_id)
+        finally:
+            db.close()
+
+    # AsyncSession.run_sync içindeyse event loop bloklanmasın
+    if in_greenlet():
+        return await_only(asyncio.to_thread(load))
+    return load()
+
+
+rank_indexes.refresher = _refresh_entries
+
+
+def _entries_loader(db: Session, drop_id: int):
+    """Rank index ilk kurulumu için okuyucu (request session'ı replica ise primary'den)"""
+    if is_replica_session(db):
+        return lambda: _refresh_entries(drop_id)
+    return lambda: _waiting_entries(db, drop_id)
+
+
+def _position_for_score(db: Session, drop_id: int, priority_score: float) -> int:
+    """priority_score'a sahip bekleyen kaydın 1 tabanlı pozisyonu"""
+    return rank_indexes.query(
+        drop_id,
+        _entries_loader(db, drop_id),
+        lambda index: index.position_of_score(priority_score)
+    )
+
+
+def join_waitlist(drop_id: int, current_user: UserPrincipal, db: Session, request_time_ms: int = None) -> WaitlistJoinResponse:
     """Waitlist'e katıl (Idempotent)"""
 
     # Drop kontrolü
@@ -40,27 +134,15 @@ def join_waitlist(drop_id: int, current_user: User, db: Session, request_time_ms
 
     if existing_entry:
         # Idempotent: Zaten katıldıysa mevcut pozisyonu döndür
-        position = db.query(func.count(Waitlist.id)).filter(
-            and_(
-                Waitlist.drop_id == drop_id,
-                Waitlist.status == WaitlistStatus.WAITING,
-                Waitlist.priority_score < existing_entry.priority_score
-            )
-        ).scalar() + 1
+        position = _position_for_score(db, drop_id, existing_entry.priority_score)
 
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Already in waitlist at position {position}"
         )
 
-    # Rapid action kontrolü (aynı drop'a son 1 dakikada kaç kez join/leave yaptı)
-    rapid_actions = db.query(func.count(Waitlist.id)).filter(
-        and_(
-            Waitlist.user_id == current_user.id,
-            Waitlist.drop_id == drop_id,
-            Waitlist.created_at >= datetime.utcnow() - timedelta(minutes=1)
-        )
-    ).scalar()
+    # Rapid action kontrolü (aynı drop'a son pencerede kaç kez join/leave yaptı)
+    rapid_actions = rate_tracker.count(current_user.id, drop_id)
 
     # Signup latency (request zamanı - server zamanı farkı)
     if request_time_ms is None:
@@ -69,10 +151,12 @@ def join_waitlist(drop_id: int, current_user: User, db: Session, request_time_ms
         signup_latency_ms = abs(int(time.time() * 1000) - request_time_ms) % 10000
 
     # Priority score hesapla
+    now = datetime.utcnow()
     priority_score = calculate_priority_score(
         user_created_at=current_user.created_at,
         signup_latency_ms=signup_latency_ms,
-        rapid_actions_count=rapid_actions
+        rapid_actions_count=rapid_actions,
+        now=now
     )
 
     # Transaction ile ekle
@@ -82,22 +166,22 @@ def join_waitlist(drop_id: int, current_user: User, db: Session, request_time_ms
             user_id=current_user.id,
             priority_score=priority_score,
             signup_latency_ms=signup_latency_ms,
-            account_age_days=(datetime.utcnow() - current_user.created_at).days,
+            account_age_days=(now - current_user.created_at).days,
             rapid_actions_count=rapid_actions
         )
 
         db.add(new_entry)
+        db.flush()
+        record_drop_stats(db, drop_id, current_user.id, waiting=1, joins=1, now=now)
         db.commit()
         db.refresh(new_entry)
+        rate_tracker.record(current_user.id, drop_id, "join")
+        rank_indexes.add(drop_id, current_user.id, priority_score)
+        position_cache.pop((drop_id, current_user.id))
+        _update_joined_cache(current_user.id, drop_id, True)
 
         # Pozisyon hesapla
-        position = db.query(func.count(Waitlist.id)).filter(
-            and_(
-                Waitlist.drop_id == drop_id,
-                Waitlist.status == WaitlistStatus.WAITING,
-                Waitlist.priority_score < priority_score
-            )
-        ).scalar() + 1
+        position = _position_for_score(db, drop_id, priority_score)
 
         return WaitlistJoinResponse(
             message="Successfully joined waitlist",
@@ -113,7 +197,7 @@ def join_waitlist(drop_id: int, current_user: User, db: Session, request_time_ms
         )
 
 
-def leave_waitlist(drop_id: int, current_user: User, db: Session) -> WaitlistLeaveResponse:
+def leave_waitlist(drop_id: int, current_user: UserPrincipal, db: Session) -> WaitlistLeaveResponse:
     """Waitlist'ten ayrıl"""
 
     waitlist_entry = db.query(Waitlist).filter(
@@ -136,33 +220,399 @@ def leave_waitlist(drop_id: int, current_user: User, db: Session) -> WaitlistLea
             detail="Cannot leave after claiming"
         )
 
+    expired = waitlist_entry.status == WaitlistStatus.EXPIRED
     db.delete(waitlist_entry)
+    db.flush()
+    record_drop_stats(
+        db, drop_id, current_user.id,
+        waiting=0 if expired else -1, expired=-1 if expired else 0, leaves=1
+    )
     db.commit()
+    rate_tracker.record(current_user.id, drop_id, "leave")
+    rank_indexes.remove(drop_id, [current_user.id])
+    position_cache.pop((drop_id, current_user.id))
+    _update_joined_cache(current_user.id, drop_id, False)
 
     return WaitlistLeaveResponse(message="Successfully left waitlist")
 
 
-def claim_drop(drop_id: int, current_user: User, db: Session) -> ClaimResponse:
-    """Drop'u claim et (Idempotent + Row Lock)"""
+def get_waitlist_position(drop_id: int, current_user: UserPrincipal, db: Session) -> WaitlistPositionResponse:
+    """Kullanıcının güncel sırası (salt okunur, kısa TTL önbellekli)"""
+    cache_key = (drop_id, current_user.id)
+    cached = position_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # Transaction başlat
-    try:
-        # Drop'u row lock ile al
-        drop = db.query(Drop).with_for_update().filter(Drop.id == drop_id).first()
+    drop = db.query(Drop).filter(Drop.id == drop_id).first()
+    if not drop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    entry = db.query(Waitlist.status, Waitlist.priority_score).filter(
+        and_(
+            Waitlist.drop_id == drop_id,
+            Waitlist.user_id == current_user.id
+        )
+    ).first()
+
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not in waitlist"
+        )
+
+    remaining_stock = max(drop.total_stock - get_claimed_count(db, drop), 0)
+    position, waitlist_size = rank_indexes.query(
+        drop_id,
+        _entries_loader(db, drop_id),
+        lambda index: (index.position_of_score(entry.priority_score), len(index))
+    )
+
+    result = _position_response(drop_id, entry, position, waitlist_size, remaining_stock)
+    position_cache.set(cache_key, result)
+    return result
+
+
+def _position_response(drop_id: int, entry, position: int, waitlist_size: int,
+                       remaining_stock: int) -> WaitlistPositionResponse:
+    """(status, priority_score) kaydı ve indeks sırasından pozisyon cevabı"""
+    if entry.status == WaitlistStatus.WAITING:
+        within_stock = position <= remaining_stock
+    else:
+        # Claim etmiş kullanıcının sırası yok
+        position = None
+        within_stock = entry.status == WaitlistStatus.CLAIMED
+
+    return WaitlistPositionResponse(
+        drop_id=drop_id,
+        status=entry.status.value,
+        position=position,
+        waitlist_size=waitlist_size,
+        remaining_stock=remaining_stock,
+        within_stock=within_stock,
+        priority_score=entry.priority_score
+    )
+
+
+def get_waitlist_positions(db: Session, drop: Drop, user_ids: Set[int],
+                           claimed_count: Optional[int] = None) -> Dict[int, WaitlistPositionResponse]:
+    """Birden çok kullanıcının sırası; tek sorgu ve tek indeks okuması (canlı yayın için)"""
+    if not user_ids:
+        return {}
 
-        if not drop:
+    entries = db.query(Waitlist.user_id, Waitlist.status, Waitlist.priority_score).filter(
+        and_(
+            Waitlist.drop_id == drop.id,
+            Waitlist.user_id.in_(user_ids)
+        )
+    ).all()
+    if not entries:
+        return {}
+
+    if claimed_count is None:
+        claimed_count = get_claimed_count(db, drop)
+    remaining_stock = max(drop.total_stock - claimed_count, 0)
+    positions, waitlist_size = rank_indexes.query(
+        drop.id,
+        _entries_loader(db, drop.id),
+        lambda index: ([index.position_of_score(e.priority_score) for e in entries], len(index))
+    )
+
+    return {
+        entry.user_id: _position_response(drop.id, entry, position, waitlist_size, remaining_stock)
+        for entry, position in zip(entries, positions)
+    }
+
+
+def get_waitlist_page(
+        db: Session,
+        drop_id: int,
+        status_filter: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+) -> bytes:
+    """
+    Drop waitlist'ini (priority_score, id) sırasıyla sayfala (Admin, WaitlistPage JSON'u)
+
+    Offset yerine keyset kullanılır: sayfa, cursor'daki son (score, id)
+    değerinden sonra idx_drop_priority / idx_drop_status_priority üzerinden
+    okunur, derin sayfalar da ilk sayfa kadar ucuzdur. Sadece cevaptaki
+    kolonlar yüklenir.
+    """
+    drop = db.query(Drop.id).filter(Drop.id == drop_id).first()
+    if not drop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    query = db.query(
+        Waitlist.id,
+        Waitlist.user_id,
+        User.email.label("user_email"),
+        Waitlist.priority_score,
+        Waitlist.status,
+        Waitlist.signup_latency_ms,
+        Waitlist.account_age_days,
+        Waitlist.rapid_actions_count,
+        Waitlist.created_at,
+        Waitlist.claimed_at
+    ).join(
+        User, User.id == Waitlist.user_id
+    ).filter(Waitlist.drop_id == drop_id)
+
+    # Status filter
+    if status_filter:
+        try:
+            query = query.filter(Waitlist.status == WaitlistStatus(status_filter))
+        except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Drop not found"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid status filter"
             )
 
-        # Claim window açık mı?
-        now = datetime.utcnow()
-        if now < drop.claim_window_start or now > drop.claim_window_end:
+    if cursor:
+        try:
+            last_score, last_id = decode_cursor(cursor, 2, ((int, float), int))
+        except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Claim window is not open"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.filter(
+            tuple_(Waitlist.priority_score, Waitlist.id) > tuple_(last_score, last_id)
+        )
+
+    # Bir fazla satır: sonraki sayfa var mı?
+    rows = query.order_by(Waitlist.priority_score, Waitlist.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].priority_score, rows[-1].id)
+
+    # Satırlar doğrudan JSON'a (WaitlistPage şeklinde, ara model nesnesi yok)
+    return dumps({
+        "items": [row._asdict() for row in rows],
+        "next_cursor": next_cursor
+    })
+
+
+def _existing_claim_response(db: Session, waitlist_id: int, message: str = "Already claimed") -> ClaimResponse:
+    """Daha önce üretilmiş claim code'u döndür (Idempotent)"""
+    existing_claim = db.query(ClaimCode).filter(
+        ClaimCode.waitlist_id == waitlist_id
+    ).first()
+
+    return ClaimResponse(
+        message=message,
+        claim_code=existing_claim.code,
+        expires_at=existing_claim.expires_at
+    )
+
+
+def _get_claimable_drop(db: Session, drop_id: int, now: datetime) -> Drop:
+    """Drop'u kilitsiz oku, varlık ve claim window kontrolü yap"""
+    drop = db.query(Drop).filter(Drop.id == drop_id).first()
+
+    if not drop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    # Claim window açık mı?
+    if now < drop.claim_window_start or now > drop.claim_window_end:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Claim window is not open"
+        )
+
+    return drop
+
+
+def claim_drop(drop_id: int, current_user: UserPrincipal, db: Session) -> ClaimResponse:
+    """Drop'u claim et (Batch açıksa aynı drop'un istekleri toplanır)"""
+    # Batcher thread'leri bloklayarak bekler; async modda event loop'ta çalışamaz
+    if settings.claim_batch_window_ms > 0 and not settings.async_database:
+        result = claim_batcher.submit(
+            drop_id,
+            current_user.id,
+            lambda user_ids: claim_drop_batch(drop_id, user_ids, db)
+        )
+        # None: batch içinde eşzamanlı claim çakışması, tekli yola düş
+        if result is not None:
+            return result
+
+    return _claim_single(drop_id, current_user, db)
+
+
+def claim_drop_batch(drop_id: int, user_ids: List[int], db: Session) -> Dict[int, Any]:
+    """
+    Aynı drop için toplanan claim isteklerini tek transaction'da işle
+
+    Stok, bekleyen kayıtlara priority_score sırasıyla verilir: tek toplu stok
+    düşümü, tek toplu ClaimCode insert'ü ve tek commit. Her kullanıcı için
+    ClaimResponse, HTTPException ya da (tekli yola düşmesi için) None döner.
+    """
+    try:
+        now = datetime.utcnow()
+        drop = _get_claimable_drop(db, drop_id, now)
+
+        # Priority drop'larda claim salt okunur; tekli yol halleder
+        if drop.allocation_mode == AllocationMode.PRIORITY:
+            return {user_id: None for user_id in user_ids}
+
+        entries = db.query(Waitlist).filter(
+            and_(
+                Waitlist.drop_id == drop_id,
+                Waitlist.user_id.in_(user_ids)
+            )
+        ).all()
+        entries_by_user = {e.user_id: e for e in entries}
+
+        results: Dict[int, Any] = {}
+        for user_id in user_ids:
+            if user_id not in entries_by_user:
+                results[user_id] = HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Not in waitlist"
+                )
+
+        # Zaten claim yapmışlar (Idempotent)
+        claimed = {e.id: e.user_id for e in entries if e.status == WaitlistStatus.CLAIMED}
+        if claimed:
+            for code in db.query(ClaimCode).filter(ClaimCode.waitlist_id.in_(claimed)).all():
+                results[claimed[code.waitlist_id]] = ClaimResponse(
+                    message="Already claimed",
+                    claim_code=code.code,
+                    expires_at=code.expires_at
+                )
+
+        for entry in entries:
+            if entry.status == WaitlistStatus.EXPIRED:
+                results[entry.user_id] = HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Claim expired"
+                )
+
+        waiting = [e for e in entries if e.status == WaitlistStatus.WAITING]
+        if not waiting:
+            return results
+
+        # Bekleyenleri koşullu olarak CLAIMED yap; çakışanlar tekli yola düşer
+        marked_ids = _mark_claimed(db, [e.id for e in waiting], now)
+        candidates = sorted(
+            (e for e in waiting if e.id in marked_ids),
+            key=lambda e: (e.priority_score, e.id)
+        )
+        for entry in waiting:
+            if entry.id not in marked_ids:
+                results[entry.user_id] = None
+
+        # Claim code'ları havuzdan çekip toplu ekle
+        expires_at = now + timedelta(hours=24)
+        codes = dict(zip(
+            (e.id for e in candidates),
+            pop_claim_codes(db, drop_id, len(candidates))
+        ))
+        db.execute(insert(ClaimCode), [
+            {
+                "code": codes[e.id],
+                "waitlist_id": e.id,
+                "expires_at": expires_at,
+                "created_at": now
+            }
+            for e in candidates
+        ])
+
+        # Stok düşümü en sonda, tek seferde
+        granted = reserve_stock_bulk(db, drop, len(candidates))
+        winners, losers = candidates[:granted], candidates[granted:]
+
+        # Stok yetmeyenleri geri al
+        if losers:
+            loser_ids = [e.id for e in losers]
+            db.execute(
+                update(Waitlist)
+                .where(Waitlist.id.in_(loser_ids))
+                .values(status=WaitlistStatus.WAITING, claimed_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.query(ClaimCode).filter(
+                ClaimCode.waitlist_id.in_(loser_ids)
+            ).delete(synchronize_session=False)
+
+        record_drop_stats(db, drop_id, batch_stats_key(), waiting=-len(winners), claimed=len(winners))
+
+        # Sonuçları commit'ten önce hazırla (commit sonrası nesneler expire olur)
+        for entry in winners:
+            results[entry.user_id] = ClaimResponse(
+                message="Claim successful",
+                claim_code=codes[entry.id],
+                expires_at=expires_at
+            )
+        for entry in losers:
+            results[entry.user_id] = HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Out of stock"
+            )
+
+        db.commit()
+        rank_indexes.remove(drop_id, [entry.user_id for entry in winners])
+        if winners:
+            drop_response_cache.invalidate(drop_id)
+        for entry in winners:
+            position_cache.pop((drop_id, entry.user_id))
+
+        return results
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Claim failed: {str(e)}"
+        )
+
+
+def _mark_claimed(db: Session, waitlist_ids: List[int], now: datetime) -> Set[int]:
+    """WAITING kayıtları CLAIMED yap, gerçekten güncellenen id'leri döndür"""
+    stmt = (
+        update(Waitlist)
+        .where(
+            and_(
+                Waitlist.id.in_(waitlist_ids),
+                Waitlist.status == WaitlistStatus.WAITING
             )
+        )
+        .values(status=WaitlistStatus.CLAIMED, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.get_bind().dialect.update_returning:
+        return set(db.execute(stmt.returning(Waitlist.id)).scalars().all())
+
+    # RETURNING yoksa: hepsi güncellendiyse tamam, değilse tekli yola bırak
+    if db.execute(stmt).rowcount == len(waitlist_ids):
+        return set(waitlist_ids)
+    db.rollback()
+    return set()
+
+
+def _claim_single(drop_id: int, current_user: UserPrincipal, db: Session) -> ClaimResponse:
+    """Tekli claim (Idempotent + kilitsiz koşullu UPDATE)"""
+
+    try:
+        now = datetime.utcnow()
+        drop = _get_claimable_drop(db, drop_id, now)
+
+        if drop.allocation_mode == AllocationMode.PRIORITY:
+            return _claim_allocated(drop, current_user, db, now)
 
         # Kullanıcı waitlist'te mi?
         waitlist_entry = db.query(Waitlist).filter(
@@ -180,46 +630,69 @@ def claim_drop(drop_id: int, current_user: User, db: Session) -> ClaimResponse:
 
         # Zaten claim yapmış mı? (Idempotent)
         if waitlist_entry.status == WaitlistStatus.CLAIMED:
-            existing_claim = db.query(ClaimCode).filter(
-                ClaimCode.waitlist_id == waitlist_entry.id
-            ).first()
-
-            return ClaimResponse(
-                message="Already claimed",
-                claim_code=existing_claim.code,
-                expires_at=existing_claim.expires_at
+            return _existing_claim_response(db, waitlist_entry.id)
+
+        # Süresi dolmuş claim tekrar yapılamaz
+        if waitlist_entry.status == WaitlistStatus.EXPIRED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Claim expired"
             )
 
-        # Stok kontrolü
-        if drop.claimed_count >= drop.total_stock:
+        # Hızlı stok kontrolü: tükenmiş drop için yazma yapma (shard'lı drop'larda atlanır)
+        if drop.stock_shards <= 1 and drop.claimed_count >= drop.total_stock:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Out of stock"
             )
 
-        # Claim işlemi
-        waitlist_entry.status = WaitlistStatus.CLAIMED
-        waitlist_entry.claimed_at = datetime.utcnow()
+        # Waitlist kaydını koşullu olarak CLAIMED yap.
+        # Aynı kullanıcının eşzamanlı ikinci isteği burada 0 satır günceller.
+        marked = db.execute(
+            update(Waitlist)
+            .where(
+                and_(
+                    Waitlist.id == waitlist_entry.id,
+                    Waitlist.status == WaitlistStatus.WAITING
+                )
+            )
+            .values(status=WaitlistStatus.CLAIMED, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        if marked == 0:
+            db.rollback()
+            return _existing_claim_response(db, waitlist_entry.id)
 
-        # Claim code oluştur
-        claim_code_str = generate_claim_code()
+        # Claim code'u havuzdan çek
+        claim_code_str = pop_claim_code(db, drop_id)
+        expires_at = now + timedelta(hours=24)
         claim_code = ClaimCode(
             code=claim_code_str,
             waitlist_id=waitlist_entry.id,
-            expires_at=datetime.utcnow() + timedelta(hours=24)
+            expires_at=expires_at
         )
+        db.add(claim_code)
+        db.flush()
 
-        # Claimed count artır
-        drop.claimed_count += 1
+        # Stok düşümü en sonda: stok satırı sadece UPDATE -> COMMIT arasında kilitli kalır
+        if not reserve_stock(db, drop, current_user.id):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Out of stock"
+            )
 
-        db.add(claim_code)
+        record_drop_stats(db, drop_id, current_user.id, waiting=-1, claimed=1)
         db.commit()
-        db.refresh(claim_code)
+        rank_indexes.remove(drop_id, [current_user.id])
+        position_cache.pop((drop_id, current_user.id))
+        drop_response_cache.invalidate(drop_id)
 
         return ClaimResponse(
             message="Claim successful",
             claim_code=claim_code_str,
-            expires_at=claim_code.expires_at
+            expires_at=expires_at
         )
 
     except HTTPException:
@@ -231,3 +704,226 @@ def claim_drop(drop_id: int, current_user: User, db: Session) -> ClaimResponse:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Claim failed: {str(e)}"
         )
+
+
+def _claim_allocated(drop: Drop, current_user: UserPrincipal, db: Session, now: datetime) -> ClaimResponse:
+    """Priority drop: dağıtımda verilmiş claim code'u döndür (salt okunur)"""
+    # Dağıtım request içinde yapılmaz (drop satırı kilidi açılışta tüm claim'leri bekletirdi);
+    # allocate_due_drops işi ya da admin endpoint'i yapar, istemci tekrar dener
+    if drop.allocated_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Allocation pending",
+            headers={"Retry-After": str(max(math.ceil(settings.allocation_interval_seconds), 1))}
+        )
+
+    waitlist_entry = db.query(Waitlist.id, Waitlist.status).filter(
+        and_(
+            Waitlist.drop_id == drop.id,
+            Waitlist.user_id == current_user.id
+        )
+    ).first()
+
+    if not waitlist_entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not in waitlist"
+        )
+
+    if waitlist_entry.status == WaitlistStatus.EXPIRED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Claim expired"
+        )
+
+    if waitlist_entry.status != WaitlistStatus.CLAIMED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not selected in allocation"
+        )
+
+    return _existing_claim_response(db, waitlist_entry.id, message="Claim successful")
+
+
+def _issue_next_claims(db: Session, drop: Drop, now: datetime) -> List[Any]:
+    """
+    Kalan stok kadar sıradaki WAITING kaydı CLAIMED yap ve kodlarını yaz
+
+    Kayıtlar idx_drop_status_priority üzerinden (priority_score, id) sırasıyla
+    okunur; CLAIMED olanlar WAITING aralığından çıktığı için indeks aralığının
+    başı her zaman sıradaki kullanıcılardır. Maliyet verilen stokla orantılıdır.
+    Commit çağırana aittir. Claim verilen (id, user_id) satırlarını döndürür.
+    """
+    remaining = drop.total_stock - get_claimed_count(db, drop)
+    if remaining <= 0:
+        return []
+
+    winners = db.query(Waitlist.id, Waitlist.user_id).filter(
+        and_(
+            Waitlist.drop_id == drop.id,
+            Waitlist.status == WaitlistStatus.WAITING
+        )
+    ).order_by(
+        Waitlist.priority_score, Waitlist.id
+    ).limit(remaining).with_for_update().all()
+
+    granted = reserve_stock_bulk(db, drop, len(winners))
+    winners = winners[:granted]
+    expires_at = now + timedelta(hours=24)
+
+    for start in range(0, len(winners), ALLOCATION_CHUNK_SIZE):
+        chunk = winners[start:start + ALLOCATION_CHUNK_SIZE]
+        waitlist_ids = [w.id for w in chunk]
+
+        db.execute(
+            update(Waitlist)
+            .where(Waitlist.id.in_(waitlist_ids))
+            .values(status=WaitlistStatus.CLAIMED, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        codes = pop_claim_codes(db, drop.id, len(waitlist_ids))
+        db.execute(insert(ClaimCode), [
+            {
+                "code": code,
+                "waitlist_id": waitlist_id,
+                "expires_at": expires_at,
+                "created_at": now
+            }
+            for waitlist_id, code in zip(waitlist_ids, codes)
+        ])
+
+    record_drop_stats(db, drop.id, batch_stats_key(), waiting=-len(winners), claimed=len(winners))
+    return winners
+
+
+def _forget_claimed(drop_id: int, winners: List[Any]):
+    """Claim verilen kullanıcıları sıra indeksinden ve önbelleklerden çıkar"""
+    rank_indexes.remove(drop_id, [w.user_id for w in winners])
+    for w in winners:
+        position_cache.pop((drop_id, w.user_id))
+    if winners:
+        drop_response_cache.invalidate(drop_id)
+
+
+def allocate_drop(db: Session, drop_id: int, now: Optional[datetime] = None) -> Optional[int]:
+    """
+    Priority drop'un stokunu tek seferde dağıt
+
+    Kalan stok kadar WAITING kaydı priority_score sırasıyla seçilir, toplu
+    CLAIMED yapılır ve ClaimCode'ları havuzdan toplu yazılır. allocated_at
+    üzerindeki koşullu UPDATE tek seferlik kapıdır; kapıyı alamayan (zaten
+    dağıtılmış ya da zamanı gelmemiş) çağrı None döner.
+    """
+    now = now or datetime.utcnow()
+
+    gate = db.execute(
+        update(Drop)
+        .where(
+            and_(
+                Drop.id == drop_id,
+                Drop.allocation_mode == AllocationMode.PRIORITY,
+                Drop.allocated_at.is_(None),
+                Drop.claim_window_start <= now
+            )
+        )
+        .values(allocated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if gate.rowcount == 0:
+        db.rollback()
+        return None
+
+    try:
+        drop = db.query(Drop).populate_existing().filter(Drop.id == drop_id).one()
+        winners = _issue_next_claims(db, drop, now)
+        db.commit()
+
+    except Exception:
+        # Kapı da geri alınır, dağıtım tekrar denenebilir
+        db.rollback()
+        raise
+
+    _forget_claimed(drop_id, winners)
+    return len(winners)
+
+
+def promote_waiting(db: Session, drop_id: int, now: Optional[datetime] = None) -> int:
+    """
+    Serbest kalan stoku sıradaki kullanıcılara ver (priority drop)
+
+    Dağıtımı yapılmış priority drop'ta stok geri döndüğünde (süresi dolan
+    claim'ler, total_stock artışı) çağrılır; sıradaki N WAITING kayda kodları
+    verilir. Terfi edilen kayıt sayısı döner.
+    """
+    now = now or datetime.utcnow()
+
+    drop = db.query(Drop).populate_existing().filter(Drop.id == drop_id).first()
+    if (
+        drop is None
+        or drop.allocation_mode != AllocationMode.PRIORITY
+        or drop.allocated_at is None
+        or drop.status != DropStatus.ACTIVE
+    ):
+        return 0
+
+    try:
+        winners = _issue_next_claims(db, drop, now)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _forget_claimed(drop_id, winners)
+    return len(winners)
+
+
+def allocate_due_drops(db: Session, now: Optional[datetime] = None) -> int:
+    """Claim window'u açılmış, dağıtılmamış priority drop'ları dağıt (zamanlayıcı işi)"""
+    now = now or datetime.utcnow()
+
+    drop_ids = db.query(Drop.id).filter(
+        and_(
+            Drop.allocation_mode == AllocationMode.PRIORITY,
+            Drop.allocated_at.is_(None),
+            Drop.status == DropStatus.ACTIVE,
+            Drop.claim_window_start <= now
+        )
+    ).all()
+
+    allocated = 0
+    for (drop_id,) in drop_ids:
+        allocated += allocate_drop(db, drop_id, now) or 0
+    return allocated
+
+
+def run_allocation(drop_id: int, db: Session) -> AllocationResponse:
+    """Priority drop dağıtımını elle başlat (Admin)"""
+    drop = db.query(Drop).filter(Drop.id == drop_id).first()
+
+    if not drop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Drop not found"
+        )
+
+    if drop.allocation_mode != AllocationMode.PRIORITY:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Drop does not use priority allocation"
+        )
+
+    now = datetime.utcnow()
+    if now < drop.claim_window_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Claim window has not started"
+        )
+
+    allocated = allocate_drop(db, drop_id, now)
+    if allocated is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Drop already allocated"
+        )
+
+    return AllocationResponse(drop_id=drop_id, allocated=allocated, allocated_at=now)
@@ -0,0 +1,230 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable
+from app.config import settings
+
+
+class AdmissionRejected(Exception):
+    """İstek kabul edilmedi; retry_after saniye sonra tekrar denenmeli"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _KeyState:
+    """Tek bir anahtar (ör. claim + drop_id) için token bucket ve sayaçlar"""
+
+    def __init__(self, burst: int):
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.in_flight = 0
+        self.queued = 0
+        self.waiters: Deque["_Waiter"] = deque()
+
+
+class _Waiter:
+    """Kuyrukta bekleyen istek; slot release() ile doğrudan ona devredilir"""
+
+    __slots__ = ("future", "granted")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.granted = False
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Drop bazlı admission control (eşzamanlılık limiti + token bucket)
+
+    Her anahtar için en fazla max_concurrent istek aynı anda işlenir; saniyede
+    rate_per_second token dolan, burst kapasiteli bir kova istek hızını sınırlar.
+    Limit doluysa istek queue_size'lık kısa bir kuyrukta queue_timeout_ms kadar
+    bekler (boşalan slot sıradakine devredilir), sonra AdmissionRejected ile
+    hızlıca reddedilir. Anahtar sayısı max_keys'i aşarsa boştaki anahtarlar atılır.
+    """
+
+    def __init__(self, max_concurrent: int, rate_per_second: float, burst: int,
+                 queue_size: int, queue_timeout_ms: int, max_keys: int = 10000):
+        self.max_concurrent = max_concurrent
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.queue_size = queue_size
+        self.queue_timeout_seconds = queue_timeout_ms / 1000
+        self.max_keys = max_keys
+        self._states: "OrderedDict[Hashable, _KeyState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed_rate_limited = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def _state(self, key: Hashable) -> _KeyState:
+        state = self._states.get(key)
+        if state is None:
+            if len(self._states) >= self.max_keys:
+                self._prune()
+            state = self._states[key] = _KeyState(self.burst)
+        else:
+            self._states.move_to_end(key)
+        return state
+
+    def _refill(self, state: _KeyState, now: float):
+        state.tokens = min(self.burst, state.tokens + (now - state.updated_at) * self.rate_per_second)
+        state.updated_at = now
+
+    @staticmethod
+    def _idle(state: _KeyState) -> bool:
+        return state.in_flight == 0 and state.queued == 0
+
+    def _prune(self):
+        """
+        Boştaki anahtarları at (kilit altında çağrılır)
+
+        Önce kovası dolmuş olanlar (atılması davranışı değiştirmez), yetmezse
+        en uzun süredir kullanılmayanlar; max_keys'in 3/4'üne inilir.
+        """
+        now = time.monotonic()
+        for key, state in list(self._states.items()):
+            if self._idle(state):
+                self._refill(state, now)
+                if state.tokens >= self.burst:
+                    del self._states[key]
+
+        target = self.max_keys * 3 // 4
+        for key, state in list(self._states.items()):
+            if len(self._states) <= target:
+                break
+            if self._idle(state):
+                del self._states[key]
+
+    def _take_token(self, state: _KeyState) -> bool:
+        self._refill(state, time.monotonic())
+        if state.tokens >= 1:
+            state.tokens -= 1
+            return True
+        return False
+
+    def _retry_after(self, state: _KeyState) -> int:
+        if self.rate_per_second <= 0:
+            return 1
+        return max(1, int((1 - state.tokens) / self.rate_per_second + 0.999))
+
+    async def acquire(self, key: Hashable):
+        """Slot al ya da AdmissionRejected fırlat"""
+        with self._lock:
+            state = self._state(key)
+
+            if not self._take_token(state):
+                self.shed_rate_limited += 1
+                raise AdmissionRejected("rate_limited", self._retry_after(state))
+
+            if state.in_flight < self.max_concurrent:
+                state.in_flight += 1
+                self.admitted += 1
+                return
+
+            if state.queued >= self.queue_size:
+                state.tokens += 1
+                self.shed_queue_full += 1
+                raise AdmissionRejected("queue_full", 1)
+
+            state.queued += 1
+            waiter = _Waiter(asyncio.get_running_loop().create_future())
+            state.waiters.append(waiter)
+
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.queue_timeout_seconds)
+        except BaseException:
+            # İstek iptal edildi: devredilen slotu bırak ya da kuyruktan çık
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._leave_queue(key, state, waiter)
+            if granted:
+                self.release(key)
+            raise
+
+        with self._lock:
+            # Süre dolarken slot devredildiyse yine kabul edilir
+            if waiter.granted:
+                return
+            self._leave_queue(key, state, waiter)
+            self.shed_timeout += 1
+        raise AdmissionRejected("queue_timeout", 1)
+
+    def _leave_queue(self, key: Hashable, state: _KeyState, waiter: _Waiter):
+        state.waiters.remove(waiter)
+        state.queued -= 1
+        self._discard_if_idle(key, state)
+
+    def _discard_if_idle(self, key: Hashable, state: _KeyState):
+        """Boşta ve kovası dolu anahtarı at (kilit altında çağrılır)"""
+        if self._idle(state) and self._states.get(key) is state:
+            self._refill(state, time.monotonic())
+            if state.tokens >= self.burst:
+                del self._states[key]
+
+    def release(self, key: Hashable):
+        """İşlem bitti, slotu bırak (kuyrukta bekleyen varsa ona devret)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state.in_flight <= 0:
+                return
+
+            if state.waiters:
+                waiter = state.waiters.popleft()
+                waiter.granted = True
+                state.queued -= 1
+                self.admitted += 1
+                waiter.future.get_loop().call_soon_threadsafe(_wake, waiter.future)
+                return
+
+            state.in_flight -= 1
+            self._discard_if_idle(key, state)
+
+    def reset(self):
+        """Durumu ve sayaçları sıfırla"""
+        with self._lock:
+            self._states.clear()
+            self.admitted = self.shed_rate_limited = self.shed_queue_full = self.shed_timeout = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Kuyruk derinliği ve reddedilen istek sayıları"""
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "shed": {
+                    "rate_limited": self.shed_rate_limited,
+                    "queue_full": self.shed_queue_full,
+                    "queue_timeout": self.shed_timeout
+                },
+                "in_flight": sum(s.in_flight for s in self._states.values()),
+                "queue_depth": sum(s.queued for s in self._states.values()),
+                "keys": {
+                    f"{key[0]}:{key[1]}" if isinstance(key, tuple) else str(key): {
+                        "in_flight": s.in_flight,
+                        "queued": s.queued
+                    }
+                    for key, s in self._states.items() if s.in_flight or s.queued
+                }
+            }
+
+
+admission_controller = AdmissionController(
+    max_concurrent=settings.admission_max_concurrent,
+    rate_per_second=settings.admission_rate_per_second,
+    burst=settings.admission_burst,
+    queue_size=settings.admission_queue_size,
+    queue_timeout_ms=settings.admission_queue_timeout_ms,
+    max_keys=settings.admission_max_keys
+)
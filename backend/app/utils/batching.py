@@ -0,0 +1,77 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class _Batch:
+    """Tek bir anahtar için toplanan bekleyen istekler"""
+
+    def __init__(self):
+        self.items: List[Hashable] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[Hashable, Any] = {}
+        self.error: Exception = None
+
+
+class MicroBatcher:
+    """
+    Aynı anahtar için gelen istekleri kısa bir pencerede toplayıp tek seferde işler
+
+    İlk gelen thread lider olur: pencere dolana (window_ms) veya batch max_size'a
+    ulaşana kadar bekler, ardından process(items) ile tüm batch'i işler. Diğer
+    thread'ler liderin sonucunu bekler. process her item için bir sonuç döndürür;
+    sonuç bir Exception ise sadece o item'ın isteğinde fırlatılır.
+    """
+
+    def __init__(self, window_ms: int, max_size: int):
+        self.window_seconds = window_ms / 1000
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, _Batch] = {}
+
+    def submit(
+            self,
+            key: Hashable,
+            item: Hashable,
+            process: Callable[[List[Hashable]], Dict[Hashable, Any]]
+    ) -> Any:
+        """item'ı key batch'ine ekle ve kendi sonucunu bekle"""
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._pending[key] = batch
+
+            # Aynı item (ör. aynı kullanıcının tekrar isteği) batch'e bir kez girer
+            if item not in batch.items:
+                batch.items.append(item)
+
+            # Batch doldu: yeni gelenler yeni batch açsın
+            if len(batch.items) >= self.max_size:
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window_seconds)
+
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+
+            try:
+                batch.results = process(list(batch.items))
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+        result = batch.results.get(item)
+        if isinstance(result, Exception):
+            raise result
+        return result
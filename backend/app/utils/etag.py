@@ -0,0 +1,23 @@
+import hashlib
+from fastapi import Request
+
+
+def compute_etag(body: bytes) -> str:
+    """Cevap gövdesinden weak ETag üret"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match header'ı ETag ile eşleşiyor mu (weak karşılaştırma)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    target = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == target:
+            return True
+    return False
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.utils.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Yayıncı drop'u bulamazsa abonelere gönderilen son olay
+END_EVENT = "end"
+
+# Bağlantıyı canlı tutan SSE yorum satırı
+HEARTBEAT = b": ping\n\n"
+
+
+def format_event(event: str, data: Any) -> bytes:
+    """Tek bir SSE mesajı"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class SubscriberLimitReached(Exception):
+    """Drop için abone limiti dolu"""
+
+
+class Subscriber:
+    """
+    Tek bir stream bağlantısı
+
+    Kuyruk yerine olay adı başına yalnızca son değer tutulur; yavaş istemci
+    araya giren güncellemeleri kaçırır ama bellek büyümez ve bir sonraki
+    okumada en güncel durumu alır.
+    """
+
+    def __init__(self, drop_id: int, user_id: Optional[int]):
+        self.drop_id = drop_id
+        self.user_id = user_id
+        self.closed = False
+        self.last_position: Any = None
+        self._pending: Dict[str, Any] = {}
+        self._wake = asyncio.Event()
+
+    def push(self, event: str, data: Any) -> bool:
+        """Olayı beklemeye al; okunmamış aynı olayın yerine geçtiyse True"""
+        replaced = event in self._pending
+        self._pending[event] = data
+        if event == END_EVENT:
+            self.closed = True
+        self._wake.set()
+        return replaced
+
+    async def next(self, timeout: float) -> Optional[List[Tuple[str, Any]]]:
+        """Bekleyen olaylar; timeout içinde olay yoksa None (heartbeat zamanı)"""
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        self._wake.clear()
+        events = list(self._pending.items())
+        self._pending.clear()
+        return events
+
+
+class _DropChannel:
+    """Bir drop'un aboneleri, son yayınlanan durum ve yayıncı task'ı"""
+
+    def __init__(self, drop_id: int):
+        self.drop_id = drop_id
+        self.subscribers: Set[Subscriber] = set()
+        self.last: Dict[str, Any] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class DropEventBroker:
+    """
+    Drop bazlı süreç içi olay yayıncısı
+
+    Her drop için tek bir yayıncı task'ı interval_ms aralıkla loader ile
+    güncel durumu okur (abone sayısından bağımsız tur başına tek okuma) ve
+    yalnızca değişen kısımları abonelere dağıtır. Son abone ayrılınca task
+    durur. loader(drop_id, user_ids) sync çalışır ve
+    {"stock": ..., "window": ..., "positions": {user_id: ...}} ya da drop
+    yoksa None döndürür.
+    """
+
+    def __init__(self, loader: Callable[[int, Set[int]], Optional[Dict[str, Any]]],
+                 interval_ms: int, max_subscribers_per_drop: int):
+        self.loader = loader
+        self.interval_seconds = interval_ms / 1000
+        self.max_subscribers_per_drop = max_subscribers_per_drop
+        self._channels: Dict[int, _DropChannel] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def subscribe(self, drop_id: int, user_id: Optional[int] = None,
+                  initial: Optional[Dict[str, Any]] = None) -> Subscriber:
+        """
+        Abone ekle (event loop içinde çağrılmalı); drop'un yayıncısı yoksa başlat
+
+        initial verilirse abone ilk olarak o snapshot'ı, verilmezse kanalın
+        son yayınladığı durumu alır.
+        """
+        subscriber = Subscriber(drop_id, user_id)
+        with self._lock:
+            channel = self._channels.get(drop_id)
+            if channel is None:
+                channel = self._channels[drop_id] = _DropChannel(drop_id)
+            elif len(channel.subscribers) >= self.max_subscribers_per_drop:
+                self.rejected += 1
+                raise SubscriberLimitReached()
+
+            channel.subscribers.add(subscriber)
+            # Yeni abone bir sonraki turu beklemeden güncel durumu alır
+            state = initial if initial is not None else channel.last
+            for event in ("stock", "window"):
+                if event in state:
+                    subscriber.push(event, state[event])
+            if initial is not None and user_id is not None:
+                position = initial.get("positions", {}).get(user_id)
+                if position is not None:
+                    subscriber.last_position = position
+                    subscriber.push("position", position)
+
+            if channel.task is None:
+                channel.task = asyncio.create_task(self._publish_loop(channel))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            channel = self._channels.get(subscriber.drop_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers:
+                if channel.task is not None:
+                    channel.task.cancel()
+                del self._channels[subscriber.drop_id]
+
+    async def stream(self, subscriber: Subscriber, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+        """Abonenin olaylarını SSE olarak üret; bağlantı kapanınca aboneliği bırak"""
+        try:
+            while True:
+                events = await subscriber.next(heartbeat_seconds)
+                if events is None:
+                    yield HEARTBEAT
+                    continue
+                yield b"".join(format_event(event, data) for event, data in events)
+                if subscriber.closed:
+                    break
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def _publish_loop(self, channel: _DropChannel):
+        while channel.subscribers:
+            user_ids = {s.user_id for s in list(channel.subscribers) if s.user_id is not None}
+            try:
+                snapshot = await run_in_threadpool(self.loader, channel.drop_id, user_ids)
+            except Exception:
+                logger.exception("Event snapshot for drop %s failed", channel.drop_id)
+            else:
+                self.fan_out(channel.drop_id, snapshot)
+            await asyncio.sleep(self.interval_seconds)
+
+    def fan_out(self, drop_id: int, snapshot: Optional[Dict[str, Any]]):
+        """Snapshot'ın önceki yayından farklı kısımlarını abonelere dağıt"""
+        with self._lock:
+            channel = self._channels.get(drop_id)
+            if channel is None:
+                return
+            subscribers = list(channel.subscribers)
+
+            if snapshot is None:
+                for subscriber in subscribers:
+                    self._push(subscriber, END_EVENT, {"drop_id": drop_id, "reason": "not_found"})
+                return
+
+            for event in ("stock", "window"):
+                if snapshot[event] != channel.last.get(event):
+                    channel.last[event] = snapshot[event]
+                    for subscriber in subscribers:
+                        self._push(subscriber, event, snapshot[event])
+
+            positions = snapshot.get("positions", {})
+            for subscriber in subscribers:
+                if subscriber.user_id is None:
+                    continue
+                position = positions.get(subscriber.user_id)
+                if position is not None and position != subscriber.last_position:
+                    subscriber.last_position = position
+                    self._push(subscriber, "position", position)
+
+    def _push(self, subscriber: Subscriber, event: str, data: Any):
+        self.published += 1
+        if subscriber.push(event, data):
+            self.coalesced += 1
+
+    def clear(self):
+        """Tüm abonelikleri ve sayaçları sıfırla"""
+        with self._lock:
+            for channel in self._channels.values():
+                if channel.task is not None and not channel.task.done():
+                    try:
+                        channel.task.cancel()
+                    except RuntimeError:
+                        # Task'ın event loop'u kapanmış
+                        pass
+            self._channels.clear()
+            self.published = self.coalesced = self.rejected = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "drops": len(self._channels),
+                "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+                "per_drop": {
+                    str(drop_id): len(channel.subscribers)
+                    for drop_id, channel in self._channels.items()
+                },
+                "published": self.published,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected
+            }
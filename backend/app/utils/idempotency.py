@@ -0,0 +1,219 @@
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.cache import TTLCache
+
+# Süresi dolmuş kayıtlar bu büyüklükte parçalarla silinir (uzun kilit tutulmaz)
+PURGE_BATCH_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """Tamamlanmış bir isteğin tekrar oynatılacak cevabı"""
+    status_code: int
+    content_type: str
+    body: bytes
+    # content-type / content-length dışındaki header'lar (Set-Cookie, ETag, Retry-After...)
+    headers: Tuple[Tuple[str, str], ...] = ()
+
+
+class IdempotencyStore(ABC):
+    """
+    Idempotency-Key cevap deposu arayüzü
+
+    reserve() anahtarı işlenmekte olarak işaretler; True dönerse isteği
+    çağıran işler ve save() ya da release() çağırır. False dönerse aynı
+    anahtarla bir istek hâlâ işleniyordur.
+    """
+
+    # Metotlar bloklayan I/O yapıyorsa True (middleware threadpool'da çağırır)
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[StoredResponse]:
+        """Tamamlanmış cevap (yoksa ya da süresi dolduysa None)"""
+
+    @abstractmethod
+    def reserve(self, key: str) -> bool:
+        """Anahtarı işlenmekte olarak işaretle; başka istek işliyorsa False"""
+
+    @abstractmethod
+    def save(self, key: str, response: StoredResponse):
+        """Cevabı sakla ve rezervasyonu bitir"""
+
+    @abstractmethod
+    def release(self, key: str):
+        """Cevap saklamadan rezervasyonu bırak"""
+
+    @abstractmethod
+    def clear(self):
+        """Tüm kayıtları sil"""
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Tek worker için süreç içi TTL/LRU depo"""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        return self._responses.get(key)
+
+    def reserve(self, key: str) -> bool:
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def save(self, key: str, response: StoredResponse):
+        self._responses.set(key, response)
+        self.release(key)
+
+    def release(self, key: str):
+        with self._lock:
+            self._in_flight.discard(key)
+
+    def clear(self):
+        self._responses.clear()
+        with self._lock:
+            self._in_flight.clear()
+
+    @property
+    def stats(self):
+        return {**self._responses.stats, "in_flight": len(self._in_flight)}
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """
+    Çoklu worker için veritabanı tablosu (idempotency_keys) üzerinde depo
+
+    İşlenmekte olan istek status_code'u NULL bir satırla temsil edilir.
+    lock_timeout_seconds'tan eski yarım kalmış satırlar devralınır.
+    """
+
+    blocking = True
+
+    def __init__(self, session_factory: Callable[[], Session], ttl_seconds: float,
+                 lock_timeout_seconds: float = 30):
+        self.session_factory = session_factory
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lock_timeout = timedelta(seconds=lock_timeout_seconds)
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self.session_factory() as db:
+            row = db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.isnot(None),
+                IdempotencyKey.expires_at > datetime.utcnow()
+            ).first()
+            if row is None:
+                return None
+            return StoredResponse(
+                row.status_code, row.content_type, row.body,
+                tuple((name, value) for name, value in row.headers or ())
+            )
+
+    def reserve(self, key: str) -> bool:
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            try:
+                db.add(IdempotencyKey(key=key, created_at=now, expires_at=now + self.ttl))
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+
+            # Süresi dolmuş cevap ya da yarım kalmış kilit: devral
+            taken = db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                (IdempotencyKey.expires_at <= now) | (
+                    IdempotencyKey.status_code.is_(None) &
+                    (IdempotencyKey.created_at <= now - self.lock_timeout)
+                )
+            ).update({
+                "status_code": None,
+                "body": None,
+                "headers": None,
+                "created_at": now,
+                "expires_at": now + self.ttl
+            }, synchronize_session=False)
+            db.commit()
+            return taken == 1
+
+    def save(self, key: str, response: StoredResponse):
+        with self.session_factory() as db:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({
+                "status_code": response.status_code,
+                "content_type": response.content_type,
+                "body": response.body,
+                "headers": [list(header) for header in response.headers],
+                "expires_at": datetime.utcnow() + self.ttl
+            }, synchronize_session=False)
+            db.commit()
+
+    def release(self, key: str):
+        with self.session_factory() as db:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None)
+            ).delete(synchronize_session=False)
+            db.commit()
+
+    def clear(self):
+        with self.session_factory() as db:
+            db.query(IdempotencyKey).delete(synchronize_session=False)
+            db.commit()
+
+
+def purge_expired_keys(db: Session, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """
+    Süresi dolmuş idempotency_keys satırlarını sil (arka plan işi)
+
+    Silme expires_at indeksi üzerinden parça parça yapılır, her parça ayrı
+    commit edilir. Arada reserve() ile devralınmış satır (expires_at ileri
+    alınmış) silinmez. Silinen satır sayısı döner.
+    """
+    purged = 0
+    while True:
+        now = datetime.utcnow()
+        expired = select(IdempotencyKey.key).where(IdempotencyKey.expires_at <= now).limit(batch_size)
+        deleted = db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.key.in_(expired),
+                IdempotencyKey.expires_at <= now
+            )
+        ).rowcount
+        db.commit()
+
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+
+def get_idempotency_store() -> Optional[IdempotencyStore]:
+    """Ayarlara göre depo oluştur (idempotency_backend = memory | database | off)"""
+    backend = settings.idempotency_backend.lower()
+
+    if backend == "memory":
+        return InMemoryIdempotencyStore(
+            maxsize=settings.idempotency_max_entries,
+            ttl_seconds=settings.idempotency_ttl_seconds
+        )
+    if backend == "database":
+        return DatabaseIdempotencyStore(SessionLocal, ttl_seconds=settings.idempotency_ttl_seconds)
+    return None
+
+
+# Uygulama genelinde kullanılan depo (off ise None)
+idempotency_store = get_idempotency_store()
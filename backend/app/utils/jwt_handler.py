@@ -1,10 +1,17 @@
+import hashlib
+import logging
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.password_hasher import password_context
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Inline (aynı thread) hash; request yolları app.utils.password_hasher kullanır
+pwd_context = password_context(settings.password_hash_rounds)
 
 
 def hash_password(password: str) -> str:
@@ -39,18 +46,87 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def decode_token(token: str) -> Optional[Dict[str, Any]]:
-    """JWT token'ı decode et"""
+class TokenCache:
+    """
+    Doğrulanmış token payload'ları ve bilinen geçersiz token'lar
+
+    Anahtar token'ın hash'idir. Geçerli payload token'ın exp anına kadar,
+    geçersiz token negative_ttl saniye tutulur; geçersiz token seli ayrı
+    önbellekte olduğu için geçerli kayıtları LRU'dan atamaz.
+    """
+
+    def __init__(self, max_entries: int, negative_ttl: float, negative_max_entries: int):
+        self.negative_ttl = negative_ttl
+        self.valid = TTLCache(maxsize=max_entries, ttl=0)
+        self.invalid = TTLCache(maxsize=negative_max_entries, ttl=negative_ttl)
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes):
+        """(bulundu mu, payload ya da None)"""
+        payload = self.valid.get(key)
+        if payload is not None:
+            return True, payload
+        if self.invalid.get(key) is not None:
+            return True, None
+        return False, None
+
+    def set_valid(self, key: bytes, payload: Dict[str, Any]):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        ttl = exp - time.time()
+        if ttl > 0:
+            self.valid.set(key, payload, ttl=ttl)
+
+    def set_invalid(self, key: bytes):
+        if self.negative_ttl > 0:
+            self.invalid.set(key, True)
+
+    def clear(self):
+        self.valid.clear()
+        self.invalid.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"valid": self.valid.stats, "invalid": self.invalid.stats}
+
+
+token_cache = TokenCache(
+    max_entries=settings.token_cache_max_entries,
+    negative_ttl=settings.token_negative_cache_seconds,
+    negative_max_entries=settings.token_negative_cache_max_entries
+)
+
+
+def _verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """İmza ve exp doğrulaması (önbelleksiz)"""
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token,
             settings.secret_key,
             algorithms=[settings.algorithm]
         )
-        return payload
     except JWTError as e:
-        print(f"JWT decode error: {e}")  # Debug için
+        logger.info("JWT rejected: %s", e, extra={"reason": e.__class__.__name__})
         return None
-    except Exception as e:
-        print(f"Unexpected error: {e}")  # Debug için
+    except Exception:
+        logger.exception("Unexpected error while decoding JWT")
         return None
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """JWT token'ı decode et (doğrulanmış/geçersiz token önbellekli; payload salt okunur)"""
+    key = TokenCache.key(token)
+    found, payload = token_cache.get(key)
+    if found:
+        return payload
+
+    payload = _verify_token(token)
+    if payload is None:
+        token_cache.set_invalid(key)
+    else:
+        token_cache.set_valid(key, payload)
+    return payload
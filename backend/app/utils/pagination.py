@@ -0,0 +1,29 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+
+
+def encode_cursor(*values: Any) -> str:
+    """Keyset değerlerini opak cursor string'ine çevir"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, types: Optional[Sequence[Any]] = None) -> List[Any]:
+    """Cursor'ı keyset değerlerine çevir; types verilirse değer tipleri de kontrol edilir (geçersizse ValueError)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+
+    # bool int'in alt sınıfı; JSON true/false id ya da skor yerine geçmesin
+    if types is not None and any(
+        isinstance(value, bool) or not isinstance(value, expected)
+        for value, expected in zip(values, types)
+    ):
+        raise ValueError("Invalid cursor")
+    return values
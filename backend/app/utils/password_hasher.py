@@ -0,0 +1,186 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+from passlib.context import CryptContext
+from app.config import settings
+
+
+@lru_cache()
+def password_context(rounds: int) -> CryptContext:
+    """rounds maliyetli pbkdf2_sha256 context'i; farklı maliyetli hash'ler güncellenmeli sayılır"""
+    return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__rounds=rounds)
+
+
+def pool_context():
+    """
+    Worker process'lerinin başlatma yöntemi: forkserver (yoksa spawn)
+
+    fork, thread'leri ve kilitleri (SQLAlchemy havuzu, zamanlayıcı, event loop)
+    canlı olan sunucu process'inin kopyasını alır; çocuk process kilitlenebilir.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# Worker process'te çalışan fonksiyonlar (pickle edilebilir, modül seviyesinde)
+
+def _hash(password: str, rounds: int) -> Tuple[str, float]:
+    started = time.time()
+    return password_context(rounds).hash(password), started
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[Tuple[bool, Optional[str]], float]:
+    started = time.time()
+    return password_context(rounds).verify_and_update(password, hashed), started
+
+
+class HashingOverloaded(Exception):
+    """Bekleyen hash işi limiti dolu; retry_after saniye sonra tekrar denenmeli"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("password hashing overloaded")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    pbkdf2 hash/doğrulamayı process pool'da çalıştırır
+
+    CPU yoğun iş ayrı process'te yapıldığı için worker'ın GIL'ini tutmaz;
+    bekleyen thread/coroutine sadece sonucu bekler. Aynı anda en fazla
+    max_pending iş kabul edilir (fazlası HashingOverloaded). workers=0 ise
+    iş çağıranın thread'inde çalışır. Kuyrukta bekleme ve hash süreleri
+    stats ile okunur.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Sayaçları sıfırla"""
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=pool_context()
+                )
+            return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_pending:
+                self.rejected += 1
+                raise HashingOverloaded()
+            self.in_flight += 1
+
+    def _record(self, submitted: float, started: float):
+        finished = time.time()
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            queued = max(started - submitted, 0.0)
+            self.queue_seconds += queued
+            self.max_queue_seconds = max(self.max_queue_seconds, queued)
+            self.hash_seconds += finished - started
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _submit(self, fn: Callable, *args) -> Tuple[Future, float]:
+        submitted = time.time()
+        if self.workers <= 0:
+            future: Future = Future()
+            future.set_result(fn(*args))
+            return future, submitted
+        return self._pool().submit(fn, *args), submitted
+
+    def _run(self, fn: Callable, *args) -> Any:
+        """İşi çalıştır ve sonucunu bekle (sync; threadpool'dan çağrılır)"""
+        self._acquire()
+        try:
+            future, submitted = self._submit(fn, *args)
+            value, started = future.result()
+        except BaseException:
+            self._release()
+            raise
+        self._record(submitted, started)
+        return value
+
+    async def _run_async(self, fn: Callable, *args) -> Any:
+        """İşi çalıştır, sonucu event loop'u bloklamadan bekle"""
+        if self.workers <= 0:
+            return await asyncio.to_thread(self._run, fn, *args)
+
+        self._acquire()
+        try:
+            future, submitted = self._submit(fn, *args)
+            value, started = await asyncio.wrap_future(future)
+        except BaseException:
+            self._release()
+            raise
+        self._record(submitted, started)
+        return value
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.rounds)
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(doğru mu, maliyet değiştiyse yeni hash ya da None)"""
+        return self._run(_verify_and_update, password, hashed, self.rounds)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(_hash, password, self.rounds)
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._run_async(_verify_and_update, password, hashed, self.rounds)
+
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+
+    def shutdown(self, wait: bool = False):
+        """Pool'u kapat (bekleyen işler iptal edilir); wait=True ise worker'lar çıkana kadar bekle"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_queue_ms": round(self.queue_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+                "max_queue_ms": round(self.max_queue_seconds * 1000, 2),
+                "avg_hash_ms": round(self.hash_seconds / self.completed * 1000, 2) if self.completed else 0.0
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    rounds=settings.password_hash_rounds
+)
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.user import User, UserRole
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Doğrulanmış kullanıcının request'lerde gereken alanları (ORM nesnesi değil)"""
+    id: int
+    role: UserRole
+    created_at: datetime
+
+
+# user_id -> UserPrincipal; TTL diğer worker'lardaki değişiklikler için üst sınır
+user_principal_cache = TTLCache(
+    maxsize=settings.user_cache_max_entries,
+    ttl=settings.user_cache_ttl_seconds
+)
+
+
+def load_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """Kullanıcıyı sadece gereken kolonlarla oku (identity map'e nesne yüklemez)"""
+    row = db.query(User.id, User.role, User.created_at).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return UserPrincipal(id=row.id, role=row.role, created_at=row.created_at)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal(mapper, connection, target: User):
+    """ORM üzerinden değişen/silinen kullanıcının önbellek kaydını at"""
+    user_principal_cache.pop(target.id)
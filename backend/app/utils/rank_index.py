@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FenwickTree:
+    """Prefix toplamları O(log n) veren Fenwick (binary indexed) ağacı"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_counts(cls, counts: Dict[int, int], size: int) -> "FenwickTree":
+        """{index: adet} değerlerinden O(size) kurulum"""
+        tree = cls(size)
+        data = tree._tree
+        for index, count in counts.items():
+            data[index + 1] += count
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                data[parent] += data[index]
+        return tree
+
+    def add(self, index: int, delta: int):
+        """index (0 tabanlı) konumuna delta ekle"""
+        index += 1
+        while index <= self.size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count: int) -> int:
+        """İlk count konumun toplamı ([0, count))"""
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def find_kth(self, k: int) -> int:
+        """prefix(i + 1) >= k olan en küçük i (k >= 1)"""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self._tree[nxt] < k:
+                position = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return position
+
+
+class DropRankIndex:
+    """
+    Tek bir drop'un WAITING kayıtları için sıra indeksi
+
+    Skorlar tam sayı genişliğinde kovalara ayrılır; kova doluluğu Fenwick
+    ağacında, kova içi sıralama küçük sıralı listelerde tutulur. Pozisyon ve
+    ilk K sorguları O(log n) (+ K) sürer. Skor aralığı dışına çıkılırsa
+    ağaç iki katı genişlikle yeniden kurulur.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[int, float]] = ()):
+        # Toplu kurulum: kayıt başına add() yerine kova başına tek sıralama
+        self._scores: Dict[int, float] = dict(entries)
+        self._buckets: Dict[int, List[Tuple[float, int]]] = {}
+        for user_id, score in self._scores.items():
+            bucket = math.floor(score)
+            items = self._buckets.get(bucket)
+            if items is None:
+                items = self._buckets[bucket] = []
+            items.append((score, user_id))
+        for items in self._buckets.values():
+            items.sort()
+
+        self._low = 0
+        self._tree = FenwickTree(1)
+        if self._buckets:
+            low, high = min(self._buckets), max(self._buckets)
+            self._low, size = self._range(low, high)
+            self._tree = FenwickTree.from_counts(
+                {key - self._low: len(items) for key, items in self._buckets.items()}, size
+            )
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._scores
+
+    def _ensure_range(self, bucket: int):
+        """Kova mevcut aralıkta değilse ağacı genişleterek yeniden kur"""
+        if self._scores and self._low <= bucket < self._low + self._tree.size:
+            return
+
+        keys = list(self._buckets) + [bucket]
+        self._low, size = self._range(min(keys), max(keys))
+        self._tree = FenwickTree.from_counts(
+            {key - self._low: len(items) for key, items in self._buckets.items()}, size
+        )
+
+    @staticmethod
+    def _range(low: int, high: int) -> Tuple[int, int]:
+        """[low, high] kovalarını ortada tutan iki katı genişlikte aralık: (alt sınır, boyut)"""
+        size = 1
+        while size < (high - low + 1) * 2:
+            size *= 2
+        return low - (size - (high - low + 1)) // 2, size
+
+    def add(self, user_id: int, score: float):
+        """Kaydı ekle (varsa skorunu güncelle)"""
+        if user_id in self._scores:
+            self.remove(user_id)
+
+        bucket = math.floor(score)
+        self._ensure_range(bucket)
+        insort(self._buckets.setdefault(bucket, []), (score, user_id))
+        self._tree.add(bucket - self._low, 1)
+        self._scores[user_id] = score
+
+    def remove(self, user_id: int):
+        """Kaydı çıkar (yoksa bir şey yapma)"""
+        score = self._scores.pop(user_id, None)
+        if score is None:
+            return
+
+        bucket = math.floor(score)
+        items = self._buckets[bucket]
+        items.pop(bisect_left(items, (score, user_id)))
+        if not items:
+            del self._buckets[bucket]
+        self._tree.add(bucket - self._low, -1)
+
+    def count_below(self, score: float) -> int:
+        """Skoru score'dan küçük kayıt sayısı"""
+        bucket = math.floor(score)
+        offset = bucket - self._low
+        if offset < 0:
+            return 0
+        if offset >= self._tree.size:
+            return len(self._scores)
+
+        below = self._tree.prefix(offset)
+        items = self._buckets.get(bucket)
+        if items:
+            below += bisect_left(items, (score,))
+        return below
+
+    def position_of_score(self, score: float) -> int:
+        """score'a sahip bir kaydın 1 tabanlı pozisyonu"""
+        return self.count_below(score) + 1
+
+    def position(self, user_id: int) -> Optional[int]:
+        """Kullanıcının 1 tabanlı pozisyonu (WAITING değilse None)"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self.position_of_score(score)
+
+    def top(self, k: int) -> List[Tuple[int, float]]:
+        """En iyi (en düşük skorlu) k kayıt: [(user_id, score), ...]"""
+        result: List[Tuple[int, float]] = []
+        k = min(k, len(self._scores))
+        seen = 0
+
+        while len(result) < k:
+            # Sıradaki boş olmayan kova
+            index = self._tree.find_kth(seen + 1)
+            items = self._buckets[index + self._low]
+            for score, user_id in items[:k - len(result)]:
+                result.append((user_id, score))
+            seen += len(items)
+
+        return result
+
+
+def _wait(build: Future):
+    """Devam eden kurulumu bekle; AsyncSession.run_sync içindeyse event loop'u bloklamadan"""
+    if in_greenlet():
+        await_only(asyncio.wrap_future(build))
+    else:
+        build.result()
+
+
+class RankIndexRegistry:
+    """
+    Drop bazlı sıra indekslerini tutar
+
+    İndeks ilk kullanımda veritabanından (idx_drop_priority sırasıyla) kurulur,
+    join/leave/claim sonrası artımlı güncellenir. Bir drop için aynı anda tek
+    kurulum yapılır; eşzamanlı istekler onu bekler. Diğer worker'ların
+    yazdıklarını da görmek için refresh_seconds'tan eski indeksler refresher
+    ile arka plan thread'inde yeniden kurulur, bu sırada eski indeks
+    kullanılmaya devam eder ve kurulum bitince yerine geçer. Kurulum sürerken
+    gelen add/remove'lar kaydedilip yeni indekse uygulanır. En fazla max_drops
+    indeks tutulur; en uzun süredir sorgulanmayan çıkarılır (LRU).
+    """
+
+    def __init__(self, refresh_seconds: float,
+                 refresher: Optional[Callable[[int], Iterable[Tuple[int, float]]]] = None,
+                 max_drops: int = 1000):
+        self.refresh_seconds = refresh_seconds
+        # refresher(drop_id): kendi session'ıyla kayıtları okur (arka plan yenileme)
+        self.refresher = refresher
+        self.max_drops = max_drops
+        self._indexes: "OrderedDict[int, Tuple[DropRankIndex, float]]" = OrderedDict()
+        self._builds: Dict[int, Future] = {}
+        self._journals: Dict[int, List[Tuple[int, Optional[float]]]] = {}
+        self._lock = threading.RLock()
+        self.builds = 0
+
+    def query(self, drop_id: int, loader: Callable[[], Iterable[Tuple[int, float]]],
+              fn: Callable[[DropRankIndex], Any]) -> Any:
+        """
+        Drop indeksi üzerinde fn'i kilit altında çalıştır
+
+        İndeks yoksa loader() ile kurulur (kurulum sürüyorsa beklenir). Eskiyse
+        refresher varsa arka planda, yoksa tek bir çağıranda yenilenir.
+        """
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                cached = self._indexes.get(drop_id)
+                build = self._builds.get(drop_id)
+                if cached is not None:
+                    self._indexes.move_to_end(drop_id)
+                    if build is not None or now - cached[1] < self.refresh_seconds:
+                        return fn(cached[0])
+                    build = self._start_build(drop_id)
+                    if self.refresher is not None:
+                        threading.Thread(
+                            target=self._build,
+                            args=(drop_id, lambda: self.refresher(drop_id), build, True),
+                            name=f"rank-index-{drop_id}",
+                            daemon=True
+                        ).start()
+                        return fn(cached[0])
+                    owner = True
+                elif build is None:
+                    build = self._start_build(drop_id)
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                _wait(build)
+                continue
+
+            index = self._build(drop_id, loader, build)
+            if index is not None:
+                with self._lock:
+                    return fn(index)
+
+    def _start_build(self, drop_id: int) -> Future:
+        """Kurulumu başlat (kilit altında çağrılır)"""
+        build = self._builds[drop_id] = Future()
+        self._journals[drop_id] = []
+        return build
+
+    def _build(self, drop_id: int, loader: Callable[[], Iterable[Tuple[int, float]]], build: Future,
+               background: bool = False) -> Optional[DropRankIndex]:
+        """İndeksi kilit dışında kur, kurulum sırasındaki değişiklikleri uygulayıp yerine koy"""
+        index = None
+        try:
+            started = time.monotonic()
+            index = DropRankIndex(loader())
+            with self._lock:
+                journal = self._journals.pop(drop_id, None)
+                # invalidate() edildiyse sonuç kullanılmaz, bekleyenler yeniden kurar
+                if journal is None:
+                    index = None
+                else:
+                    for user_id, score in journal:
+                        if score is None:
+                            index.remove(user_id)
+                        else:
+                            index.add(user_id, score)
+                    self._indexes[drop_id] = (index, started)
+                    self._indexes.move_to_end(drop_id)
+                    while len(self._indexes) > self.max_drops:
+                        self._indexes.popitem(last=False)
+                    self.builds += 1
+        except Exception:
+            index = None
+            with self._lock:
+                self._journals.pop(drop_id, None)
+            if not background:
+                raise
+            # Eski indeks kullanılmaya devam eder, sonraki sorgu yeniden dener
+            logger.exception("Rank index refresh for drop %s failed", drop_id)
+        finally:
+            with self._lock:
+                if self._builds.get(drop_id) is build:
+                    del self._builds[drop_id]
+            build.set_result(None)
+        return index
+
+    def add(self, drop_id: int, user_id: int, score: float):
+        with self._lock:
+            cached = self._indexes.get(drop_id)
+            if cached is not None:
+                cached[0].add(user_id, score)
+            journal = self._journals.get(drop_id)
+            if journal is not None:
+                journal.append((user_id, score))
+
+    def remove(self, drop_id: int, user_ids: Iterable[int]):
+        with self._lock:
+            cached = self._indexes.get(drop_id)
+            journal = self._journals.get(drop_id)
+            for user_id in user_ids:
+                if cached is not None:
+                    cached[0].remove(user_id)
+                if journal is not None:
+                    journal.append((user_id, None))
+
+    def invalidate(self, drop_id: int):
+        with self._lock:
+            self._indexes.pop(drop_id, None)
+            self._journals.pop(drop_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._journals.clear()
+
+
+rank_indexes = RankIndexRegistry(
+    settings.rank_index_refresh_seconds,
+    max_drops=settings.rank_index_max_drops
+)
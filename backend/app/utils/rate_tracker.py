@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Hashable, Iterable, Optional, Tuple
+from app.config import settings
+
+
+class InMemoryRateBackend:
+    """
+    Süreç içi sliding window sayacı
+
+    Her anahtar için pencere içindeki olay zamanları tutulur. En fazla
+    max_keys anahtar saklanır (LRU), anahtar başına en fazla
+    max_events_per_key olay tutulur; bellek sınırlıdır.
+    """
+
+    def __init__(self, max_keys: int, max_events_per_key: int):
+        self.max_keys = max_keys
+        self.max_events_per_key = max_events_per_key
+        self._events: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, now: float, window: float):
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                events = self._events[key] = deque(maxlen=self.max_events_per_key)
+            self._events.move_to_end(key)
+
+            events.append(now)
+            while events and events[0] <= now - window:
+                events.popleft()
+
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def count(self, key: Hashable, now: float, window: float) -> int:
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                return 0
+
+            while events and events[0] <= now - window:
+                events.popleft()
+            if not events:
+                del self._events[key]
+                return 0
+            return len(events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+class RedisRateBackend:
+    """Çoklu worker için Redis sorted set tabanlı sliding window (redis paketi gerekir)"""
+
+    def __init__(self, url: str, prefix: str = "dropspot:rate"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("rate_tracker_backend=redis requires the 'redis' package")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, key: Tuple) -> str:
+        return ":".join([self.prefix, *map(str, key)])
+
+    def record(self, key: Tuple, now: float, window: float):
+        redis_key = self._key(key)
+        pipe = self.client.pipeline()
+        pipe.zadd(redis_key, {f"{now}:{uuid.uuid4().hex}": now})
+        pipe.zremrangebyscore(redis_key, 0, now - window)
+        pipe.expire(redis_key, int(window) + 1)
+        pipe.execute()
+
+    def count(self, key: Tuple, now: float, window: float) -> int:
+        return self.client.zcount(self._key(key), f"({now - window}", "+inf")
+
+    def clear(self):
+        for redis_key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(redis_key)
+
+
+class RateTracker:
+    """
+    (user, drop, action) bazında son window_seconds içindeki olay sayısı
+
+    join_waitlist'in rapid action cezası için veritabanı sorgusu yerine
+    kullanılır; join ve leave olayları ayrı ayrı kaydedilir.
+    """
+
+    def __init__(self, backend, window_seconds: float):
+        self.backend = backend
+        self.window_seconds = window_seconds
+
+    def record(self, user_id: int, drop_id: int, action: str, now: Optional[float] = None):
+        self.backend.record(
+            (user_id, drop_id, action),
+            time.time() if now is None else now,
+            self.window_seconds
+        )
+
+    def count(self, user_id: int, drop_id: int, actions: Iterable[str] = ("join", "leave"),
+              now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return sum(
+            self.backend.count((user_id, drop_id, action), now, self.window_seconds)
+            for action in actions
+        )
+
+    def clear(self):
+        self.backend.clear()
+
+
+def get_rate_tracker() -> RateTracker:
+    """Ayarlara göre tracker oluştur (rate_tracker_backend = memory | redis)"""
+    if settings.rate_tracker_backend.lower() == "redis":
+        backend = RedisRateBackend(settings.redis_url)
+    else:
+        backend = InMemoryRateBackend(
+            max_keys=settings.rate_tracker_max_keys,
+            max_events_per_key=settings.rate_tracker_max_events_per_key
+        )
+    return RateTracker(backend, settings.rate_window_seconds)
+
+
+rate_tracker = get_rate_tracker()
@@ -0,0 +1,60 @@
+import threading
+from typing import Any, Dict, Hashable, Optional
+from app.config import settings
+from app.utils.cache import TTLCache
+
+
+class VersionedResponseCache:
+    """
+    Sürüm anahtarlı cevap önbelleği
+
+    Liste kayıtları liste sürümüyle, drop detayları drop sürümüyle anahtarlanır.
+    invalidate() sürümü artırır; eski kayıtlara bir daha erişilmez ve LRU ile
+    atılır. Başka worker'lardaki değişiklikler için ttl üst sınırdır.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._list_version = 0
+        self._drop_versions: Dict[int, int] = {}
+
+    def list_key(self, *parts: Hashable) -> tuple:
+        return ("list", self._epoch, self._list_version, *parts)
+
+    def drop_key(self, drop_id: int) -> tuple:
+        return ("drop", self._epoch, drop_id, self._drop_versions.get(drop_id, 0))
+
+    def get(self, key: tuple) -> Any:
+        return self._cache.get(key)
+
+    def set(self, key: tuple, value: Any):
+        self._cache.set(key, value)
+
+    def invalidate(self, drop_id: Optional[int] = None):
+        """Listeleri ve (verilmişse) tek drop'u, verilmemişse tüm drop'ları geçersiz kıl"""
+        with self._lock:
+            self._list_version += 1
+            if drop_id is None:
+                self._epoch += 1
+                self._drop_versions.clear()
+            else:
+                self._drop_versions[drop_id] = self._drop_versions.get(drop_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._drop_versions.clear()
+            self._epoch += 1
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats
+
+
+# GET /drops ve GET /drops/{id} cevaplarının paylaşılan kısmı
+drop_response_cache = VersionedResponseCache(
+    maxsize=settings.drop_cache_max_entries,
+    ttl=settings.drop_cache_ttl_seconds
+)
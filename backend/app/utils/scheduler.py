@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Any, Callable, List, Tuple
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Periyodik arka plan işleri
+
+    Her iş kendi asyncio task'ında interval_seconds aralıkla çalışır. İşler
+    sync servis fonksiyonlarıdır; threadpool'da kendi session'ları ile
+    çalıştırılır. Hata veren iş loglanır, sonraki turda tekrar denenir.
+    """
+
+    def __init__(self):
+        self._jobs: List[Tuple[str, float, Callable[[Session], Any]]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, interval_seconds: float, fn: Callable[[Session], Any]):
+        self._jobs.append((name, interval_seconds, fn))
+
+    @staticmethod
+    def run_once(fn: Callable[[Session], Any]) -> Any:
+        """İşi yeni bir session ile bir kez çalıştır"""
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    async def _loop(self, name: str, interval_seconds: float, fn: Callable[[Session], Any]):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await run_in_threadpool(self.run_once, fn)
+            except Exception:
+                logger.exception("Background job %s failed", name)
+
+    def start(self):
+        """İşleri başlat (event loop içinde çağrılmalı)"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._loop(name, interval, fn))
+            for name, interval, fn in self._jobs
+        ]
+
+    async def stop(self):
+        """Çalışan işleri iptal et"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+scheduler = Scheduler()
@@ -1,11 +1,21 @@
 from datetime import datetime
+from typing import List, Optional, Tuple
+import random
+import string
+import numpy as np
 from app.config import settings
 
+# Claim code alfabesi ve kriptografik rastgele kaynak
+CLAIM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+CLAIM_CODE_LENGTH = 9
+_system_random = random.SystemRandom()
+
 
 def calculate_priority_score(
         user_created_at: datetime,
         signup_latency_ms: int,
-        rapid_actions_count: int
+        rapid_actions_count: int,
+        now: Optional[datetime] = None
 ) -> float:
     """
     Seed-based priority score hesaplama
@@ -15,11 +25,14 @@ def calculate_priority_score(
 
     Daha düşük score = daha yüksek öncelik
     """
+    # Tek referans zamanı (base ve account age aynı andan hesaplanır)
+    now = now or datetime.utcnow()
+
     # Account age in days
-    account_age_days = (datetime.utcnow() - user_created_at).days
+    account_age_days = (now - user_created_at).days
 
     # Base position (şu anki timestamp'i kullanarak deterministic base)
-    base = int(datetime.utcnow().timestamp() * 1000) % 10000
+    base = int(now.timestamp() * 1000) % 10000
 
     # Seed katsayıları
     A = settings.seed_a
@@ -32,11 +45,45 @@ def calculate_priority_score(
     return float(score)
 
 
+def calculate_priority_scores(
+        user_created_at: np.ndarray,
+        signup_latency_ms: np.ndarray,
+        rapid_actions_count: np.ndarray,
+        now: datetime
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    calculate_priority_score'un NumPy dizileri üzerinde toplu hali
+
+    user_created_at datetime64 dizisidir; tüm skorlar aynı referans zamanına
+    (now) göre hesaplanır. (priority_scores, account_age_days) döner.
+    """
+    reference = np.datetime64(now, "us")
+    account_age_days = (reference - user_created_at.astype("datetime64[us]")) // np.timedelta64(1, "D")
+
+    base = int(now.timestamp() * 1000) % 10000
+
+    # Python % ile aynı işaret kuralı (np.mod)
+    scores = (
+        base
+        + np.mod(signup_latency_ms.astype(np.int64), settings.seed_a)
+        + np.mod(account_age_days, settings.seed_b)
+        - np.mod(rapid_actions_count.astype(np.int64), settings.seed_c)
+    ).astype(np.float64)
+
+    return scores, account_age_days
+
+
 def generate_claim_code() -> str:
     """Benzersiz claim code üret"""
-    import secrets
-    import string
-
     # DROPSPOT-ABC123XYZ formatında
-    random_part = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(9))
+    random_part = ''.join(_system_random.choices(CLAIM_CODE_ALPHABET, k=CLAIM_CODE_LENGTH))
     return f"DROPSPOT-{random_part}"
+
+
+def generate_claim_codes(count: int) -> List[str]:
+    """count adet claim code'u tek seferde üret (tekrarlar çağırana ait)"""
+    chars = ''.join(_system_random.choices(CLAIM_CODE_ALPHABET, k=CLAIM_CODE_LENGTH * count))
+    return [
+        f"DROPSPOT-{chars[i:i + CLAIM_CODE_LENGTH]}"
+        for i in range(0, len(chars), CLAIM_CODE_LENGTH)
+    ]
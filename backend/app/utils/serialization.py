@@ -0,0 +1,40 @@
+from typing import Any, Dict
+import orjson
+from starlette.responses import Response
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes (datetime, enum ve numpy tipleri doğrudan desteklenir)"""
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class JSONBytesResponse(Response):
+    """Hazır JSON bytes'ı (ya da orjson ile serialize edilen içeriği) döndürür"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+class FlaggedObject:
+    """
+    Son alanı bool bir bayrak olan, önceden serialize edilmiş JSON nesnesi
+
+    Paylaşılan alanlar bir kez bytes'a çevrilir; kullanıcıya özel bayrak
+    (ör. user_joined) istek anında sona eklenir.
+    """
+
+    __slots__ = ("fields", "_head")
+
+    def __init__(self, fields: Dict[str, Any], flag_name: str):
+        self.fields = fields
+        self._head = dumps(fields)[:-1] + b',"' + flag_name.encode() + b'":'
+
+    @property
+    def head(self) -> bytes:
+        return self._head
+
+    def render(self, flag: bool) -> bytes:
+        return self._head + (b"true}" if flag else b"false}")
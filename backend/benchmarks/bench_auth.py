@@ -0,0 +1,72 @@
+"""
+İstek başına kimlik doğrulama maliyeti benchmark'ı
+
+Token doğrulama (python-jose decode + HMAC) önbelleksiz ve önbellekli,
+geçersiz token önbelleksiz ve önbellekli, ve get_current_user'ın tamamı
+(token + principal önbelleği sıcak) ölçülür. Veritabanı gerekmez.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_auth [istek_sayısı]
+"""
+import asyncio
+import sys
+import time
+import timeit
+from datetime import datetime
+from fastapi.security import HTTPAuthorizationCredentials
+from app.middleware.auth_middleware import get_current_user
+from app.models.user import UserRole
+from app.utils.jwt_handler import _verify_token, create_access_token, decode_token, token_cache
+from app.utils.principal import UserPrincipal, user_principal_cache
+
+
+def per_call_us(fn, number: int, repeat: int = 5) -> float:
+    best = min(timeit.repeat(fn, repeat=repeat, number=number))
+    return best / number * 1e6
+
+
+def current_user_us(token: str, number: int, repeat: int = 5) -> float:
+    """get_current_user'ı event loop içinde number kez çağır, çağrı başına süre"""
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(number):
+            await get_current_user(credentials, None)
+        return time.perf_counter() - start
+
+    loop = asyncio.new_event_loop()
+    try:
+        return min(loop.run_until_complete(run()) for _ in range(repeat)) / number * 1e6
+    finally:
+        loop.close()
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    token = create_access_token(data={"sub": 1})
+    bad_token = token[:-4] + "AAAA"
+
+    # Principal önbelleği sıcak: get_current_user veritabanına gitmez
+    user_principal_cache.set(1, UserPrincipal(id=1, role=UserRole.USER, created_at=datetime.utcnow()))
+
+    results = {
+        "verify (jose decode, uncached)": per_call_us(lambda: _verify_token(token), number),
+        "decode_token, cached": per_call_us(lambda: decode_token(token), number),
+        "invalid token, uncached": per_call_us(lambda: _verify_token(bad_token), number),
+        "invalid token, negative cached": per_call_us(lambda: decode_token(bad_token), number),
+    }
+
+    token_cache.clear()
+    token_cache.valid.maxsize = 0
+    results["get_current_user, token cache off"] = current_user_us(token, number)
+    token_cache.valid.maxsize = 100000
+    results["get_current_user, token cache on"] = current_user_us(token, number)
+
+    print(f"{number} calls")
+    for name, value in results.items():
+        print(f"  {name:<36} {value:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
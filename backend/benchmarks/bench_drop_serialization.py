@@ -0,0 +1,82 @@
+"""
+Drop listesi serileştirme benchmark'ı
+
+Eski yol: ORM nesnesi -> model_validate -> model_dump -> DropResponse(**) ->
+response_model ile tekrar doğrulama + JSON. Yeni yol: kolon tuple'ı -> dict ->
+orjson parçası (önbellek doldurma) ve önbellekten sayfa üretimi.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_drop_serialization [item_sayısı]
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from typing import List
+from app.models.drop import AllocationMode, Drop, DropStatus
+from app.schemas.drop_schema import DropResponse
+from app.services.drop_service import DROP_FIELDS
+from app.utils.serialization import FlaggedObject
+
+
+def make_rows(count: int):
+    now = datetime.utcnow()
+    return [
+        (
+            i, f"Drop {i}", "Limited edition item", 100, i % 100,
+            now + timedelta(hours=i), now + timedelta(hours=i + 1),
+            DropStatus.ACTIVE, now, 1, AllocationMode.FIRST_COME, None
+        )
+        for i in range(count)
+    ]
+
+
+def make_drops(rows):
+    return [Drop(**dict(zip(DROP_FIELDS, row))) for row in rows]
+
+
+def old_path(drops, adapter):
+    responses = []
+    for drop in drops:
+        drop_dict = DropResponse.model_validate(drop).model_dump()
+        drop_dict["user_joined"] = False
+        responses.append(DropResponse(**drop_dict))
+    # FastAPI response_model: tekrar doğrulama + JSON
+    return adapter.dump_json(adapter.validate_python(jsonable_encoder(responses)))
+
+
+def new_fill(rows):
+    return tuple(FlaggedObject(dict(zip(DROP_FIELDS, row)), "user_joined") for row in rows)
+
+
+def new_render(items, joined):
+    return b"[" + b",".join(item.render(item.fields["id"] in joined) for item in items) + b"]"
+
+
+def per_item_us(fn, count: int, repeat: int = 5, number: int = 20) -> float:
+    best = min(timeit.repeat(fn, repeat=repeat, number=number))
+    return best / number / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rows = make_rows(count)
+    drops = make_drops(rows)
+    adapter = TypeAdapter(List[DropResponse])
+    items = new_fill(rows)
+    joined = {i for i in range(0, count, 3)}
+
+    results = {
+        "old (model_validate + response_model)": per_item_us(lambda: old_path(drops, adapter), count),
+        "new, cache fill (tuple -> orjson)": per_item_us(lambda: new_fill(rows), count),
+        "new, cached page render": per_item_us(lambda: new_render(items, joined), count),
+    }
+
+    print(f"{count} items per page")
+    for name, value in results.items():
+        print(f"  {name:<42} {value:8.2f} us/item")
+
+
+if __name__ == "__main__":
+    main()
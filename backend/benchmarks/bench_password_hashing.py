@@ -0,0 +1,79 @@
+"""
+Login (parola doğrulama) throughput benchmark'ı
+
+Inline doğrulama tek çekirdekte saniyede kaç login yapılabildiğini, process
+pool ise worker sayısı kadar çekirdekte toplam ve çekirdek başına
+throughput'u gösterir. Pool ölçümünde istekler bir event loop'tan eşzamanlı
+gönderilir; loop'un bloklanmadığı, ara ara çalışan bir "tick" task'ının
+gecikmesiyle ölçülür.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_password_hashing [login_sayısı] [worker_sayısı] [rounds]
+"""
+import asyncio
+import os
+import sys
+import time
+from app.config import settings
+from app.utils.password_hasher import PasswordHasher, password_context
+
+
+def inline_logins_per_second(hashed: str, rounds: int, count: int) -> float:
+    context = password_context(rounds)
+    start = time.perf_counter()
+    for _ in range(count):
+        context.verify_and_update("benchmark-password", hashed)
+    return count / (time.perf_counter() - start)
+
+
+async def pool_run(hasher: PasswordHasher, hashed: str, count: int):
+    """count doğrulamayı eşzamanlı gönder; (login/s, en büyük loop gecikmesi ms)"""
+    max_lag = 0.0
+    done = False
+
+    async def tick():
+        nonlocal max_lag
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - before - 0.001)
+
+    ticker = asyncio.create_task(tick())
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        hasher.verify_and_update_async("benchmark-password", hashed) for _ in range(count)
+    ))
+    elapsed = time.perf_counter() - start
+    done = True
+    await ticker
+    return count / elapsed, max_lag * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else settings.password_hash_rounds
+    hashed = password_context(rounds).hash("benchmark-password")
+
+    inline = inline_logins_per_second(hashed, rounds, max(count // 4, 1))
+
+    hasher = PasswordHasher(workers=workers, max_pending=count, rounds=rounds)
+    try:
+        # Worker process'lerini ısıt
+        asyncio.run(pool_run(hasher, hashed, workers))
+        hasher.reset()
+        throughput, max_lag_ms = asyncio.run(pool_run(hasher, hashed, count))
+        stats = hasher.stats
+    finally:
+        hasher.shutdown()
+
+    print(f"pbkdf2_sha256 rounds={rounds}, {count} logins, {workers} workers")
+    print(f"  inline (1 core)            {inline:8.1f} logins/s")
+    print(f"  pool total                 {throughput:8.1f} logins/s")
+    print(f"  pool per core              {throughput / workers:8.1f} logins/s")
+    print(f"  avg / max queue            {stats['avg_queue_ms']:8.2f} / {stats['max_queue_ms']:.2f} ms")
+    print(f"  max event loop lag         {max_lag_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,20 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.main import app
-from app.database import Base, get_db
+from app.main import app, idempotency_store
+from app.utils.admission import admission_controller
+from app.utils.rate_tracker import rate_tracker
+from app.utils.rank_index import rank_indexes
+from app.services.waitlist_service import joined_drop_cache, position_cache
+from app.services.event_service import drop_events
+from app.services.expiry_service import expiry_stats
+from app.utils.response_cache import drop_response_cache
+from app.utils.principal import user_principal_cache
+from app.database import Base, get_db, primary_pins
 from app.models.user import User, UserRole
 from app.models.drop import Drop, DropStatus
-from app.utils.jwt_handler import hash_password, create_access_token
+from app.utils.jwt_handler import hash_password, create_access_token, token_cache
+from app.utils.password_hasher import password_hasher
 from datetime import datetime, timedelta
 
 # Test database (in-memory SQLite)
@@ -35,6 +44,26 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_runtime_state():
+    """Clear in-process caches and indexes between tests"""
+    yield
+    if idempotency_store is not None:
+        idempotency_store.clear()
+    admission_controller.reset()
+    rate_tracker.clear()
+    rank_indexes.clear()
+    position_cache.clear()
+    joined_drop_cache.clear()
+    expiry_stats.reset()
+    drop_response_cache.clear()
+    drop_events.clear()
+    primary_pins.clear()
+    user_principal_cache.clear()
+    token_cache.clear()
+    password_hasher.reset()
+
+
 @pytest.fixture(scope="function")
 def client(db):
     """FastAPI test client with overridden DB dependency"""
@@ -56,7 +85,7 @@ def test_user(db):
     """Create a test user"""
     user = User(
         email="test@example.com",
-        password_hash=hash_password("testpassword123"),
+        password=hash_password("testpassword123"),
         role=UserRole.USER
     )
     db.add(user)
@@ -70,7 +99,7 @@ def admin_user(db):
     """Create an admin user"""
     user = User(
         email="admin@example.com",
-        password_hash=hash_password("adminpassword123"),
+        password=hash_password("adminpassword123"),
         role=UserRole.ADMIN
     )
     db.add(user)
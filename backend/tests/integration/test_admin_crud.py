@@ -1,6 +1,9 @@
 import pytest
 from fastapi import status
 from datetime import datetime, timedelta
+from app.models.drop import Drop
+from app.services.stock_service import reserve_stock
+from app.utils.pagination import encode_cursor
 
 
 @pytest.mark.integration
@@ -69,3 +72,168 @@ class TestAdminCRUD:
         # Verify drop is deleted
         get_response = client.get(f"/drops/{test_drop.id}")
         assert get_response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create_sharded_drop(self, client, admin_token):
+        """Test sharded drop reports claimed_count summed over shards"""
+        response = client.post(
+            "/admin/drops",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={
+                "name": "Sharded Drop",
+                "total_stock": 100,
+                "stock_shards": 8,
+                "claim_window_start": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+                "claim_window_end": (datetime.utcnow() + timedelta(hours=2)).isoformat()
+            }
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["stock_shards"] == 8
+
+        detail = client.get(
+            f"/drops/{data['id']}",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert detail.json()["claimed_count"] == 0
+
+    def test_update_sharded_drop_reports_shard_total(self, client, db, admin_token):
+        """Test a name-only update of a sharded drop returns claimed_count summed over shards"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        created = client.post(
+            "/admin/drops",
+            headers=headers,
+            json={
+                "name": "Sharded Drop",
+                "total_stock": 10,
+                "stock_shards": 4,
+                "claim_window_start": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+                "claim_window_end": (datetime.utcnow() + timedelta(hours=2)).isoformat()
+            }
+        ).json()
+
+        drop = db.get(Drop, created["id"])
+        for user_id in range(3):
+            assert reserve_stock(db, drop, user_id)
+        db.commit()
+
+        response = client.put(f"/admin/drops/{drop.id}", headers=headers, json={"name": "Renamed"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["name"] == "Renamed"
+        assert response.json()["claimed_count"] == 3
+
+    def test_metrics_as_admin(self, client, admin_token):
+        """Test runtime metrics expose admission counters"""
+        response = client.get(
+            "/admin/metrics",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "queue_depth" in response.json()["admission"]
+
+    def test_allocate_first_come_drop_rejected(self, client, active_claim_drop, admin_token):
+        """Test manual allocation requires a priority drop"""
+        response = client.post(
+            f"/admin/drops/{active_claim_drop.id}/allocate",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_waitlist_keyset_pagination(self, client, db, test_drop, admin_token):
+        """Test admin waitlist pages follow priority order without overlap"""
+        for i in range(5):
+            token = client.post(
+                "/auth/signup",
+                json={"email": f"page{i}@test.com", "password": "testpass123"}
+            ).json()["access_token"]
+            client.post(f"/drops/{test_drop.id}/join", headers={"Authorization": f"Bearer {token}"})
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, "status_filter": "waiting"}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get(f"/admin/drops/{test_drop.id}/waitlist", headers=headers, params=params)
+            assert response.status_code == status.HTTP_200_OK
+            page = response.json()
+            seen.extend(page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert len(seen) == 5
+        keys = [(e["priority_score"], e["id"]) for e in seen]
+        assert keys == sorted(keys)
+        assert len({e["id"] for e in seen}) == 5
+
+        bad = client.get(f"/admin/drops/{test_drop.id}/waitlist", headers=headers, params={"cursor": "nope"})
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_waitlist_forged_cursor(self, client, test_drop, admin_token):
+        """Test cursors with wrongly typed score or id are rejected with 400"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        for forged in (
+            encode_cursor("2024-01-01", "x"),
+            encode_cursor(1.5, "7"),
+            encode_cursor(1.5, True),
+            encode_cursor(None, 7)
+        ):
+            response = client.get(
+                f"/admin/drops/{test_drop.id}/waitlist", headers=headers, params={"cursor": forged}
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert response.json()["detail"] == "Invalid cursor"
+
+    def test_drop_list_cursor_readable_cross_origin(self, client, db, admin_token):
+        """Test browser clients can read X-Next-Cursor and walk every page"""
+        headers = {"Authorization": f"Bearer {admin_token}", "Origin": "http://localhost:3000"}
+        for hours in (1, 2, 3):
+            client.post("/admin/drops", headers=headers, json={
+                "name": f"Page {hours}",
+                "total_stock": 5,
+                "claim_window_start": (datetime.utcnow() + timedelta(hours=hours)).isoformat(),
+                "claim_window_end": (datetime.utcnow() + timedelta(hours=hours + 1)).isoformat()
+            })
+
+        names, params = [], {"limit": 2}
+        while True:
+            response = client.get("/drops", headers=headers, params=params)
+            assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
+            names.extend(d["name"] for d in response.json())
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        assert names == ["Page 3", "Page 2", "Page 1"]
+
+    def test_drop_list_etag_and_invalidation(self, client, test_drop, admin_token):
+        """Test cached drop list serves 304 and is invalidated by admin updates"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        first = client.get("/drops", headers=headers)
+        etag = first.headers["etag"]
+
+        cached = client.get("/drops", headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+        client.put(f"/admin/drops/{test_drop.id}", headers=headers, json={"name": "Renamed"})
+
+        updated = client.get("/drops", headers={**headers, "If-None-Match": etag})
+        assert updated.status_code == status.HTTP_200_OK
+        assert updated.json()[0]["name"] == "Renamed"
+        detail = client.get(f"/drops/{test_drop.id}", headers=headers)
+        assert detail.json()["name"] == "Renamed"
+
+    def test_reconcile_drop_stats(self, client, test_drop, admin_token, user_token):
+        """Test admin stats reconciliation reports no drift for maintained counters"""
+        admin = {"Authorization": f"Bearer {admin_token}"}
+        client.post(f"/admin/drops/{test_drop.id}/stats/reconcile", headers=admin)
+        client.post(f"/drops/{test_drop.id}/join", headers={"Authorization": f"Bearer {user_token}"})
+
+        response = client.post(f"/admin/drops/{test_drop.id}/stats/reconcile", headers=admin)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["drift"] == {}
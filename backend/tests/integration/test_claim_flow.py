@@ -130,3 +130,17 @@ class TestClaimFlow:
         )
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "Out of stock" in response.json()["detail"]
+
+    def test_claim_shed_with_retry_after(self, client, active_claim_drop, user_token, monkeypatch):
+        """Test requests over the admission limit get 503 with Retry-After"""
+        from app.utils.admission import admission_controller
+
+        monkeypatch.setattr(admission_controller, "rate_per_second", 0)
+        monkeypatch.setattr(admission_controller, "burst", 1)
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        client.post(f"/drops/{active_claim_drop.id}/claim", headers=headers)
+        response = client.post(f"/drops/{active_claim_drop.id}/claim", headers=headers)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "retry-after" in response.headers
@@ -0,0 +1,207 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy.orm import sessionmaker
+from app.middleware.idempotency_middleware import IdempotencyMiddleware
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.idempotency import (
+    DatabaseIdempotencyStore, IdempotencyStore, InMemoryIdempotencyStore, StoredResponse,
+    purge_expired_keys
+)
+
+
+def _run_twice(middleware, path="/drops/1/join"):
+    """Send the same keyed request through the middleware twice; return both response starts"""
+    scope = {
+        "type": "http", "method": "POST", "path": path,
+        "headers": [(b"idempotency-key", b"k"), (b"authorization", b"Bearer t")]
+    }
+
+    async def request():
+        starts = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                starts.append(message)
+
+        await middleware(scope, None, send)
+        return starts[0]
+
+    async def scenario():
+        return [await request(), await request()]
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.integration
+class TestIdempotencyKey:
+    """Test Idempotency-Key replay on waitlist/claim endpoints"""
+
+    def test_join_replay_returns_stored_response(self, client, test_drop, user_token):
+        """Test retry with same key replays the first response"""
+        headers = {
+            "Authorization": f"Bearer {user_token}",
+            "Idempotency-Key": "join-1"
+        }
+
+        response1 = client.post(f"/drops/{test_drop.id}/join", headers=headers)
+        response2 = client.post(f"/drops/{test_drop.id}/join", headers=headers)
+
+        assert response1.status_code == status.HTTP_200_OK
+        assert response2.status_code == status.HTTP_200_OK
+        assert response2.headers["idempotent-replayed"] == "true"
+        assert response2.json() == response1.json()
+
+    def test_different_key_runs_again(self, client, test_drop, user_token):
+        """Test a new key is processed by the service"""
+        auth = {"Authorization": f"Bearer {user_token}"}
+
+        client.post(f"/drops/{test_drop.id}/join", headers={**auth, "Idempotency-Key": "a"})
+        response = client.post(f"/drops/{test_drop.id}/join", headers={**auth, "Idempotency-Key": "b"})
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert "idempotent-replayed" not in response.headers
+
+    def test_retryable_status_is_not_stored(self, client, db, test_drop, user_token):
+        """Test a 429 is not replayed once the claim window opens"""
+        headers = {
+            "Authorization": f"Bearer {user_token}",
+            "Idempotency-Key": "claim-1"
+        }
+        client.post(f"/drops/{test_drop.id}/join", headers={"Authorization": headers["Authorization"]})
+
+        early = client.post(f"/drops/{test_drop.id}/claim", headers=headers)
+        test_drop.claim_window_start = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+        retry = client.post(f"/drops/{test_drop.id}/claim", headers=headers)
+
+        assert early.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert retry.status_code == status.HTTP_200_OK
+        assert "idempotent-replayed" not in retry.headers
+
+    def test_duplicate_waits_without_busy_polling(self):
+        """Test an in-flight duplicate backs off and wakes when the first request finishes"""
+        store = InMemoryIdempotencyStore(maxsize=10, ttl_seconds=60)
+        calls = {"get": 0}
+        original_get = store.get
+
+        def counting_get(key):
+            calls["get"] += 1
+            return original_get(key)
+
+        store.get = counting_get
+
+        async def app(scope, receive, send):
+            await asyncio.sleep(0.3)
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        middleware = IdempotencyMiddleware(app, store)
+        scope = {
+            "type": "http", "method": "POST", "path": "/drops/1/claim",
+            "headers": [(b"idempotency-key", b"k"), (b"authorization", b"Bearer t")]
+        }
+
+        async def request():
+            statuses = []
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+
+            await middleware(scope, None, send)
+            return statuses[0]
+
+        async def scenario():
+            return await asyncio.gather(request(), request())
+
+        assert asyncio.run(scenario()) == [200, 200]
+        # 5 ms polling would need ~60 lookups over 300 ms
+        assert calls["get"] < 15
+
+    def test_store_interface_is_abstract(self):
+        """Test stores must implement every operation"""
+        with pytest.raises(TypeError):
+            IdempotencyStore()
+
+
+@pytest.fixture
+def database_store(db):
+    """Database-backed store on the test database"""
+    return DatabaseIdempotencyStore(sessionmaker(bind=db.get_bind()), ttl_seconds=60, lock_timeout_seconds=30)
+
+
+@pytest.mark.integration
+class TestDatabaseIdempotencyStore:
+    """Test the idempotency_keys table store used by multi-worker deployments"""
+
+    def test_reserve_save_get(self, database_store):
+        """Test a key is reserved once, then replays the saved response and headers"""
+        stored = StoredResponse(200, "application/json", b"{}", (("etag", '"abc"'),))
+
+        assert database_store.reserve("k")
+        assert not database_store.reserve("k")
+        assert database_store.get("k") is None
+
+        database_store.save("k", stored)
+
+        assert database_store.get("k") == stored
+        assert not database_store.reserve("k")
+
+    def test_release_frees_key(self, database_store):
+        """Test a released reservation can be taken again and stores nothing"""
+        assert database_store.reserve("k")
+        database_store.release("k")
+
+        assert database_store.get("k") is None
+        assert database_store.reserve("k")
+
+    def test_expired_and_stale_rows_taken_over(self, db, database_store):
+        """Test expired responses and abandoned reservations are reclaimed"""
+        now = datetime.utcnow()
+        db.add_all([
+            IdempotencyKey(key="expired", status_code=200, content_type="application/json", body=b"{}",
+                           created_at=now - timedelta(minutes=2), expires_at=now - timedelta(minutes=1)),
+            IdempotencyKey(key="stale", created_at=now - timedelta(minutes=5), expires_at=now + timedelta(minutes=1))
+        ])
+        db.commit()
+
+        assert database_store.get("expired") is None
+        assert database_store.reserve("expired")
+        assert database_store.reserve("stale")
+
+    def test_purge_deletes_only_expired(self, db):
+        """Test the purge job removes expired rows in batches and keeps live ones"""
+        now = datetime.utcnow()
+        db.add_all([
+            IdempotencyKey(key=f"old{i}", status_code=200, created_at=now, expires_at=now - timedelta(seconds=1))
+            for i in range(5)
+        ] + [IdempotencyKey(key="live", created_at=now, expires_at=now + timedelta(minutes=1))])
+        db.commit()
+
+        assert purge_expired_keys(db, batch_size=2) == 5
+        assert [row.key for row in db.query(IdempotencyKey).all()] == ["live"]
+
+    def test_replay_keeps_response_headers(self, database_store):
+        """Test a replayed response carries the original Set-Cookie, pin, Retry-After and ETag"""
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"set-cookie", b"primary_pin=7.1.sig; HttpOnly"),
+            (b"x-primary-pin", b"7.1.sig"),
+            (b"retry-after", b"5"),
+            (b"etag", b'"v1"')
+        ]
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        _, replay = _run_twice(IdempotencyMiddleware(app, database_store))
+
+        replayed = dict(replay["headers"])
+        assert replayed[b"idempotent-replayed"] == b"true"
+        assert replayed[b"content-length"] == b"2"
+        for name, value in headers:
+            assert replayed[name] == value
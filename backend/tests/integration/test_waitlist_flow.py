@@ -1,6 +1,13 @@
 import pytest
 from fastapi import status
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import database
+from app.database import PRIMARY_PIN_HEADER, Base, primary_pins
+from app.middleware import auth_middleware
 from app.models.waitlist import Waitlist, WaitlistStatus
+from app.utils.principal import user_principal_cache
 
 
 @pytest.mark.integration
@@ -93,3 +100,106 @@ class TestWaitlistFlow:
         # Check that all scores are different
         scores = [u["priority_score"] for u in users_data]
         assert len(scores) == len(set(scores)), "All priority scores should be unique"
+
+    def test_position_endpoint(self, client, test_drop, user_token):
+        """Test position polling returns rank and supports 304"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.post(f"/drops/{test_drop.id}/join", headers=headers)
+
+        response = client.get(f"/drops/{test_drop.id}/position", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["position"] == 1
+        assert data["waitlist_size"] == 1
+        assert data["remaining_stock"] == test_drop.total_stock
+        assert data["within_stock"] is True
+        assert data["status"] == "waiting"
+
+        etag = response.headers["etag"]
+        response = client.get(
+            f"/drops/{test_drop.id}/position",
+            headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_position_not_joined(self, client, test_drop, user_token):
+        """Test position for a user not in the waitlist"""
+        response = client.get(
+            f"/drops/{test_drop.id}/position",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_event_stream_unknown_drop(self, client):
+        """Test the live event stream rejects unknown drops"""
+        response = client.get("/drops/99999/events")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_drop_stats_endpoint(self, client, test_drop, user_token):
+        """Test drop stats reflect joins"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.post(f"/drops/{test_drop.id}/join", headers=headers)
+
+        response = client.get(f"/drops/{test_drop.id}/stats", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["waiting"] == 1
+        assert data["waitlist_size"] == 1
+        assert client.get("/drops/99999/stats", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_drop_stats_requires_auth(self, client, test_drop):
+        """Test anonymous clients cannot read drop stats"""
+        response = client.get(f"/drops/{test_drop.id}/stats")
+
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+
+@pytest.fixture
+def stale_replica(monkeypatch, db, test_user, test_drop):
+    """Configure a read replica holding the current users and drops, and nothing written later"""
+    replica_engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=replica_engine)
+    with replica_engine.begin() as connection:
+        for table in (Base.metadata.tables["users"], Base.metadata.tables["drops"]):
+            rows = [dict(row._mapping) for row in db.execute(select(table))]
+            connection.execute(insert(table), rows)
+    monkeypatch.setattr(database, "replica_urls", ["sqlite://"])
+    monkeypatch.setattr(auth_middleware, "replica_urls", ["sqlite://"])
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [sessionmaker(bind=replica_engine)])
+    yield
+    replica_engine.dispose()
+
+
+@pytest.mark.integration
+class TestPrimaryPinAcrossWorkers:
+    """Test read-your-writes when the read lands on a worker that did not handle the write"""
+
+    def test_client_echoed_pin_reads_primary(self, client, test_drop, user_token, stale_replica):
+        """Test a browser client can read the pin and echo it to another worker"""
+        origin = "http://localhost:3000"
+        auth = {"Authorization": f"Bearer {user_token}", "Origin": origin}
+
+        joined = client.post(f"/drops/{test_drop.id}/join", headers=auth)
+        assert joined.status_code == status.HTTP_200_OK
+        assert PRIMARY_PIN_HEADER.lower() in joined.headers["access-control-expose-headers"].lower()
+        pin = joined.headers[PRIMARY_PIN_HEADER]
+
+        # Başka bir worker: süreç içi pin ve principal önbelleği yok, cookie de gönderilmez
+        primary_pins.clear()
+        user_principal_cache.clear()
+        client.cookies.clear()
+
+        stale = client.get(f"/drops/{test_drop.id}/position", headers=auth)
+        assert stale.status_code != status.HTTP_200_OK
+
+        pinned = client.get(
+            f"/drops/{test_drop.id}/position", headers={**auth, PRIMARY_PIN_HEADER: pin}
+        )
+        assert pinned.status_code == status.HTTP_200_OK
+        assert pinned.json()["position"] == 1
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from app.utils.admission import AdmissionController, AdmissionRejected
+
+
+def make_controller(**overrides):
+    options = dict(max_concurrent=1, rate_per_second=1000, burst=1000, queue_size=1, queue_timeout_ms=20)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+@pytest.mark.unit
+class TestAdmissionController:
+    """Test per-drop admission control"""
+
+    def test_token_bucket_sheds_excess(self):
+        """Test requests beyond the burst are rejected with retry-after"""
+        controller = make_controller(max_concurrent=10, rate_per_second=1, burst=2)
+
+        async def scenario():
+            await controller.acquire("k")
+            await controller.acquire("k")
+            with pytest.raises(AdmissionRejected) as exc:
+                await controller.acquire("k")
+            return exc.value
+
+        rejected = asyncio.run(scenario())
+
+        assert rejected.reason == "rate_limited"
+        assert rejected.retry_after >= 1
+        assert controller.stats["shed"]["rate_limited"] == 1
+
+    def test_queue_waits_for_free_slot(self):
+        """Test queued request is admitted when a slot is released"""
+        controller = make_controller(queue_timeout_ms=1000)
+
+        async def scenario():
+            await controller.acquire("k")
+            waiter = asyncio.create_task(controller.acquire("k"))
+            await asyncio.sleep(0.01)
+            depth = controller.stats["queue_depth"]
+            controller.release("k")
+            await waiter
+            return depth
+
+        assert asyncio.run(scenario()) == 1
+        assert controller.stats["admitted"] == 2
+
+    def test_queue_full_and_timeout(self):
+        """Test bounded queue rejects overflow and times out waiters"""
+        controller = make_controller()
+
+        async def scenario():
+            await controller.acquire("k")
+            waiter = asyncio.create_task(controller.acquire("k"))
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as full:
+                await controller.acquire("k")
+            with pytest.raises(AdmissionRejected) as timeout:
+                await waiter
+            return full.value.reason, timeout.value.reason
+
+        assert asyncio.run(scenario()) == ("queue_full", "queue_timeout")
+
+    def test_keys_are_independent(self):
+        """Test one drop's load does not block another drop"""
+        controller = make_controller(queue_size=0)
+
+        async def scenario():
+            await controller.acquire(("claim", 1))
+            await controller.acquire(("claim", 2))
+
+        asyncio.run(scenario())
+        assert controller.stats["in_flight"] == 2
+
+    def test_idle_keys_are_bounded(self):
+        """Test keys that were touched once do not accumulate without bound"""
+        controller = make_controller(max_concurrent=1, rate_per_second=0.001, burst=5, max_keys=100)
+
+        async def scenario():
+            for drop_id in range(500):
+                await controller.acquire(("join", drop_id))
+                controller.release(("join", drop_id))
+            await controller.acquire(("join", "busy"))
+
+        asyncio.run(scenario())
+
+        assert len(controller._states) <= 100
+        assert ("join", "busy") in controller._states
+
+    def test_idle_key_with_full_bucket_is_dropped(self):
+        """Test a key is forgotten once it is idle and its bucket has refilled"""
+        controller = make_controller()
+
+        async def scenario():
+            await controller.acquire("k")
+            await asyncio.sleep(0.01)
+            controller.release("k")
+
+        asyncio.run(scenario())
+        assert "k" not in controller._states
+
+    def test_cancelled_waiter_gives_slot_back(self):
+        """Test a queued request cancelled after the hand-off does not leak the slot"""
+        controller = make_controller(queue_timeout_ms=1000)
+
+        async def scenario():
+            await controller.acquire("k")
+            waiter = asyncio.create_task(controller.acquire("k"))
+            await asyncio.sleep(0.01)
+            controller.release("k")
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            return controller.stats
+
+        stats = asyncio.run(scenario())
+        assert stats["in_flight"] == 0
+        assert stats["queue_depth"] == 0
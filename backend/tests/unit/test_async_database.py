@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.pool import StaticPool
+from app.database import Base, DBRunner, to_async_url
+from app.models.user import User
+from app.schemas.drop_schema import DropCreate
+from app.schemas.user_schema import UserSignup, UserLogin
+from app.services.auth_service import signup_user_async, login_user_async
+from app.services.drop_service import create_drop, get_drops
+from app.services.waitlist_service import join_waitlist, claim_drop
+
+pytest.importorskip("aiosqlite")
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+
+def run_with_async_session(test_fn):
+    """Run test_fn(session) against a fresh in-memory aiosqlite database"""
+    async def runner():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        try:
+            async with session_factory() as session:
+                return await test_fn(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(runner())
+
+
+@pytest.mark.unit
+class TestAsyncDatabase:
+    """Test async session mode"""
+
+    def test_async_url_conversion(self):
+        """Test sync URLs map to async drivers"""
+        assert to_async_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert to_async_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+    def test_runner_runs_sync_services_on_async_session(self):
+        """Test drop and waitlist services work through run_sync"""
+        async def scenario(session):
+            runner = DBRunner(session)
+            assert runner.is_async
+
+            signup = await signup_user_async(
+                UserSignup(email="async@test.com", password="testpass123"), session
+            )
+            user = await session.get(User, signup.user.id)
+
+            drop = await runner.run(lambda db: create_drop(DropCreate(
+                name="Async Drop",
+                total_stock=5,
+                claim_window_start=datetime.utcnow() - timedelta(minutes=1),
+                claim_window_end=datetime.utcnow() + timedelta(hours=1)
+            ), user, db))
+
+            drops = await runner.run(lambda db: get_drops(db, user))
+            await runner.run(lambda db: join_waitlist(drop.id, user, db))
+            claim = await runner.run(lambda db: claim_drop(drop.id, user, db))
+            return drops, claim
+
+        drops, claim = run_with_async_session(scenario)
+
+        assert [d.name for d in drops] == ["Async Drop"]
+        assert claim.message == "Claim successful"
+
+    def test_login_async(self):
+        """Test async login verifies password"""
+        async def scenario(session):
+            await signup_user_async(UserSignup(email="a@test.com", password="testpass123"), session)
+            ok = await login_user_async(UserLogin(email="a@test.com", password="testpass123"), session)
+            with pytest.raises(Exception) as exc:
+                await login_user_async(UserLogin(email="a@test.com", password="wrong"), session)
+            return ok, exc.value.status_code
+
+        ok, failed_status = run_with_async_session(scenario)
+
+        assert ok.access_token
+        assert failed_status == 401
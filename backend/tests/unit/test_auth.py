@@ -1,8 +1,15 @@
+import asyncio
 import pytest
+from datetime import timedelta
 from fastapi import status
+from fastapi.security import HTTPAuthorizationCredentials
+from app.database import DBRunner
+from app.middleware.auth_middleware import get_current_user
+from app.models.user import UserRole
 from app.schemas.user_schema import UserSignup, UserLogin
 from app.services.auth_service import signup_user, login_user
-from app.utils.jwt_handler import hash_password, verify_password, decode_token
+from app.utils.jwt_handler import create_access_token, decode_token, hash_password, token_cache, verify_password
+from app.utils.principal import UserPrincipal, user_principal_cache
 
 
 @pytest.mark.unit
@@ -105,3 +112,82 @@ class TestJWTHandler:
         payload = decode_token(invalid_token)
 
         assert payload is None
+
+
+@pytest.mark.unit
+class TestUserPrincipalCache:
+    """Test the authenticated user principal cache"""
+
+    def _resolve(self, db, token):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        return asyncio.run(get_current_user(credentials, DBRunner(db)))
+
+    def test_principal_cached_after_first_lookup(self, db, test_user, user_token):
+        """Test repeated requests are served from the cache"""
+        first = self._resolve(db, user_token)
+        second = self._resolve(db, user_token)
+
+        assert isinstance(first, UserPrincipal)
+        assert first == second
+        assert first.id == test_user.id
+        assert first.created_at == test_user.created_at
+        assert user_principal_cache.stats["hits"] == 1
+        assert user_principal_cache.stats["misses"] == 1
+
+    def test_principal_invalidated_on_user_update(self, db, test_user, user_token):
+        """Test ORM updates to a user drop the cached principal"""
+        assert self._resolve(db, user_token).role == UserRole.USER
+
+        test_user.role = UserRole.ADMIN
+        db.commit()
+
+        assert self._resolve(db, user_token).role == UserRole.ADMIN
+
+
+@pytest.mark.unit
+class TestTokenCache:
+    """Test the verified-token cache"""
+
+    def _count_verifications(self, monkeypatch):
+        from app.utils import jwt_handler
+
+        calls = []
+        verify = jwt_handler._verify_token
+
+        def counting(token):
+            calls.append(token)
+            return verify(token)
+
+        monkeypatch.setattr(jwt_handler, "_verify_token", counting)
+        return calls
+
+    def test_valid_token_verified_once(self, monkeypatch):
+        """Test a reused token is only verified on first use"""
+        calls = self._count_verifications(monkeypatch)
+        token = create_access_token(data={"sub": 5})
+
+        first = decode_token(token)
+        second = decode_token(token)
+
+        assert first == second
+        assert first["sub"] == "5"
+        assert len(calls) == 1
+        assert token_cache.stats["valid"]["hits"] == 1
+
+    def test_invalid_token_negative_cached(self, monkeypatch, caplog):
+        """Test invalid tokens are cached briefly and logged instead of printed"""
+        calls = self._count_verifications(monkeypatch)
+
+        with caplog.at_level("INFO", logger="app.utils.jwt_handler"):
+            assert decode_token("invalid.token.here") is None
+            assert decode_token("invalid.token.here") is None
+
+        assert len(calls) == 1
+        assert any("JWT rejected" in record.message for record in caplog.records)
+
+    def test_expired_token_not_cached_as_valid(self):
+        """Test expired tokens are rejected and never enter the valid cache"""
+        token = create_access_token(data={"sub": 5}, expires_delta=timedelta(seconds=-1))
+
+        assert decode_token(token) is None
+        assert token_cache.stats["valid"]["size"] == 0
@@ -0,0 +1,47 @@
+import threading
+import pytest
+from app.utils.batching import MicroBatcher
+
+
+@pytest.mark.unit
+class TestMicroBatcher:
+    """Test per-key request coalescing"""
+
+    def test_concurrent_submits_share_one_batch(self):
+        """Test requests inside the window are processed together"""
+        batcher = MicroBatcher(window_ms=200, max_size=100)
+        calls = []
+
+        def process(items):
+            calls.append(list(items))
+            return {item: item * 10 for item in items}
+
+        results = {}
+
+        def worker(item):
+            results[item] = batcher.submit("drop-1", item, process)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == [0, 1, 2, 3, 4]
+        assert results == {i: i * 10 for i in range(5)}
+
+    def test_max_size_closes_batch(self):
+        """Test a full batch is processed without waiting for the window"""
+        batcher = MicroBatcher(window_ms=5000, max_size=1)
+
+        result = batcher.submit("drop-1", 1, lambda items: {1: "ok"})
+
+        assert result == "ok"
+
+    def test_per_item_exception_is_raised(self):
+        """Test exception result is raised only for its own item"""
+        batcher = MicroBatcher(window_ms=0, max_size=10)
+
+        with pytest.raises(ValueError):
+            batcher.submit("drop-1", 1, lambda items: {1: ValueError("no stock")})
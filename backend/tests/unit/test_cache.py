@@ -0,0 +1,56 @@
+import time
+import pytest
+from app.utils.cache import TTLCache
+from app.utils.idempotency import InMemoryIdempotencyStore, StoredResponse
+
+
+@pytest.mark.unit
+class TestTTLCache:
+    """Test bounded TTL/LRU cache"""
+
+    def test_get_set_and_stats(self):
+        """Test hits and misses are counted"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats["evictions"] == 1
+
+    def test_expiry(self):
+        """Test entries expire after their ttl"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1, ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+
+
+@pytest.mark.unit
+class TestInMemoryIdempotencyStore:
+    """Test in-memory idempotency store"""
+
+    def test_reserve_blocks_duplicates_until_saved(self):
+        """Test only one request may own a key while in flight"""
+        store = InMemoryIdempotencyStore(maxsize=10, ttl_seconds=60)
+
+        assert store.reserve("k") is True
+        assert store.reserve("k") is False
+
+        store.save("k", StoredResponse(200, "application/json", b"{}"))
+
+        assert store.get("k").status_code == 200
+        assert store.reserve("k") is True
@@ -0,0 +1,54 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models.claim_code_pool import ClaimCodePool
+from app.schemas.drop_schema import DropCreate, DropUpdate
+from app.services.drop_service import create_drop, update_drop
+from app.services.code_pool_service import mint_claim_codes, pop_claim_codes
+from app.utils.seed import generate_claim_codes
+
+
+@pytest.mark.unit
+class TestClaimCodePool:
+    """Test pre-minted claim code pool"""
+
+    def test_generate_claim_codes_format(self):
+        """Test bulk generated codes keep DROPSPOT- format"""
+        codes = generate_claim_codes(50)
+
+        assert len(codes) == 50
+        assert all(code.startswith("DROPSPOT-") and len(code) == 18 for code in codes)
+
+    def test_create_drop_mints_total_stock(self, db, admin_user):
+        """Test creating a drop fills the pool with unique codes"""
+        drop = create_drop(DropCreate(
+            name="Pool Drop",
+            total_stock=300,
+            claim_window_start=datetime.utcnow() + timedelta(hours=1),
+            claim_window_end=datetime.utcnow() + timedelta(hours=2)
+        ), admin_user, db)
+
+        codes = [row.code for row in db.query(ClaimCodePool).filter(ClaimCodePool.drop_id == drop.id)]
+        assert len(codes) == 300
+        assert len(set(codes)) == 300
+
+    def test_update_stock_resizes_pool(self, db, test_drop):
+        """Test stock increase mints and decrease trims the pool"""
+        mint_claim_codes(db, test_drop.id, test_drop.total_stock)
+        db.commit()
+
+        update_drop(test_drop.id, DropUpdate(total_stock=150), db)
+        assert db.query(ClaimCodePool).count() == 150
+
+        update_drop(test_drop.id, DropUpdate(total_stock=20), db)
+        assert db.query(ClaimCodePool).count() == 20
+
+    def test_pop_removes_codes_and_falls_back(self, db, test_drop):
+        """Test popped codes leave the pool and shortfall is generated"""
+        mint_claim_codes(db, test_drop.id, 2)
+        db.commit()
+
+        codes = pop_claim_codes(db, test_drop.id, 3)
+        db.commit()
+
+        assert len(set(codes)) == 3
+        assert db.query(ClaimCodePool).count() == 0
@@ -1,7 +1,12 @@
+import json
 import pytest
 from datetime import datetime, timedelta
-from app.services.drop_service import get_drops, create_drop
+from fastapi import HTTPException
+from sqlalchemy import event
+from app.services.drop_service import get_drops, create_drop, list_drops_page
 from app.schemas.drop_schema import DropCreate
+from app.services.waitlist_service import join_waitlist, leave_waitlist
+from app.utils.pagination import encode_cursor
 
 
 @pytest.mark.unit
@@ -52,3 +57,94 @@ class TestDropService:
             create_drop(drop_data, admin_user, db)
 
         assert exc.value.status_code == 400
+
+    def test_user_joined_constant_queries(self, db, admin_user, test_user):
+        """Test user_joined is filled without a query per drop"""
+        now = datetime.utcnow()
+        drops = [
+            create_drop(DropCreate(
+                name=f"Drop {i}",
+                total_stock=5,
+                claim_window_start=now + timedelta(hours=1),
+                claim_window_end=now + timedelta(hours=2)
+            ), admin_user, db)
+            for i in range(6)
+        ]
+        join_waitlist(drops[1].id, test_user, db)
+        join_waitlist(drops[4].id, test_user, db)
+        get_drops(db, test_user)
+        leave_waitlist(drops[4].id, test_user, db)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            result = get_drops(db, test_user, limit=100)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+        joined = {d.id for d in result if d.user_joined}
+        assert joined == {drops[1].id}
+        assert not any("FROM waitlist" in sql for sql in statements)
+
+    def _make_drops(self, db, admin_user, offsets_hours):
+        now = datetime.utcnow()
+        return [
+            create_drop(DropCreate(
+                name=f"Window {hours}",
+                total_stock=5,
+                claim_window_start=now + timedelta(hours=hours),
+                claim_window_end=now + timedelta(hours=hours + 1)
+            ), admin_user, db)
+            for hours in offsets_hours
+        ]
+
+    def test_cursor_pagination(self, db, admin_user):
+        """Test cursor pages walk the list without gaps or repeats"""
+        self._make_drops(db, admin_user, [1, 2, 3, 4, 5])
+
+        names, cursor = [], None
+        while True:
+            body, _, cursor = list_drops_page(db, limit=2, cursor=cursor)
+            names.extend(d["name"] for d in json.loads(body))
+            if not cursor:
+                break
+
+        assert names == [f"Window {h}" for h in (5, 4, 3, 2, 1)]
+
+    def test_forged_cursor_rejected(self, db, admin_user):
+        """Test cursors with wrongly typed values are a 400, not a database error"""
+        self._make_drops(db, admin_user, [1, 2])
+
+        for forged in (
+            encode_cursor("2024-01-01", "x"),
+            encode_cursor("2024-01-01", True),
+            encode_cursor("2024-01-01", 1.5),
+            encode_cursor(20240101, 1),
+            encode_cursor("not a date", 1)
+        ):
+            with pytest.raises(HTTPException) as exc:
+                list_drops_page(db, limit=1, cursor=forged)
+            assert exc.value.status_code == 400
+            assert exc.value.detail == "Invalid cursor"
+
+    def test_window_filters(self, db, admin_user):
+        """Test upcoming / open / closed window filters"""
+        self._make_drops(db, admin_user, [-5, -0.5, 2])
+
+        def names(window):
+            return [d["name"] for d in json.loads(list_drops_page(db, window=window)[0])]
+
+        assert names("upcoming") == ["Window 2"]
+        assert names("open") == ["Window -0.5"]
+        assert names("closed") == ["Window -5"]
+
+    def test_json_path_matches_response_model(self, db, test_drop, test_user):
+        """Test pre-serialized JSON equals the DropResponse serialization"""
+        join_waitlist(test_drop.id, test_user, db)
+
+        body, _, _ = list_drops_page(db, test_user)
+        expected = [d.model_dump(mode="json") for d in get_drops(db, test_user)]
+
+        assert json.loads(body) == expected
+        assert expected[0]["user_joined"] is True
@@ -0,0 +1,154 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.models.drop_stats import DropStatsShard
+from app.models.user import User
+from app.models.waitlist import Waitlist, WaitlistStatus
+from app.services.expiry_service import sweep_expired_claims
+from app.schemas.drop_schema import DropCreate
+from app.services import stats_service
+from app.services.drop_service import create_drop
+from app.services.stats_service import get_drop_stats, reconcile_drop_stats
+from app.services.waitlist_service import claim_drop, claim_drop_batch, join_waitlist, leave_waitlist
+from app.utils.jwt_handler import hash_password
+
+
+def _users(db, count):
+    users = []
+    for i in range(count):
+        user = User(email=f"stats{i}@test.com", password=hash_password("testpass123"))
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        users.append(user)
+    return users
+
+
+def _actual(db, drop_id):
+    return dict(
+        db.query(Waitlist.status, func.count(Waitlist.id))
+        .filter(Waitlist.drop_id == drop_id)
+        .group_by(Waitlist.status).all()
+    )
+
+
+@pytest.mark.unit
+class TestDropStats:
+    """Test maintained per-drop counters"""
+
+    def test_read_without_counters_does_not_write(self, db, test_drop, test_user):
+        """Test a drop without counters is answered from COUNTs and nothing is written"""
+        join_waitlist(test_drop.id, test_user, db)
+
+        stats = get_drop_stats(test_drop.id, db)
+
+        assert stats.waiting == 1
+        assert stats.waitlist_size == 1
+        assert stats.joins_total == 1
+        assert stats.reconciled_at is None
+        assert db.query(DropStatsShard).filter(DropStatsShard.drop_id == test_drop.id).count() == 0
+
+    def test_reconcile_builds_counters(self, db, test_drop, test_user):
+        """Test the first reconcile creates the shard rows from the waitlist"""
+        join_waitlist(test_drop.id, test_user, db)
+
+        assert reconcile_drop_stats(db, test_drop.id) == {"waiting_count": 1}
+
+        stats = get_drop_stats(test_drop.id, db)
+        assert stats.waiting == 1
+        assert stats.joins_total == 1
+        assert stats.reconciled_at is not None
+        assert db.query(DropStatsShard).filter(DropStatsShard.drop_id == test_drop.id).count() > 0
+
+    def test_create_drop_initialises_counters(self, db, admin_user):
+        """Test new drops start with zeroed counter rows"""
+        drop = create_drop(DropCreate(
+            name="Counted",
+            description="",
+            total_stock=5,
+            claim_window_start=datetime.utcnow() + timedelta(hours=1),
+            claim_window_end=datetime.utcnow() + timedelta(hours=2)
+        ), admin_user, db)
+
+        rows = db.query(DropStatsShard).filter(DropStatsShard.drop_id == drop.id).all()
+        assert len(rows) > 0
+        assert sum(r.waiting_count for r in rows) == 0
+
+    def test_reconcile_keeps_increments_made_after_count(self, db, test_drop, test_user, monkeypatch):
+        """Test a join committed between the count and the shard lock is not overwritten"""
+        reconcile_drop_stats(db, test_drop.id)
+        counts_and_sums = stats_service._counts_and_sums
+
+        def count_then_join(session, drop_id):
+            result = counts_and_sums(session, drop_id)
+            join_waitlist(test_drop.id, test_user, db)
+            return result
+
+        monkeypatch.setattr(stats_service, "_counts_and_sums", count_then_join)
+        assert reconcile_drop_stats(db, test_drop.id) == {}
+
+        assert get_drop_stats(test_drop.id, db).waiting == 1
+
+    def test_counters_follow_join_leave_claim(self, db, active_claim_drop):
+        """Test counters are updated in the join/leave/claim transactions"""
+        reconcile_drop_stats(db, active_claim_drop.id)
+        users = _users(db, 4)
+        for user in users:
+            join_waitlist(active_claim_drop.id, user, db)
+
+        leave_waitlist(active_claim_drop.id, users[0], db)
+        claim_drop(active_claim_drop.id, users[1], db)
+        claim_drop_batch(active_claim_drop.id, [users[2].id], db)
+
+        stats = get_drop_stats(active_claim_drop.id, db)
+        actual = _actual(db, active_claim_drop.id)
+        assert stats.waiting == actual.get(WaitlistStatus.WAITING, 0) == 1
+        assert stats.claimed == actual.get(WaitlistStatus.CLAIMED, 0) == 2
+        assert stats.joins_total == 4
+        assert stats.leaves_total == 1
+        assert stats.joins_last_minute > 0
+        assert stats.remaining_stock == active_claim_drop.total_stock - 2
+
+    def test_batch_updates_spread_over_shards(self, db, active_claim_drop, monkeypatch):
+        """Test batched claims for one drop do not all land on the same counter shard"""
+        reconcile_drop_stats(db, active_claim_drop.id)
+        users = _users(db, 8)
+        for user in users:
+            join_waitlist(active_claim_drop.id, user, db)
+
+        keys = iter(range(len(users)))
+        monkeypatch.setattr(stats_service.random, "randrange", lambda n: next(keys) % n)
+        for user in users:
+            claim_drop_batch(active_claim_drop.id, [user.id], db)
+
+        claimed = db.query(DropStatsShard.claimed_count).filter(
+            DropStatsShard.drop_id == active_claim_drop.id
+        ).all()
+        assert sum(1 for (count,) in claimed if count) == min(len(users), len(claimed))
+        assert get_drop_stats(active_claim_drop.id, db).claimed == len(users)
+
+    def test_expiry_moves_claimed_to_expired(self, db, active_claim_drop, test_user):
+        """Test the expiry sweeper updates the counters"""
+        reconcile_drop_stats(db, active_claim_drop.id)
+        join_waitlist(active_claim_drop.id, test_user, db)
+        claim_drop(active_claim_drop.id, test_user, db)
+
+        sweep_expired_claims(db, now=datetime.utcnow() + timedelta(hours=25))
+
+        stats = get_drop_stats(active_claim_drop.id, db)
+        assert stats.claimed == 0
+        assert stats.expired == 1
+
+    def test_reconcile_fixes_drift(self, db, test_drop, test_user):
+        """Test reconciliation rewrites drifted counters"""
+        join_waitlist(test_drop.id, test_user, db)
+        reconcile_drop_stats(db, test_drop.id)
+        for shard in db.query(DropStatsShard).filter(DropStatsShard.drop_id == test_drop.id):
+            shard.waiting_count = 5
+        db.commit()
+
+        drift = reconcile_drop_stats(db, test_drop.id)
+
+        assert drift["waiting_count"] < 0
+        assert get_drop_stats(test_drop.id, db).waiting == 1
+        assert reconcile_drop_stats(db, test_drop.id) == {}
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import DBRunner
+from app.services.event_service import load_drop_snapshot
+from app.services.waitlist_service import join_waitlist
+from app.utils.event_stream import DropEventBroker, SubscriberLimitReached, format_event
+
+
+def _snapshot(claimed, positions=None):
+    return {
+        "stock": {"drop_id": 1, "claimed_count": claimed},
+        "window": {"drop_id": 1, "state": "open"},
+        "positions": positions or {}
+    }
+
+
+@pytest.mark.unit
+class TestDropEventBroker:
+    """Test per-drop event fan-out"""
+
+    def test_single_loader_call_per_tick(self):
+        """Test one snapshot read serves every subscriber of a drop"""
+        calls = []
+
+        def loader(drop_id, user_ids):
+            calls.append((drop_id, set(user_ids)))
+            return _snapshot(len(calls), {7: {"position": 3}})
+
+        broker = DropEventBroker(loader, interval_ms=10, max_subscribers_per_drop=10)
+
+        async def scenario():
+            first = broker.subscribe(1)
+            second = broker.subscribe(1, user_id=7)
+            await asyncio.sleep(0.035)
+            events = await first.next(0.1), await second.next(0.1)
+            broker.unsubscribe(first)
+            broker.unsubscribe(second)
+            return events
+
+        first_events, second_events = asyncio.run(scenario())
+
+        assert 1 <= len(calls) <= 5
+        assert all(user_ids == {7} for _, user_ids in calls)
+        assert dict(first_events)["stock"]["claimed_count"] == len(calls)
+        assert dict(second_events)["position"] == {"position": 3}
+        assert "position" not in dict(first_events)
+        assert broker.stats["drops"] == 0
+
+    def test_slow_subscriber_keeps_latest_only(self):
+        """Test unread updates are coalesced instead of queued"""
+        broker = DropEventBroker(lambda *_: None, interval_ms=1000, max_subscribers_per_drop=10)
+
+        async def scenario():
+            subscriber = broker.subscribe(1, initial=_snapshot(0))
+            for claimed in range(1, 50):
+                broker.fan_out(1, _snapshot(claimed))
+            events = dict(await subscriber.next(0.1))
+            broker.unsubscribe(subscriber)
+            return events
+
+        events = asyncio.run(scenario())
+
+        assert events["stock"]["claimed_count"] == 49
+        # 49 stock updates + 1 window update, each replacing an unread value
+        assert broker.stats["published"] == 50
+        assert broker.stats["coalesced"] == 50
+
+    def test_unchanged_snapshot_not_republished(self):
+        """Test only changed parts of a snapshot are pushed"""
+        broker = DropEventBroker(lambda *_: _snapshot(1), interval_ms=1000, max_subscribers_per_drop=10)
+
+        async def scenario():
+            subscriber = broker.subscribe(1)
+            broker.fan_out(1, _snapshot(1))
+            await subscriber.next(0.1)
+            broker.fan_out(1, _snapshot(1))
+            idle = await subscriber.next(0.01)
+            broker.fan_out(1, _snapshot(2))
+            changed = await subscriber.next(0.01)
+            broker.unsubscribe(subscriber)
+            return idle, changed
+
+        idle, changed = asyncio.run(scenario())
+
+        assert idle is None
+        assert [event for event, _ in changed] == ["stock"]
+
+    def test_subscriber_limit(self):
+        """Test subscribers beyond the per-drop limit are rejected"""
+        broker = DropEventBroker(lambda *_: None, interval_ms=1000, max_subscribers_per_drop=1)
+
+        async def scenario():
+            subscriber = broker.subscribe(1)
+            with pytest.raises(SubscriberLimitReached):
+                broker.subscribe(1)
+            broker.unsubscribe(subscriber)
+
+        asyncio.run(scenario())
+        assert broker.stats["rejected"] == 1
+
+    def test_stream_heartbeat_and_end(self):
+        """Test the stream emits heartbeats and stops after the end event"""
+        broker = DropEventBroker(lambda *_: _snapshot(0), interval_ms=1000, max_subscribers_per_drop=10)
+
+        async def scenario():
+            subscriber = broker.subscribe(1)
+            chunks = []
+            async for chunk in broker.stream(subscriber, heartbeat_seconds=0.01):
+                chunks.append(chunk)
+                if chunk == b": ping\n\n":
+                    broker.fan_out(1, None)
+            return chunks
+
+        chunks = asyncio.run(scenario())
+
+        assert chunks[0].startswith(b"event: ")
+        assert b": ping\n\n" in chunks
+        assert chunks[-1].startswith(b"event: end\n")
+        assert broker.stats["subscribers"] == 0
+
+    def test_format_event(self):
+        """Test SSE message framing"""
+        assert format_event("stock", {"a": 1}) == b'event: stock\ndata: {"a":1}\n\n'
+
+    def test_load_drop_snapshot(self, db, test_drop, test_user):
+        """Test snapshot contains stock, window and the user's position"""
+        join_waitlist(test_drop.id, test_user, db)
+
+        snapshot = load_drop_snapshot(db, test_drop.id, {test_user.id})
+
+        assert snapshot["stock"]["remaining_stock"] == test_drop.total_stock
+        assert snapshot["window"]["state"] == "upcoming"
+        assert snapshot["positions"][test_user.id]["position"] == 1
+        assert load_drop_snapshot(db, 99999, set()) is None
+
+    def test_runner_release_returns_connection(self, tmp_path):
+        """Test releasing the request session gives its connection back before the stream ends"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'release.db'}")
+        session = sessionmaker(bind=engine)()
+        runner = DBRunner(session)
+
+        async def scenario():
+            await runner.run(lambda db: db.execute(text("SELECT 1")).scalar())
+            held = engine.pool.checkedout()
+            await runner.release()
+            return held
+
+        assert asyncio.run(scenario()) == 1
+        assert engine.pool.checkedout() == 0
+        engine.dispose()
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from app.models.claim_code import ClaimCode
+from app.models.waitlist import Waitlist, WaitlistStatus
+from app.services.expiry_service import expiry_stats, sweep_expired_claims
+from app.services.waitlist_service import claim_drop, join_waitlist
+
+
+@pytest.mark.unit
+class TestExpirySweeper:
+    """Test claim-code expiry sweeping"""
+
+    def test_expired_claim_returns_stock(self, db, active_claim_drop, test_user):
+        """Test expired unused codes expire the entry and release stock"""
+        join_waitlist(active_claim_drop.id, test_user, db)
+        claim_drop(active_claim_drop.id, test_user, db)
+
+        released = sweep_expired_claims(db, now=datetime.utcnow() + timedelta(hours=25), batch_size=1)
+
+        assert released == {active_claim_drop.id: 1}
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 0
+        entry = db.query(Waitlist).filter(Waitlist.user_id == test_user.id).first()
+        assert entry.status == WaitlistStatus.EXPIRED
+        assert db.query(ClaimCode).count() == 0
+        assert expiry_stats.stats["expired"] == 1
+
+        with pytest.raises(HTTPException) as exc:
+            claim_drop(active_claim_drop.id, test_user, db)
+        assert exc.value.detail == "Claim expired"
+
+    def test_unexpired_claims_untouched(self, db, active_claim_drop, test_user):
+        """Test codes that have not expired are left alone"""
+        join_waitlist(active_claim_drop.id, test_user, db)
+        claim_drop(active_claim_drop.id, test_user, db)
+
+        assert sweep_expired_claims(db) == {}
+
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 1
+        assert db.query(ClaimCode).count() == 1
+
+    def test_drop_row_updated_last(self, db, active_claim_drop, test_user):
+        """Test the hot drops row is written after minting, right before commit"""
+        join_waitlist(active_claim_drop.id, test_user, db)
+        claim_drop(active_claim_drop.id, test_user, db)
+        statements = []
+        connection = db.connection()
+
+        @event.listens_for(connection, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0:3])
+
+        try:
+            sweep_expired_claims(db, now=datetime.utcnow() + timedelta(hours=25))
+        finally:
+            event.remove(connection, "before_cursor_execute", record)
+
+        writes = [s for s in statements if s[0] in ("INSERT", "UPDATE", "DELETE")]
+        assert writes[-1][:2] == ["UPDATE", "drops"]
+        assert any(s[:3] == ["INSERT", "INTO", "claim_code_pool"] for s in writes)
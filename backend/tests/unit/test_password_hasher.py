@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from fastapi import HTTPException, status
+from app.schemas.user_schema import UserLogin
+from app.services.auth_service import login_user
+from app.utils.password_hasher import HashingOverloaded, PasswordHasher, password_context, password_hasher
+
+
+@pytest.mark.unit
+class TestPasswordHasher:
+    """Test process-pool password hashing"""
+
+    def test_pool_hash_and_verify(self):
+        """Test hashing and verification run on the pool and record timings"""
+        hasher = PasswordHasher(workers=1, max_pending=4, rounds=1000)
+        try:
+            hashed = hasher.hash("secret")
+            assert hashed.startswith("$pbkdf2-sha256$1000$")
+            assert hasher.verify_and_update("secret", hashed) == (True, None)
+            assert asyncio.run(hasher.verify_and_update_async("wrong", hashed)) == (False, None)
+        finally:
+            hasher.shutdown()
+
+        assert hasher._executor is None
+        stats = hasher.stats
+        assert stats["completed"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["avg_hash_ms"] > 0
+
+    def test_pool_does_not_fork(self):
+        """Test workers are not forked from the threaded server process"""
+        hasher = PasswordHasher(workers=1, max_pending=4, rounds=1000)
+        try:
+            assert hasher._pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+        finally:
+            hasher.shutdown()
+
+    def test_rounds_change_triggers_update(self):
+        """Test a hash made with another cost is re-hashed on verification"""
+        hasher = PasswordHasher(workers=0, max_pending=4, rounds=2000)
+        old_hash = password_context(1000).hash("secret")
+
+        valid, new_hash = hasher.verify_and_update("secret", old_hash)
+
+        assert valid is True
+        assert new_hash.startswith("$pbkdf2-sha256$2000$")
+
+    def test_pending_limit(self):
+        """Test work beyond the pending limit is rejected"""
+        hasher = PasswordHasher(workers=0, max_pending=0, rounds=1000)
+
+        with pytest.raises(HashingOverloaded):
+            hasher.hash("secret")
+        assert hasher.stats["rejected"] == 1
+
+    def test_login_rehashes_on_cost_change(self, db, test_user):
+        """Test login stores a new hash when the configured cost changed"""
+        test_user.password = password_context(1000).hash("testpass123")
+        db.commit()
+
+        login_user(UserLogin(email=test_user.email, password="testpass123"), db)
+
+        db.refresh(test_user)
+        assert test_user.password.startswith(f"$pbkdf2-sha256${password_hasher.rounds}$")
+        assert password_hasher.stats["rehashed"] == 1
+
+    def test_login_overloaded(self, db, test_user, monkeypatch):
+        """Test login answers 503 when the hashing queue is full"""
+        monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+        with pytest.raises(HTTPException) as exc:
+            login_user(UserLogin(email=test_user.email, password="testpass123"), db)
+
+        assert exc.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert exc.value.headers["Retry-After"] == "1"
@@ -0,0 +1,177 @@
+import threading
+import time
+import pytest
+from app.utils.rank_index import DropRankIndex, FenwickTree, RankIndexRegistry
+
+
+@pytest.mark.unit
+class TestFenwickTree:
+    """Test Fenwick tree prefix sums"""
+
+    def test_prefix_and_find_kth(self):
+        """Test prefix sums and k-th element lookup"""
+        tree = FenwickTree(8)
+        tree.add(1, 2)
+        tree.add(4, 1)
+        tree.add(7, 3)
+
+        assert tree.prefix(0) == 0
+        assert tree.prefix(2) == 2
+        assert tree.prefix(5) == 3
+        assert tree.prefix(8) == 6
+        assert tree.find_kth(1) == 1
+        assert tree.find_kth(3) == 4
+        assert tree.find_kth(6) == 7
+
+
+@pytest.mark.unit
+class TestDropRankIndex:
+    """Test order-statistic waitlist index"""
+
+    def test_position_matches_count_below(self):
+        """Test position equals count of lower scores + 1"""
+        index = DropRankIndex([(1, 50.5), (2, 10.0), (3, 50.2), (4, 99.0)])
+
+        assert index.position(2) == 1
+        assert index.position(3) == 2
+        assert index.position(1) == 3
+        assert index.position(4) == 4
+        assert index.position(5) is None
+        assert index.position_of_score(50.3) == 3
+        assert len(index) == 4
+
+    def test_top_k(self):
+        """Test top-k returns lowest scores in order"""
+        index = DropRankIndex([(1, 30.0), (2, 10.0), (3, 20.5), (4, 20.1)])
+
+        assert index.top(3) == [(2, 10.0), (4, 20.1), (3, 20.5)]
+        assert index.top(10) == [(2, 10.0), (4, 20.1), (3, 20.5), (1, 30.0)]
+
+    def test_remove_and_update(self):
+        """Test removal shifts positions and re-adding updates score"""
+        index = DropRankIndex([(1, 10.0), (2, 20.0), (3, 30.0)])
+        index.remove(1)
+        index.remove(42)
+
+        assert 1 not in index
+        assert index.position(2) == 1
+
+        index.add(3, 5.0)
+        assert index.position(3) == 1
+        assert len(index) == 2
+
+    def test_range_expansion(self):
+        """Test scores outside the initial range rebuild the tree"""
+        index = DropRankIndex([(1, 50.0)])
+        index.add(2, -500.0)
+        index.add(3, 10000.0)
+
+        assert index.position(2) == 1
+        assert index.position(1) == 2
+        assert index.position(3) == 3
+        assert index.position_of_score(20000.0) == 4
+
+
+@pytest.mark.unit
+class TestRankIndexRegistry:
+    """Test per-drop index registry"""
+
+    def test_loads_once_and_updates_incrementally(self):
+        """Test loader runs once and add/remove update the cached index"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [(1, 10.0), (2, 20.0)]
+
+        registry = RankIndexRegistry(refresh_seconds=60)
+        assert registry.query(7, loader, lambda idx: idx.position(2)) == 2
+
+        registry.add(7, 3, 5.0)
+        registry.remove(7, [1])
+        assert registry.query(7, loader, lambda idx: idx.position(2)) == 2
+        assert registry.query(7, loader, lambda idx: idx.position(3)) == 1
+        assert len(calls) == 1
+
+    def test_stale_index_is_rebuilt(self):
+        """Test indexes older than refresh_seconds are reloaded"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [(1, 10.0)]
+
+        registry = RankIndexRegistry(refresh_seconds=0)
+        registry.query(7, loader, len)
+        registry.query(7, loader, len)
+        assert len(calls) == 2
+
+    def test_concurrent_misses_share_one_build(self):
+        """Test requests arriving during a build wait for it instead of loading again"""
+        calls = []
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(1)
+            return [(1, 10.0), (2, 20.0)]
+
+        registry = RankIndexRegistry(refresh_seconds=60)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.query(7, loader, len)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == [2] * 5
+        assert len(calls) == 1
+
+    def test_stale_index_refreshed_in_background(self):
+        """Test a stale index keeps serving while the refresher rebuilds and swaps it in"""
+        release = threading.Event()
+
+        def refresher(drop_id):
+            release.wait(1)
+            return [(1, 10.0), (2, 20.0)]
+
+        registry = RankIndexRegistry(refresh_seconds=0, refresher=refresher)
+        assert registry.query(7, lambda: [(1, 10.0)], len) == 1
+
+        # Stale: answered from the old index while the refresh runs
+        assert registry.query(7, lambda: pytest.fail("inline rebuild"), len) == 1
+        registry.add(7, 3, 5.0)
+        release.set()
+        for _ in range(100):
+            if registry.builds == 2:
+                break
+            time.sleep(0.01)
+
+        # Change made during the build is replayed onto the new index
+        assert registry.query(7, lambda: [], lambda idx: (len(idx), idx.position(3))) == (3, 1)
+
+
+    def test_least_recently_used_drop_evicted(self):
+        """Test the registry keeps at most max_drops indexes, evicting the least recently queried"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [(1, 10.0)]
+
+        registry = RankIndexRegistry(refresh_seconds=60, max_drops=2)
+        registry.query(1, loader, len)
+        registry.query(2, loader, len)
+        registry.query(1, loader, len)
+        registry.query(3, loader, len)
+
+        assert len(calls) == 3
+        registry.query(1, loader, len)
+        assert len(calls) == 3
+        registry.query(2, loader, len)
+        assert len(calls) == 4
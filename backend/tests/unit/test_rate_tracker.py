@@ -0,0 +1,44 @@
+import pytest
+from app.utils.rate_tracker import InMemoryRateBackend, RateTracker
+
+
+def make_tracker(max_keys=100, max_events_per_key=10, window=60):
+    return RateTracker(InMemoryRateBackend(max_keys, max_events_per_key), window)
+
+
+@pytest.mark.unit
+class TestRateTracker:
+    """Test sliding-window rapid action tracker"""
+
+    def test_counts_joins_and_leaves_in_window(self):
+        """Test join and leave events are both counted"""
+        tracker = make_tracker()
+        tracker.record(1, 10, "join", now=100)
+        tracker.record(1, 10, "leave", now=110)
+        tracker.record(1, 10, "join", now=120)
+
+        assert tracker.count(1, 10, now=130) == 3
+        assert tracker.count(1, 10, actions=("leave",), now=130) == 1
+        assert tracker.count(2, 10, now=130) == 0
+
+    def test_old_events_slide_out(self):
+        """Test events older than the window are not counted"""
+        tracker = make_tracker(window=60)
+        tracker.record(1, 10, "join", now=100)
+        tracker.record(1, 10, "join", now=150)
+
+        assert tracker.count(1, 10, now=170) == 1
+        assert tracker.count(1, 10, now=300) == 0
+
+    def test_memory_is_bounded(self):
+        """Test key count and per-key events are capped"""
+        backend = InMemoryRateBackend(max_keys=2, max_events_per_key=3)
+        tracker = RateTracker(backend, 60)
+        for user_id in range(5):
+            tracker.record(user_id, 10, "join", now=100)
+        for _ in range(10):
+            tracker.record(4, 10, "join", now=101)
+
+        assert len(backend._events) == 2
+        assert tracker.count(0, 10, now=102) == 0
+        assert tracker.count(4, 10, now=102) == 3
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app import database
+from app.database import (
+    PRIMARY_PIN_COOKIE, DBRunner, is_pinned, pin_to_primary, primary_pin_token, primary_pins
+)
+from app.middleware import auth_middleware
+from app.middleware.auth_middleware import get_read_runner
+from app.utils.jwt_handler import create_access_token
+
+
+def _request(user_id=None, pin=None):
+    headers = []
+    if user_id is not None:
+        token = create_access_token({"sub": str(user_id)})
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    if pin is not None:
+        headers.append((b"cookie", f"{PRIMARY_PIN_COOKIE}={pin}".encode()))
+    return Request({"type": "http", "method": "GET", "path": "/drops", "headers": headers})
+
+
+def _read_session(request, primary):
+    """Resolve get_read_runner and return the session it hands out"""
+    async def scenario():
+        dependency = get_read_runner(request, primary)
+        runner = await dependency.__anext__()
+        await dependency.aclose()
+        return runner.session
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Configure one in-memory read replica"""
+    factory = sessionmaker(bind=create_engine("sqlite://"))
+    monkeypatch.setattr(database, "replica_urls", ["sqlite://"])
+    monkeypatch.setattr(auth_middleware, "replica_urls", ["sqlite://"])
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [factory])
+    return factory
+
+
+@pytest.mark.unit
+class TestReadReplicaRouting:
+    """Test read-only sessions are routed to replicas"""
+
+    def test_primary_without_replicas(self, db):
+        """Test reads use the primary session when no replica is configured"""
+        pin_to_primary(1)
+
+        assert _read_session(_request(1), DBRunner(db)) is db
+        assert len(primary_pins) == 0
+
+    def test_reads_go_to_replica(self, db, replica):
+        """Test anonymous and unpinned reads use a replica session"""
+        assert _read_session(_request(), DBRunner(db)).bind is replica.kw["bind"]
+        assert _read_session(_request(7), DBRunner(db)).bind is replica.kw["bind"]
+
+    def test_writer_pinned_to_primary(self, db, replica):
+        """Test a user who just wrote reads their own writes from the primary"""
+        pin_to_primary(7)
+
+        assert is_pinned(7)
+        assert _read_session(_request(7), DBRunner(db)) is db
+        assert _read_session(_request(8), DBRunner(db)) is not db
+
+    def test_pin_expires(self, db, replica):
+        """Test the primary pin only lasts for the configured window"""
+        primary_pins.set(7, True, ttl=0)
+
+        assert not is_pinned(7)
+        assert _read_session(_request(7), DBRunner(db)) is not db
+
+    def test_pin_carried_by_client_across_workers(self, db, replica):
+        """Test the signed pin cookie routes reads to the primary on a worker that never saw the write"""
+        response = Response()
+        pin_to_primary(7, response)
+        pin = response.headers["x-primary-pin"]
+        assert f"{PRIMARY_PIN_COOKIE}={pin}" in response.headers["set-cookie"]
+
+        # Başka bir worker: süreç içi pin kaydı yok
+        primary_pins.clear()
+
+        assert _read_session(_request(7, pin), DBRunner(db)) is db
+        assert _read_session(_request(7), DBRunner(db)) is not db
+
+    def test_invalid_pin_tokens_ignored(self, db, replica):
+        """Test expired, forged or another user's pin tokens do not pin reads"""
+        expired = primary_pin_token(7, time.time() - 1)
+        other_user = primary_pin_token(8, time.time() + 60)
+        valid = primary_pin_token(7, time.time() + 60)
+        forged = valid[:-1] + ("0" if valid[-1] != "0" else "1")
+
+        for pin in (expired, other_user, forged, "garbage"):
+            assert not is_pinned(7, pin)
+            assert _read_session(_request(7, pin), DBRunner(db)) is not db
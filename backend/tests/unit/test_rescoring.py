@@ -0,0 +1,69 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql
+from app.models.user import User
+from app.models.waitlist import Waitlist
+from app.services.rescoring_service import _RESCORE_UPDATE_UNNEST, rescore_drop
+from app.utils.seed import calculate_priority_score, calculate_priority_scores
+
+
+@pytest.mark.unit
+class TestRescoring:
+    """Test vectorized waitlist re-scoring"""
+
+    def test_vectorized_matches_scalar(self):
+        """Test array scoring equals per-user scoring at the same reference time"""
+        now = datetime(2025, 6, 1, 12, 0, 0)
+        created = [now - timedelta(days=d, hours=3) for d in (0, 1, 10, 365)]
+        latencies = [0, 150, 999, 12345]
+        rapid = [0, 1, 4, 7]
+
+        scores, ages = calculate_priority_scores(
+            np.array(created, dtype="datetime64[us]"),
+            np.array(latencies),
+            np.array(rapid),
+            now
+        )
+
+        expected = [
+            calculate_priority_score(c, l, r, now=now)
+            for c, l, r in zip(created, latencies, rapid)
+        ]
+        assert scores.tolist() == expected
+        assert ages.tolist() == [0, 1, 10, 365]
+
+    def test_rescore_drop_in_chunks(self, db, test_drop):
+        """Test all waiting entries are rewritten across chunk boundaries"""
+        now = datetime.utcnow()
+        for i in range(5):
+            user = User(email=f"rescore{i}@test.com", password="x", created_at=now - timedelta(days=i))
+            db.add(user)
+            db.flush()
+            db.add(Waitlist(
+                drop_id=test_drop.id,
+                user_id=user.id,
+                priority_score=-1.0,
+                signup_latency_ms=i * 100,
+                rapid_actions_count=None
+            ))
+        db.commit()
+
+        assert rescore_drop(db, test_drop.id, now=now, chunk_size=2) == 5
+
+        for entry in db.query(Waitlist).all():
+            user = db.get(User, entry.user_id)
+            assert entry.priority_score == calculate_priority_score(
+                user.created_at, entry.signup_latency_ms, 0, now=now
+            )
+
+
+    def test_postgres_chunk_is_single_statement(self):
+        """Test the PostgreSQL chunk update binds whole arrays in one UPDATE"""
+        compiled = _RESCORE_UPDATE_UNNEST.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+
+        assert sql.count("UPDATE waitlist") == 1
+        assert "FROM unnest(" in sql
+        assert "WHERE waitlist.id = v.id" in sql
+        assert {"b_ids", "b_scores", "b_ages"} <= set(compiled.params)
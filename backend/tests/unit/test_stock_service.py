@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import event
+from app.models.stock_shard import DropStockShard
+from app.services.stock_service import (
+    reserve_stock, reserve_stock_bulk, release_stock, configure_stock_shards, get_claimed_count
+)
+
+
+@pytest.mark.unit
+class TestStockService:
+    """Test stock reservation and sharded counters"""
+
+    def test_reserve_stock_stops_at_total(self, db, active_claim_drop):
+        """Test conditional UPDATE never exceeds total stock"""
+        active_claim_drop.total_stock = 2
+        db.commit()
+
+        results = [reserve_stock(db, active_claim_drop, user_id) for user_id in range(3)]
+        db.commit()
+
+        assert results == [True, True, False]
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 2
+
+    def test_bulk_reserve_full_grant(self, db, active_claim_drop):
+        """Test a batch that fits is granted in full"""
+        active_claim_drop.total_stock = 10
+        db.commit()
+
+        assert reserve_stock_bulk(db, active_claim_drop, 4) == 4
+        assert reserve_stock_bulk(db, active_claim_drop, 8) == 6
+        assert reserve_stock_bulk(db, active_claim_drop, 1) == 0
+        db.commit()
+        assert get_claimed_count(db, active_claim_drop) == 10
+
+    def test_bulk_reserve_survives_lost_races(self, db, active_claim_drop):
+        """Test losing many compare-and-swap races still grants the remaining stock"""
+        active_claim_drop.total_stock = 20
+        active_claim_drop.claimed_count = 10
+        db.commit()
+        connection = db.connection()
+        races = {"left": 8}
+
+        @event.listens_for(connection, "before_cursor_execute")
+        def concurrent_claim(conn, cursor, statement, parameters, context, executemany):
+            # Başka bir worker her CAS'tan hemen önce bir birim alır
+            if statement.startswith("UPDATE drops") and "drops.claimed_count = ?" in statement and races["left"]:
+                races["left"] -= 1
+                cursor.execute("UPDATE drops SET claimed_count = claimed_count + 1")
+
+        try:
+            granted = reserve_stock_bulk(db, active_claim_drop, 15)
+        finally:
+            event.remove(connection, "before_cursor_execute", concurrent_claim)
+        db.commit()
+
+        assert races["left"] == 0
+        assert granted == 2
+        assert get_claimed_count(db, active_claim_drop) == 20
+
+    def test_configure_shards_splits_stock(self, db, active_claim_drop):
+        """Test total stock is split across shard rows"""
+        active_claim_drop.total_stock = 10
+        active_claim_drop.stock_shards = 4
+        configure_stock_shards(db, active_claim_drop)
+        db.commit()
+
+        shards = db.query(DropStockShard).filter(
+            DropStockShard.drop_id == active_claim_drop.id
+        ).all()
+
+        assert len(shards) == 4
+        assert sum(s.capacity for s in shards) == 10
+
+    def test_sharded_reserve_falls_over_to_next_shard(self, db, active_claim_drop):
+        """Test exhausted shard falls over until total stock is used"""
+        active_claim_drop.total_stock = 5
+        active_claim_drop.stock_shards = 3
+        configure_stock_shards(db, active_claim_drop)
+        db.commit()
+
+        # Aynı kullanıcı hep aynı shard'dan başlar
+        results = [reserve_stock(db, active_claim_drop, 7) for _ in range(6)]
+        db.commit()
+
+        assert results == [True] * 5 + [False]
+        assert get_claimed_count(db, active_claim_drop) == 5
+
+    def test_reconfigure_keeps_claimed_units(self, db, active_claim_drop):
+        """Test changing shard count preserves claimed units"""
+        active_claim_drop.total_stock = 6
+        active_claim_drop.stock_shards = 2
+        configure_stock_shards(db, active_claim_drop)
+        db.commit()
+        for user_id in range(3):
+            reserve_stock(db, active_claim_drop, user_id)
+        db.commit()
+
+        active_claim_drop.stock_shards = 1
+        configure_stock_shards(db, active_claim_drop)
+        db.commit()
+
+        assert active_claim_drop.claimed_count == 3
+        assert db.query(DropStockShard).count() == 0
+
+    def test_release_stock_across_shards(self, db, active_claim_drop):
+        """Test released units come back from shards without going negative"""
+        active_claim_drop.total_stock = 6
+        active_claim_drop.stock_shards = 3
+        configure_stock_shards(db, active_claim_drop)
+        db.commit()
+        for user_id in range(4):
+            reserve_stock(db, active_claim_drop, user_id)
+        db.commit()
+
+        assert release_stock(db, active_claim_drop, 3) == 3
+        db.commit()
+        assert get_claimed_count(db, active_claim_drop) == 1
+
+        assert release_stock(db, active_claim_drop, 5) == 1
+        db.commit()
+        assert get_claimed_count(db, active_claim_drop) == 0
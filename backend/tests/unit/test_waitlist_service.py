@@ -0,0 +1,239 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.services import waitlist_service
+from app.models.drop import AllocationMode, Drop
+from app.models.user import User
+from app.models.waitlist import Waitlist, WaitlistStatus
+from app.models.claim_code import ClaimCode
+from app.services.waitlist_service import (
+    join_waitlist, leave_waitlist, claim_drop, claim_drop_batch, allocate_drop
+)
+from app.schemas.drop_schema import DropUpdate
+from app.services.drop_service import delete_drop, update_drop
+from app.utils.rank_index import rank_indexes
+from app.services.expiry_service import sweep_expired_claims
+
+from app.utils.jwt_handler import hash_password
+
+
+@pytest.mark.unit
+class TestRankIndexSource:
+    """Test the waitlist rank index is built from the primary"""
+
+    def test_replica_request_builds_from_primary(self, db, test_drop, test_user, monkeypatch):
+        """Test a replica session that lags behind the primary does not feed the index"""
+        join_waitlist(test_drop.id, test_user, db)
+        rank_indexes.clear()
+        monkeypatch.setattr(waitlist_service, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+        # Replica: şema var, join henüz replike olmadı
+        lagging = create_engine("sqlite://")
+        Base.metadata.create_all(bind=lagging)
+        replica = sessionmaker(bind=lagging, info={"replica": True})()
+        try:
+            entries = waitlist_service._entries_loader(replica, test_drop.id)()
+        finally:
+            replica.close()
+
+        assert [user_id for user_id, _ in entries] == [test_user.id]
+        assert [user_id for user_id, _ in waitlist_service._refresh_entries(test_drop.id)] == [test_user.id]
+
+    def test_deleted_or_closed_drop_index_evicted(self, db, test_drop, test_user):
+        """Test a drop's index is dropped when the drop is closed or deleted"""
+        join_waitlist(test_drop.id, test_user, db)
+        assert test_drop.id in rank_indexes._indexes
+
+        update_drop(test_drop.id, DropUpdate(status="completed"), db)
+        assert test_drop.id not in rank_indexes._indexes
+
+        rank_indexes.query(test_drop.id, lambda: [], len)
+        delete_drop(test_drop.id, db)
+        assert test_drop.id not in rank_indexes._indexes
+
+
+@pytest.mark.unit
+class TestJoinLeave:
+    """Test waitlist join/leave bookkeeping"""
+
+    def test_rejoin_counts_rapid_actions(self, db, test_drop, test_user):
+        """Test join/leave churn is visible to the rapid action signal"""
+        join_waitlist(test_drop.id, test_user, db)
+        leave_waitlist(test_drop.id, test_user, db)
+        join_waitlist(test_drop.id, test_user, db)
+
+        entry = db.query(Waitlist).filter(Waitlist.user_id == test_user.id).first()
+        assert entry.rapid_actions_count == 2
+
+
+@pytest.mark.unit
+class TestClaimEngine:
+    """Test lock-free claim path"""
+
+    def test_claim_increments_claimed_count(self, db, active_claim_drop, test_user):
+        """Test successful claim updates stock and waitlist status"""
+        join_waitlist(active_claim_drop.id, test_user, db)
+
+        result = claim_drop(active_claim_drop.id, test_user, db)
+
+        assert result.message == "Claim successful"
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 1
+        entry = db.query(Waitlist).filter(Waitlist.user_id == test_user.id).first()
+        assert entry.status == WaitlistStatus.CLAIMED
+
+    def test_claim_out_of_stock_rolls_back_entry(self, db, active_claim_drop, test_user):
+        """Test failed stock reservation leaves waitlist entry waiting"""
+        join_waitlist(active_claim_drop.id, test_user, db)
+        active_claim_drop.claimed_count = active_claim_drop.total_stock
+        db.commit()
+
+        with pytest.raises(Exception) as exc:
+            claim_drop(active_claim_drop.id, test_user, db)
+
+        assert exc.value.status_code == 400
+        assert exc.value.detail == "Out of stock"
+        entry = db.query(Waitlist).filter(Waitlist.user_id == test_user.id).first()
+        assert entry.status == WaitlistStatus.WAITING
+
+    def test_second_claim_is_idempotent(self, db, active_claim_drop, test_user):
+        """Test repeated claim returns same code without consuming stock"""
+        join_waitlist(active_claim_drop.id, test_user, db)
+
+        first = claim_drop(active_claim_drop.id, test_user, db)
+        second = claim_drop(active_claim_drop.id, test_user, db)
+
+        assert second.message == "Already claimed"
+        assert second.claim_code == first.claim_code
+        assert db.get(Drop, active_claim_drop.id).claimed_count == 1
+
+
+@pytest.mark.unit
+class TestClaimBatch:
+    """Test batched claim processing"""
+
+    def _join_users(self, db, drop, count):
+        users = []
+        for i in range(count):
+            user = User(email=f"batch{i}@test.com", password=hash_password("testpass123"))
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            join_waitlist(drop.id, user, db)
+            users.append(user)
+        return users
+
+    def test_batch_assigns_stock_by_priority(self, db, active_claim_drop):
+        """Test limited stock goes to best priority scores in one batch"""
+        active_claim_drop.total_stock = 2
+        db.commit()
+        users = self._join_users(db, active_claim_drop, 3)
+        user_ids = [u.id for u in users]
+
+        results = claim_drop_batch(active_claim_drop.id, user_ids, db)
+
+        entries = db.query(Waitlist).order_by(Waitlist.priority_score, Waitlist.id).all()
+        winners = {e.user_id for e in entries[:2]}
+        for user_id in user_ids:
+            if user_id in winners:
+                assert results[user_id].message == "Claim successful"
+            else:
+                assert isinstance(results[user_id], HTTPException)
+                assert results[user_id].detail == "Out of stock"
+
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 2
+        assert db.query(Waitlist).filter(Waitlist.status == WaitlistStatus.CLAIMED).count() == 2
+
+    def test_batch_handles_claimed_and_missing_users(self, db, active_claim_drop):
+        """Test batch returns idempotent and not-in-waitlist results per user"""
+        users = self._join_users(db, active_claim_drop, 1)
+        first = claim_drop(active_claim_drop.id, users[0], db)
+
+        results = claim_drop_batch(active_claim_drop.id, [users[0].id, 9999], db)
+
+        assert results[users[0].id].message == "Already claimed"
+        assert results[users[0].id].claim_code == first.claim_code
+        assert results[9999].status_code == 404
+
+
+@pytest.mark.unit
+class TestPriorityAllocation:
+    """Test set-based allocation for priority drops"""
+
+    def _setup(self, db, drop, stock, count):
+        drop.allocation_mode = AllocationMode.PRIORITY
+        drop.total_stock = stock
+        db.commit()
+        return TestClaimBatch()._join_users(db, drop, count)
+
+    def test_allocation_picks_best_scores_once(self, db, active_claim_drop):
+        """Test top entries by priority score get codes in a single pass"""
+        users = self._setup(db, active_claim_drop, 2, 3)
+
+        assert allocate_drop(db, active_claim_drop.id) == 2
+        assert allocate_drop(db, active_claim_drop.id) is None
+
+        entries = db.query(Waitlist).order_by(Waitlist.priority_score, Waitlist.id).all()
+        assert [e.status for e in entries] == [
+            WaitlistStatus.CLAIMED, WaitlistStatus.CLAIMED, WaitlistStatus.WAITING
+        ]
+        assert db.query(ClaimCode).count() == 2
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 2
+        assert active_claim_drop.allocated_at is not None
+
+    def test_claim_waits_for_allocation_then_reads_code(self, db, active_claim_drop):
+        """Test claim never allocates inline and only looks up codes once allocated"""
+        users = self._setup(db, active_claim_drop, 1, 2)
+        entries = db.query(Waitlist).order_by(Waitlist.priority_score, Waitlist.id).all()
+        by_id = {u.id: u for u in users}
+        winner, loser = by_id[entries[0].user_id], by_id[entries[1].user_id]
+
+        with pytest.raises(HTTPException) as pending:
+            claim_drop(active_claim_drop.id, winner, db)
+        assert pending.value.status_code == 503
+        assert pending.value.detail == "Allocation pending"
+        assert int(pending.value.headers["Retry-After"]) >= 1
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.allocated_at is None
+
+        allocate_drop(db, active_claim_drop.id)
+        first = claim_drop(active_claim_drop.id, winner, db)
+        second = claim_drop(active_claim_drop.id, winner, db)
+
+        assert first.message == "Claim successful"
+        assert first.claim_code == second.claim_code
+        with pytest.raises(HTTPException) as exc:
+            claim_drop(active_claim_drop.id, loser, db)
+        assert exc.value.detail == "Not selected in allocation"
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 1
+
+    def test_stock_increase_promotes_next_in_line(self, db, active_claim_drop):
+        """Test raising total_stock issues codes to exactly the next entries"""
+        self._setup(db, active_claim_drop, 1, 3)
+        allocate_drop(db, active_claim_drop.id)
+
+        update_drop(active_claim_drop.id, DropUpdate(total_stock=2), db)
+
+        entries = db.query(Waitlist).order_by(Waitlist.priority_score, Waitlist.id).all()
+        assert [e.status for e in entries] == [
+            WaitlistStatus.CLAIMED, WaitlistStatus.CLAIMED, WaitlistStatus.WAITING
+        ]
+        assert db.query(ClaimCode).count() == 2
+
+    def test_expired_claim_promotes_next_in_line(self, db, active_claim_drop):
+        """Test stock returned by the expiry sweeper goes to the next entry"""
+        self._setup(db, active_claim_drop, 1, 2)
+        allocate_drop(db, active_claim_drop.id)
+
+        sweep_expired_claims(db, now=datetime.utcnow() + timedelta(hours=25))
+
+        entries = db.query(Waitlist).order_by(Waitlist.priority_score, Waitlist.id).all()
+        assert [e.status for e in entries] == [WaitlistStatus.EXPIRED, WaitlistStatus.CLAIMED]
+        db.refresh(active_claim_drop)
+        assert active_claim_drop.claimed_count == 1
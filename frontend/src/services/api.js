@@ -1,6 +1,7 @@
 import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:8000';
+const PRIMARY_PIN_HEADER = 'X-Primary-Pin';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -16,6 +17,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Yazmadan sonra okumalar primary'den gelsin (read-your-writes)
+    const primaryPin = sessionStorage.getItem('primaryPin');
+    if (primaryPin) {
+      config.headers[PRIMARY_PIN_HEADER] = primaryPin;
+    }
     return config;
   },
   (error) => Promise.reject(error)
@@ -23,10 +29,17 @@ api.interceptors.request.use(
 
 // Response interceptor - Error handling
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const primaryPin = response.headers[PRIMARY_PIN_HEADER.toLowerCase()];
+    if (primaryPin) {
+      sessionStorage.setItem('primaryPin', primaryPin);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
+      sessionStorage.removeItem('primaryPin');
       window.location.href = '/login';
     }
     return Promise.reject(error);